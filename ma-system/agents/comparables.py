@@ -0,0 +1,322 @@
+"""
+Comparables & Multiples Engine
+
+Backs the valuation workflow's `4_multiples_valuation` step. Loads trading
+peers and precedent transactions from CSV (or Parquet, if pandas is
+installed) into columnar arrays, computes EV/Revenue and EV/EBITDA once
+per dataset and caches peer-set selections by filter signature.
+
+Repeated multiples runs across scenarios reuse the loaded universe, the
+selected peer set and its statistics - only the application to the
+target's metrics is recomputed.
+"""
+
+import math
+import re
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .qoe_engine import parse_amount
+    from .nwc_engine import iter_csv
+except ImportError:  # Running as a script from the agents directory
+    from qoe_engine import parse_amount
+    from nwc_engine import iter_csv
+
+
+MULTIPLES = ('ev_revenue', 'ev_ebitda')
+
+DATASET_SUFFIXES = ('.csv', '.parquet', '.pq')
+
+# Accepted column headers (lowercase) -> dataset column
+COLUMN_ALIASES = {
+    'name': 'name', 'company': 'name', 'target': 'name', 'unternehmen': 'name',
+    'kind': 'kind', 'type': 'kind', 'typ': 'kind',
+    'sector': 'sector', 'industry': 'sector', 'branche': 'sector',
+    'geography': 'geography', 'country': 'geography', 'region': 'geography', 'land': 'geography',
+    'year': 'year', 'date': 'year', 'jahr': 'year', 'datum': 'year',
+    'ev': 'ev', 'enterprise_value': 'ev', 'enterprise value': 'ev', 'unternehmenswert': 'ev',
+    'revenue': 'revenue', 'sales': 'revenue', 'umsatz': 'revenue',
+    'ebitda': 'ebitda'
+}
+
+# Words in a kind value or file name that mark precedent transactions / trading peers
+PRECEDENT_WORDS = ('precedent', 'transaction', 'transaktion', 'deal', 'm&a')
+PEER_WORDS = ('peer', 'trading', 'listed', 'comparable', 'comps', 'vergleich', 'boersennotiert')
+
+NAN = float('nan')
+
+_YEAR = re.compile(r'(?<!\d)(?:19|20)\d{2}(?!\d)')
+
+
+def _to_float(value) -> float:
+    """
+    EN/DE formatted number, NaN if missing or unparseable.
+
+    >>> _to_float("12,5"), _to_float("1.250,5"), _to_float("1,250.5"), _to_float("n/a")
+    (12.5, 1250.5, 1250.5, nan)
+    """
+    if value is None or str(value).strip() == '':
+        return NAN
+    try:
+        return parse_amount(value)
+    except ValueError:
+        return NAN
+
+
+def _to_year(value) -> int:
+    """
+    Year of a year/date value (ISO, German or fiscal-year notation), 0 if none.
+
+    >>> _to_year("2021"), _to_year("31.12.2022"), _to_year("03.2020"), _to_year("FY2019"), _to_year("")
+    (2021, 2022, 2020, 2019, 0)
+    """
+    match = _YEAR.search(str(value or ''))
+    return int(match.group(0)) if match else 0
+
+
+def normalize_kind(value, default: str = 'peer') -> str:
+    """
+    'peer' or 'precedent' for the kind spellings found in comparables files.
+
+    >>> normalize_kind("Precedent Transaction"), normalize_kind(" Trading Comps "), normalize_kind("")
+    ('precedent', 'peer', 'peer')
+    """
+    text = str(value or '').strip().lower()
+    if not text:
+        return default
+    if any(w in text for w in PRECEDENT_WORDS):
+        return 'precedent'
+    if any(w in text for w in PEER_WORDS):
+        return 'peer'
+    return text
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of pre-sorted values"""
+    if not sorted_values:
+        return NAN
+    pos = (len(sorted_values) - 1) * q
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+@dataclass(frozen=True)
+class PeerFilter:
+    """Peer-set selection criteria; hashable so it doubles as the cache key"""
+    kind: Optional[str] = None                 # 'peer' | 'precedent' | None for both
+    sectors: Tuple[str, ...] = ()
+    geographies: Tuple[str, ...] = ()
+    year_from: int = 0
+    year_to: int = 9999
+    min_revenue: float = 0.0
+    max_revenue: float = float('inf')
+    exclude: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        # Lists (or a single string) from callers would make the filter unhashable
+        for name in ('sectors', 'geographies', 'exclude'):
+            value = getattr(self, name)
+            object.__setattr__(self, name, (value,) if isinstance(value, str) else tuple(value))
+        if self.kind is not None:
+            object.__setattr__(self, 'kind', normalize_kind(self.kind))
+
+
+@dataclass
+class MultipleStats:
+    """Summary statistics for one multiple over a peer set"""
+    count: int
+    mean: float
+    median: float
+    p25: float
+    p75: float
+    low: float
+    high: float
+
+
+@dataclass
+class PeerSet:
+    """Selected rows of a dataset plus lazily computed statistics"""
+    filter: PeerFilter
+    rows: Tuple[int, ...]
+    names: List[str]
+    _stats: Dict[str, MultipleStats] = field(default_factory=dict, repr=False)
+
+
+class ComparablesDataset:
+    """Columnar peer/precedent universe with precomputed multiples"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.kind: List[str] = []
+        self.sector: List[str] = []
+        self.geography: List[str] = []
+        self.year = array('i')
+        self.ev = array('d')
+        self.revenue = array('d')
+        self.ebitda = array('d')
+        self.multiples: Dict[str, array] = {m: array('d') for m in MULTIPLES}
+        self._peer_sets: Dict[PeerFilter, PeerSet] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append_rows(self, rows: Iterable[Dict], default_kind: str = 'peer'):
+        """Append records (already keyed by dataset column names)"""
+        for row in rows:
+            ev, revenue, ebitda = _to_float(row.get('ev')), _to_float(row.get('revenue')), _to_float(row.get('ebitda'))
+            self.names.append(str(row.get('name', '')).strip())
+            self.kind.append(normalize_kind(row.get('kind'), default_kind))
+            self.sector.append(str(row.get('sector', '')).strip().lower())
+            self.geography.append(str(row.get('geography', '')).strip().lower())
+            self.year.append(_to_year(row.get('year')))
+            self.ev.append(ev)
+            self.revenue.append(revenue)
+            self.ebitda.append(ebitda)
+            self.multiples['ev_revenue'].append(ev / revenue if revenue > 0 else NAN)
+            self.multiples['ev_ebitda'].append(ev / ebitda if ebitda > 0 else NAN)
+
+        # New rows invalidate cached selections
+        self._peer_sets.clear()
+
+    def select(self, peer_filter: PeerFilter) -> PeerSet:
+        """Rows matching a filter - cached per filter signature"""
+        cached = self._peer_sets.get(peer_filter)
+        if cached is not None:
+            return cached
+
+        f = peer_filter
+        sectors = {s.lower() for s in f.sectors}
+        geographies = {g.lower() for g in f.geographies}
+        excluded = {e.lower() for e in f.exclude}
+        size_filter = f.min_revenue > 0 or f.max_revenue != float('inf')
+
+        rows = tuple(
+            i for i in range(len(self.names))
+            if (f.kind is None or self.kind[i] == f.kind)
+            and (not sectors or self.sector[i] in sectors)
+            and (not geographies or self.geography[i] in geographies)
+            and f.year_from <= self.year[i] <= f.year_to
+            and (not size_filter or f.min_revenue <= self.revenue[i] <= f.max_revenue)
+            and self.names[i].lower() not in excluded
+        )
+        peer_set = PeerSet(filter=f, rows=rows, names=[self.names[i] for i in rows])
+        self._peer_sets[f] = peer_set
+        return peer_set
+
+    def stats(self, peer_set: PeerSet, multiple: str) -> MultipleStats:
+        """Statistics of one multiple over a peer set (computed once per set)"""
+        cached = peer_set._stats.get(multiple)
+        if cached is not None:
+            return cached
+
+        column = self.multiples[multiple]
+        values = sorted(v for v in (column[i] for i in peer_set.rows) if not math.isnan(v))
+        stats = MultipleStats(
+            count=len(values),
+            mean=sum(values) / len(values) if values else NAN,
+            median=median(values) if values else NAN,
+            p25=_percentile(values, 0.25),
+            p75=_percentile(values, 0.75),
+            low=values[0] if values else NAN,
+            high=values[-1] if values else NAN
+        )
+        peer_set._stats[multiple] = stats
+        return stats
+
+    def implied_values(self, peer_set: PeerSet,
+                       scenarios: Dict[str, Tuple[float, float]]) -> Dict[str, Dict[str, Tuple[float, float, float]]]:
+        """
+        Apply peer multiples to target metrics for every scenario.
+
+        scenarios maps scenario name -> (revenue, ebitda). Returns
+        scenario -> multiple -> (p25, median, p75) implied enterprise value.
+        """
+        stats = {m: self.stats(peer_set, m) for m in MULTIPLES}
+        metric_index = {'ev_revenue': 0, 'ev_ebitda': 1}
+
+        result = {}
+        for name, metrics in scenarios.items():
+            result[name] = {}
+            for multiple, s in stats.items():
+                base = metrics[metric_index[multiple]]
+                result[name][multiple] = (base * s.p25, base * s.median, base * s.p75)
+        return result
+
+
+def _read_csv(path: Path) -> Iterable[Dict]:
+    """Records of a comma or semicolon separated file"""
+    rows = iter_csv(path)
+    header = next(rows, [])
+    mapping = [(i, COLUMN_ALIASES.get(h.strip().lower())) for i, h in enumerate(header)]
+    for raw in rows:
+        yield {col: raw[i] for i, col in mapping if col and i < len(raw)}
+
+
+def _read_parquet(path: Path) -> Iterable[Dict]:
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("Reading Parquet comparables requires pandas and pyarrow "
+                          "(pip install pandas pyarrow)") from e
+
+    frame = pd.read_parquet(path)
+    frame = frame.rename(columns={c: COLUMN_ALIASES.get(str(c).strip().lower(), c) for c in frame.columns})
+    columns = [c for c in frame.columns if c in set(COLUMN_ALIASES.values())]
+    return frame[columns].to_dict('records')
+
+
+def default_kind(path: Path) -> str:
+    """'precedent' for files named like precedent/transaction lists, else 'peer'"""
+    name = path.stem.lower()
+    return 'precedent' if any(w in name for w in PRECEDENT_WORDS) else 'peer'
+
+
+def find_datasets(directory: Path) -> List[Path]:
+    """Comparables files (CSV/Parquet) in a directory, sorted by name"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() in DATASET_SUFFIXES)
+
+
+class ComparablesEngine:
+    """
+    Loads comparable datasets once and keeps them in memory.
+
+    Datasets are keyed by path and reloaded only when the file's mtime or
+    size changes.
+    """
+
+    def __init__(self):
+        self._datasets: Dict[str, Tuple[Tuple, ComparablesDataset]] = {}
+
+    def load(self, *paths: Path, kinds: Optional[List[str]] = None) -> ComparablesDataset:
+        """
+        Load one or more CSV/Parquet files into a single dataset.
+
+        kinds gives the default kind ('peer'/'precedent') per file when the
+        file has no kind column (default: from the file name, see default_kind).
+        """
+        if kinds is None:
+            kinds = [default_kind(Path(p)) for p in paths]
+        elif len(kinds) != len(paths):
+            raise ValueError(f"Got {len(kinds)} kinds for {len(paths)} comparables files")
+        key = '|'.join(str(Path(p).resolve()) for p in paths)
+        stamp = tuple((Path(p).stat().st_mtime_ns, Path(p).stat().st_size) for p in paths)
+
+        cached = self._datasets.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        dataset = ComparablesDataset()
+        for path, kind in zip(paths, kinds):
+            path = Path(path)
+            reader = _read_parquet if path.suffix.lower() in DATASET_SUFFIXES[1:] else _read_csv
+            dataset.append_rows(reader(path), default_kind=kind)
+
+        self._datasets[key] = (stamp, dataset)
+        return dataset
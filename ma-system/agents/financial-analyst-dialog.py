@@ -6,13 +6,54 @@ instead of single-prompt execution. Enables iterative refinement,
 devil's advocate challenges, and guided analysis.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+import importlib.util
 import os
+import sys
 import yaml
 from pathlib import Path
 
+try:
+    from .valuation_store import ValuationVersionStore, flatten_model
+    from .model_writer import SheetData, ValuationModelWriter, WriteResult
+    from .qoe_engine import QoEEngine, QoELedger
+    from .nwc_engine import NWCEngine
+    from .stress_runner import DCFInputs, StressRunner, challenge_areas
+    from .comparables import ComparablesEngine, PeerFilter, find_datasets
+except ImportError:  # Running as a script from the agents directory
+    from valuation_store import ValuationVersionStore, flatten_model
+    from model_writer import SheetData, ValuationModelWriter, WriteResult
+    from qoe_engine import QoEEngine, QoELedger
+    from nwc_engine import NWCEngine
+    from stress_runner import DCFInputs, StressRunner, challenge_areas
+    from comparables import ComparablesEngine, PeerFilter, find_datasets
+
+
+MA_SYSTEM_ROOT = Path(__file__).parent.parent
+
+# Valuation model fields recorded as assumption_change events
+ASSUMPTION_PREFIX = "assumptions."
+
+
+def _default_knowledge_store(deal_name: str):
+    """
+    The deal's shared KnowledgeStore when no store is passed in.
+
+    Reuses the orchestrator's knowledge_store module if it is already
+    loaded, so `open_store` hands back the orchestrator's own instance
+    instead of a second one on the same event log.
+    """
+    module = sys.modules.get('orchestrator.knowledge_store') or sys.modules.get('knowledge_store')
+    if module is None:
+        path = MA_SYSTEM_ROOT / "orchestrator" / "knowledge_store.py"
+        spec = importlib.util.spec_from_file_location("knowledge_store", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["knowledge_store"] = module  # Later orchestrator imports share it
+        spec.loader.exec_module(module)
+    return module.open_store(MA_SYSTEM_ROOT / "knowledge-base", deal_name)
+
 
 class InteractionMode(Enum):
     """Overall interaction mode"""
@@ -28,6 +69,7 @@ class DialogMode(Enum):
     EXCEL_REFINEMENT = "excel_refinement"
     DEVILS_ADVOCATE = "devils_advocate"
     SENSITIVITY_ANALYSIS = "sensitivity_analysis"
+    QOE_ANALYSIS = "qoe_analysis"
     ASSUMPTION_REVIEW = "assumption_review"
 
 
@@ -56,8 +98,11 @@ class FinancialAnalystDialog:
     - Challenge mode to test assumptions
     """
 
-    def __init__(self, deal_name: str, interaction_mode: InteractionMode = None):
+    def __init__(self, deal_name: str, interaction_mode: InteractionMode = None,
+                 knowledge_store=None):
+        """knowledge_store: the orchestrator's deal KnowledgeStore (opened here when omitted)"""
         self.deal_name = deal_name
+        self.knowledge_store = knowledge_store or _default_knowledge_store(deal_name)
 
         # Load user preference from knowledge base if not specified
         if interaction_mode is None:
@@ -81,6 +126,17 @@ class FinancialAnalystDialog:
             user_preference=interaction_mode
         )
 
+        self.valuation_store = ValuationVersionStore(self._get_deal_dir() / "valuation-versions.jsonl")
+        self.state.current_valuation_version = self.valuation_store.latest()
+        self.model_writer = ValuationModelWriter(self._get_deal_dir() / "models", deal_name)
+        self.qoe_engine: Optional[QoEEngine] = None
+        self.nwc_engine: Optional[NWCEngine] = None
+        self.comparables = ComparablesEngine()
+
+    def _get_deal_dir(self) -> Path:
+        """Get path to this deal's knowledge base directory"""
+        return self.knowledge_store.deal_dir
+
     def _get_preferences_path(self) -> Path:
         """Get path to user preferences file"""
         # Determine knowledge base path relative to this file
@@ -133,6 +189,149 @@ class FinancialAnalystDialog:
         except Exception as e:
             print(f"Could not save preferences: {e}")
 
+    def save_valuation_version(self, model: Dict, minor: bool = False, notes: str = "") -> str:
+        """
+        Store a valuation model as the next version (delta against the previous one).
+
+        Records `valuation_version` and one `assumption_change` per changed
+        `assumptions.*` field in the knowledge base, which feeds the
+        valuation-history view and the next-action rules. Returns the new
+        version id and makes it the current version.
+        """
+        version = self.valuation_store.next_version(minor=minor)
+        record = self.valuation_store.commit(version, model, notes=notes)
+
+        summary = model.get('valuation', {}) if isinstance(model.get('valuation'), dict) else {}
+        event = {'version': version, 'date': record.date, 'notes': notes}
+        for key in ('method', 'range', 'midpoint'):
+            value = model.get(key, summary.get(key))
+            if value is not None:
+                event[key] = value
+        self.knowledge_store.append('valuation_version', event)
+        for key, value in record.changed.items():
+            if key.startswith(ASSUMPTION_PREFIX):
+                self.knowledge_store.append('assumption_change', {
+                    'assumption': key[len(ASSUMPTION_PREFIX):],
+                    'value': value,
+                    'version': version,
+                    'rationale': notes
+                })
+        self.knowledge_store.refresh_views()
+
+        self.state.current_valuation_version = version
+        self.state.analysis_completed['valuation_created'] = True
+        self.state.session_history.append({"action": "save_valuation_version", "version": version})
+        return version
+
+    def assumption_history(self, versions: Optional[List[str]] = None) -> str:
+        """Markdown "Assumption Changes Over Time" table for the stored versions"""
+        fields = {}
+        for version in versions or self.valuation_store.versions():
+            for key in flatten_model(self.valuation_store.get(version)):
+                if key.startswith(ASSUMPTION_PREFIX):
+                    fields.setdefault(key, key[len(ASSUMPTION_PREFIX):].replace('_', ' ').title())
+        return self.valuation_store.render_change_table(fields, versions)
+
+    def compare_valuation_versions(self, old: str, new: Optional[str] = None) -> Dict:
+        """Changed model fields between two versions (default: against current)"""
+        new = new or self.state.current_valuation_version
+        return {
+            "from": old,
+            "to": new,
+            "changes": self.valuation_store.diff(old, new)
+        }
+
+    def export_valuation_model(self, sheets: Dict[str, SheetData], version: Optional[str] = None) -> WriteResult:
+        """
+        Write {deal}_Valuation_Model_v{version}.xlsx (default: current version).
+
+        Sheets unchanged since the last export are carried over, not rewritten.
+        """
+        version = version or self.state.current_valuation_version or "1.0"
+        result = self.model_writer.write(version, sheets)
+        self.state.session_history.append({
+            "action": "export_valuation_model",
+            "version": version,
+            "written": result.written,
+            "reused": result.reused
+        })
+        return result
+
+    def _comparables_dir(self) -> Path:
+        return self._get_deal_dir() / "comparables"
+
+    def multiples_valuation(self, *paths: Path, kinds: Optional[List[str]] = None,
+                            scenarios: Optional[Dict[str, tuple]] = None, **filters) -> Dict:
+        """
+        Multiples valuation (workflow step 4) against peers/precedents.
+
+        paths default to the CSV/Parquet files in the deal's `comparables/`
+        folder; filters are PeerFilter fields (sectors, year_from, ...).
+        scenarios maps name -> (revenue, ebitda); default is the current
+        valuation version. Loaded datasets and peer sets are cached, so
+        re-running with other scenarios only re-applies the multiples.
+        """
+        paths = paths or tuple(find_datasets(self._comparables_dir()))
+        if not paths:
+            return {"error": f"No comparables files - add CSV/Parquet files to {self._comparables_dir()}"}
+
+        if scenarios is None:
+            version = self.state.current_valuation_version
+            if not version or version not in self.valuation_store.versions():
+                return {"error": "No valuation version yet - pass scenarios as {name: (revenue, ebitda)}"}
+            model = self.valuation_store.get(version)
+            missing = DCFInputs.missing(model, ('revenue', 'ebitda_margin'))
+            if missing:
+                return {"error": f"Valuation v{version} has no {', '.join(missing)} - "
+                                 f"pass scenarios as {{name: (revenue, ebitda)}}"}
+            inputs = DCFInputs.from_model(model)
+            scenarios = {"base": (inputs.revenue, inputs.revenue * inputs.ebitda_margin + inputs.ebitda_adjustments)}
+
+        dataset = self.comparables.load(*paths, kinds=kinds)
+        peer_set = dataset.select(PeerFilter(**filters))
+        self.state.session_history.append({"action": "multiples_valuation", "peers": len(peer_set.rows)})
+        return {
+            "peers": peer_set.names,
+            "stats": {m: vars(dataset.stats(peer_set, m)) for m in ('ev_revenue', 'ev_ebitda')},
+            "implied_ev": dataset.implied_values(peer_set, scenarios)
+        }
+
+    def load_qoe_ledger(self, path: Path) -> QoEEngine:
+        """Load a monthly P&L ledger export and propose normalization adjustments"""
+        self.qoe_engine = QoEEngine(QoELedger.from_csv(Path(path)))
+        self.qoe_engine.suggest_rules()
+        self.state.session_history.append({"action": "load_qoe_ledger", "path": str(path)})
+        return self.qoe_engine
+
+    def set_qoe_adjustment(self, rule_id: str, accepted: bool) -> float:
+        """Accept or reject an add-back; returns the new LTM normalized EBITDA"""
+        self.qoe_engine.set_status(rule_id, 'accepted' if accepted else 'rejected')
+        self.state.session_history.append({"action": "qoe_adjustment", "rule": rule_id, "accepted": accepted})
+        if all(rule.status != 'pending' for rule in self.qoe_engine.rules.values()):
+            self.state.analysis_completed['qoe_completed'] = True
+        return self.qoe_engine.bridge()['LTM']['normalized']
+
+    def set_qoe_target(self, rule_id: str, target_monthly: float) -> float:
+        """Set the market-level monthly amount of a normalization (owner salary, rent); returns LTM normalized EBITDA"""
+        self.qoe_engine.set_target(rule_id, target_monthly)
+        self.state.session_history.append({"action": "qoe_target", "rule": rule_id, "target_monthly": target_monthly})
+        return self.qoe_engine.bridge()['LTM']['normalized']
+
+    def analyze_working_capital(self, *paths: Path, exclude_months: List[str] = ()) -> Dict:
+        """
+        Stream AR/AP/inventory exports (CSV/XLSX) and compute DSO/DPO/DIO,
+        seasonality and the normalized NWC peg.
+        """
+        self.nwc_engine = NWCEngine.load(*paths)
+        summary = self.nwc_engine.summary()
+        summary['peg'] = self.nwc_engine.peg(exclude=exclude_months)
+        self.state.session_history.append({
+            "action": "analyze_working_capital",
+            "files": [str(p) for p in paths],
+            "peg": summary['peg']['peg']
+        })
+        return summary
+
     def show_mode_selection(self) -> Dict:
         """
         Present mode selection interface to user.
@@ -400,6 +599,16 @@ class FinancialAnalystDialog:
             "Choose a focus area, and I'll ask questions and make improvements based on your feedback."
         )
 
+        if find_datasets(self._comparables_dir()):
+            refinement["dialog_options"].append({
+                "id": "multiples_check",
+                "label": "Multiples Cross-Check",
+                "description": "Apply peer and precedent EV/Revenue and EV/EBITDA multiples to the current model"
+            })
+
+        if len(self.valuation_store.versions()) > 1:
+            refinement["assumption_history"] = self.assumption_history()
+
         return refinement
 
     def handle_devils_advocate(self) -> Dict:
@@ -417,56 +626,19 @@ class FinancialAnalystDialog:
         }
 
         # Generate challenges based on current analysis
-        challenge["challenge_areas"] = [
-            {
-                "category": "Revenue Assumptions",
-                "challenges": [
-                    "What if revenue growth is half your projection?",
-                    "What if a major customer leaves?",
-                    "Are you overstating market size or share?"
-                ]
-            },
-            {
-                "category": "Cost Structure",
-                "challenges": [
-                    "Have you accounted for margin compression as you scale?",
-                    "What if key supplier prices increase 20%?",
-                    "Are there hidden fixed costs that emerge at higher volumes?"
-                ]
-            },
-            {
-                "category": "Working Capital",
-                "challenges": [
-                    "Is working capital really sustainable at these levels?",
-                    "What if payment terms worsen?",
-                    "Have you stress-tested inventory assumptions?"
-                ]
-            },
-            {
-                "category": "Discount Rate (WACC)",
-                "challenges": [
-                    "Is your WACC too low given company-specific risks?",
-                    "What if beta is higher for this industry?",
-                    "Have you adequately priced in execution risk?"
-                ]
-            },
-            {
-                "category": "Terminal Value",
-                "challenges": [
-                    "Is perpetual growth rate too optimistic?",
-                    "What if the business model becomes obsolete?",
-                    "Are you assuming too high an exit multiple?"
-                ]
-            },
-            {
-                "category": "EBITDA Adjustments",
-                "challenges": [
-                    "Are your add-backs truly non-recurring?",
-                    "What if buyer doesn't accept these normalizations?",
-                    "Have you been too aggressive with adjustments?"
-                ]
+        challenge["challenge_areas"] = challenge_areas()
+
+        # Quantify each challenge against the current valuation model
+        runner, error = self._stress_runner()
+        if runner is None:
+            challenge["stress_error"] = error
+        else:
+            report = runner.run(max_order=1, include_all=False)
+            challenge["base_ev"] = report.base_ev
+            challenge["ev_impacts"] = {
+                row["challenge"]: {"ev_impact": row["ev_impact"], "ev_impact_pct": row["ev_impact_pct"]}
+                for row in runner.tornado(report)
             }
-        ]
 
         challenge["workflow"] = {
             "step_1": "Choose which areas to challenge",
@@ -481,7 +653,7 @@ class FinancialAnalystDialog:
             {
                 "id": "challenge_all",
                 "label": "Challenge Everything",
-                "description": "Full adversarial review of all assumptions"
+                "description": "Full adversarial review of all assumptions, ranked by EV impact (tornado)"
             },
             {
                 "id": "challenge_select",
@@ -497,6 +669,96 @@ class FinancialAnalystDialog:
 
         return challenge
 
+    def handle_qoe_analysis(self) -> Dict:
+        """
+        Quality of Earnings dialog: review proposed add-backs one by one.
+        """
+        qoe = {
+            "mode": "qoe_analysis",
+            "title": "Quality of Earnings - EBITDA Normalization",
+            "description": (
+                "I'll start from reported EBITDA and propose adjustments. "
+                "Accept or reject each one - normalized EBITDA updates immediately."
+            ),
+            "adjustments": [],
+            "bridge": [],
+            "buyer_risk": []
+        }
+
+        if self.qoe_engine is None:
+            qoe["prompt"] = "Upload the monthly P&L / ledger export (CSV: period, account, amount) to begin."
+            return qoe
+
+        impacts = self.qoe_engine.rule_impacts()
+        qoe["adjustments"] = [
+            {
+                "id": rule_id,
+                "label": rule.name,
+                "accounts": rule.accounts,
+                "ltm_impact": impacts[rule_id],
+                "status": rule.status,
+                "needs_target": self.qoe_engine.needs_target(rule_id)
+            }
+            for rule_id, rule in self.qoe_engine.rules.items()
+        ]
+        qoe["bridge"] = self.qoe_engine.summary_lines()
+        qoe["buyer_risk"] = [
+            {"id": rule_id, "label": self.qoe_engine.rules[rule_id].name, "ltm_at_risk": amount}
+            for rule_id, amount in self.qoe_engine.rejection_sensitivity()
+        ]
+        qoe["prompt"] = "Which adjustments do you want to accept? I'll challenge anything that looks recurring."
+        if any(adj["needs_target"] for adj in qoe["adjustments"]):
+            qoe["prompt"] += " Normalizations need the market-level monthly amount first (e.g. a market salary)."
+        return qoe
+
+    def _stress_runner(self) -> Tuple[Optional[StressRunner], Optional[str]]:
+        """
+        Stress runner on the current valuation version, or (None, error)
+        before a valuation exists or when it lacks revenue, margin or WACC.
+        """
+        version = self.state.current_valuation_version
+        if not version or version not in self.valuation_store.versions():
+            return None, "No valuation version yet - build the valuation model first"
+        model = self.valuation_store.get(version)
+        missing = DCFInputs.missing(model)
+        if missing:
+            return None, f"Valuation v{version} has no {', '.join(missing)} - add it to the model first"
+        inputs = DCFInputs.from_model(model)
+        if not inputs.ebitda_adjustments and self.qoe_engine is not None:
+            adjustments = self.qoe_engine.bridge()['LTM']['adjustments']
+            inputs.ebitda_adjustments = sum(adjustments.values())
+        return StressRunner(inputs), None
+
+    def challenge_everything(self, max_order: int = 2) -> Dict:
+        """
+        "Challenge Everything": every challenge and every combination up to
+        max_order evaluated in one batch, ranked as a tornado.
+        """
+        runner, error = self._stress_runner()
+        if runner is None:
+            return {"error": error}
+
+        report = runner.run(max_order=max_order)
+        self.state.analysis_completed['challenged'] = True
+        self.state.session_history.append({"action": "challenge_everything", "scenarios": len(report.combinations)})
+        return {
+            "base_ev": report.base_ev,
+            "tornado": runner.tornado(report),
+            "worst_combinations": [
+                {
+                    "challenges": [runner.transforms[i].challenge for i in r.challenge_ids],
+                    "ev_impact": r.impact,
+                    "ev_impact_pct": r.impact_pct,
+                    "interaction": r.interaction
+                }
+                for r in report.combinations[:5]
+            ],
+            "all_combined": {
+                "ev_impact": report.all_combined.impact,
+                "ev_impact_pct": report.all_combined.impact_pct
+            } if report.all_combined else None
+        }
+
     def handle_sensitivity_analysis(self) -> Dict:
         """
         Interactive sensitivity analysis workflow.
@@ -578,7 +840,8 @@ class FinancialAnalystDialog:
             DialogMode.DOCUMENT_ANALYSIS: self._format_document_analysis(),
             DialogMode.EXCEL_REFINEMENT: self._format_excel_refinement(),
             DialogMode.DEVILS_ADVOCATE: self._format_devils_advocate(),
-            DialogMode.SENSITIVITY_ANALYSIS: self._format_sensitivity_analysis()
+            DialogMode.SENSITIVITY_ANALYSIS: self._format_sensitivity_analysis(),
+            DialogMode.QOE_ANALYSIS: self._format_qoe_analysis()
         }
 
         return prompts.get(mode, "")
@@ -653,6 +916,10 @@ class FinancialAnalystDialog:
             prompt += f"{i}. **{option['label']}**\n"
             prompt += f"   {option['description']}\n\n"
 
+        if refinement.get('assumption_history'):
+            prompt += "**Assumption Changes Over Time:**\n\n"
+            prompt += refinement['assumption_history'] + "\n"
+
         return prompt
 
     def _format_devils_advocate(self) -> str:
@@ -663,10 +930,14 @@ class FinancialAnalystDialog:
         prompt += f"{challenge['description']}\n\n"
         prompt += "**Challenge Areas:**\n\n"
 
+        impacts = challenge.get('ev_impacts', {})
         for area in challenge['challenge_areas']:
             prompt += f"### {area['category']}\n"
             for ch in area['challenges']:
-                prompt += f"- {ch}\n"
+                if ch in impacts:
+                    prompt += f"- {ch} → EV {impacts[ch]['ev_impact_pct']:+.1%} ({impacts[ch]['ev_impact']:+,.0f})\n"
+                else:
+                    prompt += f"- {ch}\n"
             prompt += "\n"
 
         prompt += "\n**How would you like to proceed?**\n\n"
@@ -675,6 +946,32 @@ class FinancialAnalystDialog:
 
         return prompt
 
+    def _format_qoe_analysis(self) -> str:
+        """Format QoE normalization dialog"""
+        qoe = self.handle_qoe_analysis()
+
+        prompt = f"# {qoe['title']}\n\n"
+        prompt += f"{qoe['description']}\n\n"
+
+        if qoe['bridge']:
+            prompt += "```\n" + "\n".join(qoe['bridge']) + "\n```\n\n"
+
+        if qoe['adjustments']:
+            prompt += "**Proposed Adjustments (LTM):**\n\n"
+            for i, adj in enumerate(qoe['adjustments'], 1):
+                impact = "needs market-level target" if adj['needs_target'] else f"{adj['ltm_impact']:,.0f}"
+                prompt += f"{i}. **{adj['label']}** ({adj['status']}): {impact}\n"
+                prompt += f"   Accounts: {', '.join(adj['accounts'])}\n\n"
+
+        if qoe['buyer_risk']:
+            prompt += "**If the buyer rejects:**\n\n"
+            for risk in qoe['buyer_risk']:
+                prompt += f"- {risk['label']}: -{risk['ltm_at_risk']:,.0f} LTM EBITDA\n"
+            prompt += "\n"
+
+        prompt += qoe['prompt']
+        return prompt
+
     def _format_sensitivity_analysis(self) -> str:
         """Format sensitivity analysis options"""
         sensitivity = self.handle_sensitivity_analysis()
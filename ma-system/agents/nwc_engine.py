@@ -0,0 +1,507 @@
+"""
+Net Working Capital Engine
+
+Computes the working-capital analysis for the valuation and the SPA peg:
+DSO / DPO / DIO, rolling averages, monthly seasonality and a normalized
+NWC peg from AR, AP and inventory balances plus revenue and COGS.
+
+Ledger exports (CSV or XLSX, daily or monthly, possibly millions of open
+item rows) are streamed: rows are folded into per-day balances and
+monthly flow totals as they are read, so memory grows with the number of
+days covered, not the number of rows. XLSX sheets are read with an
+incremental XML parser, never loaded as a whole.
+
+Rolling windows run over the monthly arrays with running sums (one pass
+per window, independent of the window length).
+"""
+
+import calendar
+import csv
+import re
+import zipfile
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+
+try:
+    from .qoe_engine import parse_amount
+except ImportError:  # Running as a script from the agents directory
+    from qoe_engine import parse_amount
+
+
+BALANCE_ITEMS = ('ar', 'ap', 'inventory')
+FLOW_ITEMS = ('revenue', 'cogs')
+
+# Accepted column headers / item labels (lowercase, EN/DE) -> item
+ITEM_ALIASES = {
+    'ar': ['ar', 'receivable', 'forderung', 'debitor'],
+    'ap': ['ap', 'payable', 'verbindlichkeit', 'kreditor'],
+    'inventory': ['inventory', 'inventories', 'stock', 'vorrat', 'vorraete', 'lager'],
+    'cogs': ['cogs', 'cost of goods sold', 'cost of sales', 'cost of revenue', 'materialaufwand',
+             'wareneinsatz', 'umsatzkosten', 'herstellungskosten'],
+    'revenue': ['revenue', 'sales', 'umsatz', 'umsatzerloese']
+}
+# Longest alias first, so "cost of sales" / "umsatzkosten" win over "sales" / "umsatz"
+_ALIASES_BY_LENGTH = sorted(((alias, item) for item, aliases in ITEM_ALIASES.items() for alias in aliases),
+                            key=lambda pair: -len(pair[0]))
+DATE_COLUMNS = ('date', 'datum', 'period', 'month', 'monat', 'stichtag')
+ITEM_COLUMNS = ('item', 'type', 'account', 'konto', 'category')
+AMOUNT_COLUMNS = ('amount', 'balance', 'value', 'betrag', 'saldo')
+
+_EXCEL_EPOCH = date(1899, 12, 30)
+_YYYYMM = re.compile(r'((?:19|20)\d{2})(0[1-9]|1[0-2])$')   # 202301 - never a plausible Excel serial
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+
+def match_item(label: str) -> Optional[str]:
+    """
+    Map a column header or item label to ar/ap/inventory/revenue/cogs.
+
+    >>> match_item("Cost of sales"), match_item("Umsatzkosten"), match_item("Umsatzerlöse"), match_item("AR")
+    ('cogs', 'cogs', 'revenue', 'ar')
+    """
+    text = label.strip().lower().replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
+    for alias, item in _ALIASES_BY_LENGTH:
+        if text == alias or (len(alias) > 2 and alias in text):
+            return item
+    return None
+
+
+def _month_end(year: int, month: int) -> date:
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def parse_date(value) -> date:
+    """
+    Parse ISO, German, month (YYYY-MM, YYYYMM, MM.YYYY -> month end) or Excel serial dates.
+
+    Month formats are checked before the serial fallback:
+
+    >>> parse_date("202301"), parse_date(202302), parse_date("01.2023")
+    (datetime.date(2023, 1, 31), datetime.date(2023, 2, 28), datetime.date(2023, 1, 31))
+    >>> parse_date("31.03.2023"), parse_date("2023-04"), parse_date(45000)
+    (datetime.date(2023, 3, 31), datetime.date(2023, 4, 30), datetime.date(2023, 3, 15))
+    """
+    if isinstance(value, date):
+        return value
+    if isinstance(value, (int, float)):
+        if value == int(value) and _YYYYMM.match(str(int(value))):
+            return _month_end(int(value) // 100, int(value) % 100)
+        return _EXCEL_EPOCH + timedelta(days=int(value))
+    text = str(value).strip()
+    match = re.match(r'(\d{4})-(\d{1,2})-(\d{1,2})', text)
+    if match:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    match = re.match(r'(\d{1,2})\.(\d{1,2})\.(\d{4})', text)
+    if match:
+        return date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+    match = re.match(r'(\d{4})-(\d{1,2})$', text) or _YYYYMM.match(text)
+    if match:
+        return _month_end(int(match.group(1)), int(match.group(2)))
+    match = re.match(r'(\d{1,2})[./](\d{4})$', text)           # 01.2023 / 1/2023
+    if match:
+        return _month_end(int(match.group(2)), int(match.group(1)))
+    if re.match(r'\d+(\.\d+)?$', text):
+        return _EXCEL_EPOCH + timedelta(days=int(float(text)))
+    raise ValueError(f"Unrecognized date: {value!r}")
+
+
+def iter_csv(path: Path) -> Iterator[List[str]]:
+    """Stream CSV rows (comma or semicolon separated)"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = ';' if sample.count(';') > sample.count(',') else ','
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def iter_xlsx(path: Path, sheet: Optional[str] = None) -> Iterator[List]:
+    """
+    Stream rows of an XLSX worksheet (first sheet by default).
+
+    The sheet XML is fed to an expat parser in chunks and rows are yielded
+    as they complete - no element tree is built. Only the shared strings
+    table is held in memory.
+    """
+    with zipfile.ZipFile(path) as package:
+        shared: List[str] = []
+        if 'xl/sharedStrings.xml' in package.namelist():
+            with package.open('xl/sharedStrings.xml') as f:
+                shared = _SheetReader.shared_strings(f)
+
+        reader = _SheetReader(shared)
+        with package.open(_sheet_part(package, sheet)) as f:
+            while True:
+                chunk = f.read(1 << 16)
+                reader.parser.Parse(chunk, not chunk)
+                if reader.rows:
+                    yield from reader.rows
+                    reader.rows = []
+                if not chunk:
+                    break
+
+
+class _SheetReader:
+    """expat handlers turning <row>/<c>/<v> elements into value lists"""
+
+    def __init__(self, shared: List[str]):
+        self.shared = shared
+        self.rows: List[List] = []
+        self._row: List = []
+        self._kind: Optional[str] = None
+        self._col: Optional[int] = None
+        self._text: List[str] = []
+        self._capture = False
+        self._columns: Dict[str, int] = {}
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._chars
+
+    @staticmethod
+    def shared_strings(stream) -> List[str]:
+        strings: List[str] = []
+        parts: List[str] = []
+        state = {'capture': False}
+
+        def start(name, attrs):
+            if name == 't':
+                state['capture'] = True
+
+        def end(name):
+            if name == 't':
+                state['capture'] = False
+            elif name == 'si':
+                strings.append(''.join(parts))
+                parts.clear()
+
+        def chars(text):
+            if state['capture']:
+                parts.append(text)
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler, parser.EndElementHandler, parser.CharacterDataHandler = start, end, chars
+        parser.ParseFile(stream)
+        return strings
+
+    def _start(self, name, attrs):
+        if name == 'c':
+            self._kind = attrs.get('t')
+            self._col = self._column(attrs.get('r', ''))
+            self._text = []
+        elif name in ('v', 't'):
+            self._capture = True
+        elif name == 'row':
+            self._row = []
+
+    def _chars(self, text):
+        if self._capture:
+            self._text.append(text)
+
+    def _end(self, name):
+        if name in ('v', 't'):
+            self._capture = False
+        elif name == 'c':
+            row = self._row
+            col = self._col if self._col is not None else len(row)
+            while len(row) < col:
+                row.append(None)
+            text = ''.join(self._text)
+            if not self._text:
+                value = None
+            elif self._kind == 's':
+                value = self.shared[int(text)]
+            elif self._kind in ('inlineStr', 'str', 'b', 'e'):
+                value = text
+            else:
+                value = float(text)
+            row.append(value)
+        elif name == 'row':
+            self.rows.append(self._row)
+
+    def _column(self, ref: str) -> Optional[int]:
+        letters = ref.rstrip('0123456789')
+        if not letters:
+            return None
+        index = self._columns.get(letters)
+        if index is None:
+            index = 0
+            for char in letters:
+                index = index * 26 + ord(char) - 64
+            index = self._columns[letters] = index - 1
+        return index
+
+
+def _sheet_part(package: zipfile.ZipFile, sheet: Optional[str]) -> str:
+    with package.open('xl/workbook.xml') as f:
+        sheets = [(s.get('name'), s.get(f'{_REL_NS}id')) for _, s in iterparse(f) if s.tag == f'{_NS}sheet']
+    with package.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {r.get('Id'): r.get('Target') for _, r in iterparse(f) if r.get('Id')}
+    rel_id = next((rid for name, rid in sheets if sheet is None or name == sheet), None)
+    if rel_id is None:
+        raise ValueError(f"Sheet not found: {sheet}")
+    target = targets[rel_id].lstrip('/')
+    return target if target.startswith('xl/') else f'xl/{target}'
+
+
+@dataclass
+class NWCSeries:
+    """Monthly working-capital arrays (aligned with `months`)"""
+    months: List[str] = field(default_factory=list)                 # YYYY-MM
+    balances: Dict[str, array] = field(default_factory=dict)        # ar/ap/inventory: average balance
+    month_end: Dict[str, array] = field(default_factory=dict)       # ar/ap/inventory: last balance
+    flows: Dict[str, array] = field(default_factory=dict)           # revenue/cogs: monthly totals
+
+    @property
+    def nwc(self) -> array:
+        """Average NWC per month: AR + inventory - AP"""
+        ar, ap, inv = (self.balances.get(k) for k in BALANCE_ITEMS)
+        zeros = array('d', bytes(8 * len(self.months)))
+        ar, ap, inv = ar or zeros, ap or zeros, inv or zeros
+        return array('d', (a + i - p for a, p, i in zip(ar, ap, inv)))
+
+
+class NWCAccumulator:
+    """
+    Folds streamed balance/flow rows into per-day and per-month buckets.
+
+    Several rows for the same item and day (open items, entities) are
+    summed into that day's balance.
+    """
+
+    def __init__(self):
+        self._daily: Dict[str, Dict[date, float]] = {item: {} for item in BALANCE_ITEMS}
+        self._flows: Dict[str, Dict[str, float]] = {item: {} for item in FLOW_ITEMS}
+        self.rows = 0
+
+    def add(self, item: str, day: date, amount: float):
+        if item in self._daily:
+            bucket = self._daily[item]
+            bucket[day] = bucket.get(day, 0.0) + amount
+        elif item in self._flows:
+            month = f"{day.year}-{day.month:02d}"
+            self._flows[item][month] = self._flows[item].get(month, 0.0) + amount
+        self.rows += 1
+
+    def add_rows(self, rows: Iterable[Sequence]):
+        """
+        Consume a row stream whose first row is the header.
+
+        Wide layout: a date column plus one column per item.
+        Long layout: date, item label and amount columns.
+        """
+        rows = iter(rows)
+        header = [str(h or '').strip().lower() for h in next(rows, [])]
+        date_col = next((i for i, h in enumerate(header) if h in DATE_COLUMNS), None)
+        if date_col is None:
+            raise ValueError(f"No date column in header: {header}")
+        item_col = next((i for i, h in enumerate(header) if h in ITEM_COLUMNS), None)
+        amount_col = next((i for i, h in enumerate(header) if h in AMOUNT_COLUMNS), None)
+
+        # Ledger exports repeat the same few hundred dates millions of times
+        dates: Dict = {}
+
+        def day_of(raw) -> date:
+            day = dates.get(raw)
+            if day is None:
+                day = dates[raw] = parse_date(raw)
+            return day
+
+        if item_col is not None and amount_col is not None:
+            labels: Dict[str, Optional[str]] = {}
+            for row in rows:
+                if len(row) <= max(date_col, item_col, amount_col) or row[date_col] in (None, ''):
+                    continue
+                label = str(row[item_col] or '')
+                if label not in labels:
+                    labels[label] = match_item(label)
+                item = labels[label]
+                if item:
+                    self.add(item, day_of(row[date_col]), parse_amount(row[amount_col]))
+            return
+
+        columns = [(i, match_item(h)) for i, h in enumerate(header) if i != date_col]
+        columns = [(i, item) for i, item in columns if item]
+        for row in rows:
+            if len(row) <= date_col or row[date_col] in (None, ''):
+                continue
+            day = day_of(row[date_col])
+            for i, item in columns:
+                if i < len(row) and row[i] not in (None, ''):
+                    self.add(item, day, parse_amount(row[i]))
+
+    def series(self) -> NWCSeries:
+        """Monthly arrays: average and month-end balances, flow totals"""
+        months = set()
+        for bucket in self._daily.values():
+            months.update(f"{d.year}-{d.month:02d}" for d in bucket)
+        for bucket in self._flows.values():
+            months.update(bucket)
+        months = sorted(months)
+        index = {m: i for i, m in enumerate(months)}
+        n = len(months)
+
+        result = NWCSeries(months=months)
+        for item, bucket in self._daily.items():
+            if not bucket:
+                continue
+            sums, counts = array('d', bytes(8 * n)), array('l', bytes(array('l').itemsize * n))
+            ends, end_days = array('d', bytes(8 * n)), [None] * n
+            for day, value in bucket.items():
+                i = index[f"{day.year}-{day.month:02d}"]
+                sums[i] += value
+                counts[i] += 1
+                if end_days[i] is None or day > end_days[i]:
+                    end_days[i], ends[i] = day, value
+            result.balances[item] = array('d', (s / c if c else 0.0 for s, c in zip(sums, counts)))
+            result.month_end[item] = ends
+        for item, bucket in self._flows.items():
+            if bucket:
+                result.flows[item] = array('d', (bucket.get(m, 0.0) for m in months))
+        return result
+
+
+def rolling_mean(values: Sequence[float], window: int) -> array:
+    """Trailing mean over `window` months (shorter at the start), one pass"""
+    out = array('d', bytes(8 * len(values)))
+    total = 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        out[i] = total / min(i + 1, window)
+    return out
+
+
+def rolling_sum(values: Sequence[float], window: int) -> array:
+    """Trailing sum over `window` months, one pass"""
+    out = array('d', bytes(8 * len(values)))
+    total = 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        out[i] = total
+    return out
+
+
+class NWCEngine:
+    """Working-capital metrics over a monthly NWCSeries"""
+
+    def __init__(self, series: NWCSeries):
+        self.series = series
+
+    @classmethod
+    def load(cls, *paths: Path, sheet: Optional[str] = None) -> 'NWCEngine':
+        """Stream one or more CSV/XLSX exports (e.g. separate AR, AP, stock files)"""
+        accumulator = NWCAccumulator()
+        for path in paths:
+            path = Path(path)
+            rows = iter_xlsx(path, sheet) if path.suffix.lower() in ('.xlsx', '.xlsm') else iter_csv(path)
+            accumulator.add_rows(rows)
+        return cls(accumulator.series())
+
+    def _days(self, window: int) -> array:
+        """Calendar days covered by each trailing window"""
+        days = array('d', (calendar.monthrange(int(m[:4]), int(m[5:]))[1] for m in self.series.months))
+        return rolling_sum(days, window)
+
+    def days_metrics(self, window: int = 3) -> Dict[str, array]:
+        """
+        DSO, DPO and DIO per month over trailing `window`-month flows:
+        balance / flow * days in window.
+        """
+        days = self._days(window)
+        flows = self.series.flows
+        revenue = rolling_sum(flows['revenue'], window) if 'revenue' in flows else None
+        cogs = rolling_sum(flows['cogs'], window) if 'cogs' in flows else None
+
+        def ratio(balance: Optional[array], flow: Optional[array]) -> Optional[array]:
+            if balance is None or flow is None:
+                return None
+            return array('d', (b / abs(f) * d if f else 0.0 for b, f, d in zip(balance, flow, days)))
+
+        metrics = {
+            'dso': ratio(self.series.balances.get('ar'), revenue),
+            'dpo': ratio(self.series.balances.get('ap'), cogs),
+            'dio': ratio(self.series.balances.get('inventory'), cogs)
+        }
+        metrics = {k: v for k, v in metrics.items() if v is not None}
+        if {'dso', 'dpo', 'dio'} <= metrics.keys():
+            metrics['ccc'] = array('d', (s + i - p for s, p, i in zip(metrics['dso'], metrics['dpo'], metrics['dio'])))
+        return metrics
+
+    def seasonality(self) -> Dict[int, float]:
+        """
+        NWC seasonality index per calendar month (1.0 = average month),
+        measured against each year's own mean so growth does not skew it.
+        """
+        nwc = self.series.nwc
+        by_year: Dict[str, List[Tuple[int, float]]] = {}
+        for month, value in zip(self.series.months, nwc):
+            by_year.setdefault(month[:4], []).append((int(month[5:]), value))
+
+        ratios: Dict[int, List[float]] = {}
+        for values in by_year.values():
+            mean = sum(v for _, v in values) / len(values)
+            if len(values) < 12 or not mean:
+                continue                                # Partial years would bias the index
+            for month, value in values:
+                ratios.setdefault(month, []).append(value / mean)
+        return {m: round(sum(r) / len(r), 4) for m, r in sorted(ratios.items())}
+
+    def peg(self, months: int = 12, exclude: Iterable[str] = ()) -> Dict:
+        """
+        Normalized NWC peg: trailing average NWC over the last `months`
+        months, excluding flagged one-off months (YYYY-MM).
+        """
+        excluded = set(exclude)
+        window = [(m, v) for m, v in zip(self.series.months, self.series.nwc)][-months:]
+        used = [(m, v) for m, v in window if m not in excluded]
+        values = [v for _, v in used]
+        return {
+            'peg': sum(values) / len(values) if values else 0.0,
+            'from': used[0][0] if used else None,
+            'to': used[-1][0] if used else None,
+            'months_used': len(used),
+            'excluded': sorted(excluded & {m for m, _ in window}),
+            'min': min(values) if values else 0.0,
+            'max': max(values) if values else 0.0
+        }
+
+    def closing_adjustment(self, closing_nwc: float, closing_month: int, peg: Optional[float] = None) -> Dict:
+        """
+        Purchase price adjustment at closing vs. the peg, with the
+        seasonally expected NWC for the closing month for context.
+        """
+        peg = peg if peg is not None else self.peg()['peg']
+        expected = peg * self.seasonality().get(closing_month, 1.0)
+        return {
+            'peg': peg,
+            'seasonal_expectation': expected,
+            'closing_nwc': closing_nwc,
+            'price_adjustment': closing_nwc - peg,
+            'seasonal_deviation': closing_nwc - expected
+        }
+
+    def summary(self, window: int = 3, rolling: int = 12) -> Dict:
+        """Latest metrics, rolling NWC average, seasonality and peg"""
+        metrics = self.days_metrics(window)
+        nwc = self.series.nwc
+        return {
+            'months': len(self.series.months),
+            'period': f"{self.series.months[0]} - {self.series.months[-1]}" if self.series.months else '',
+            'latest': {k: round(v[-1], 1) for k, v in metrics.items() if len(v)},
+            'average': {k: round(sum(v[-rolling:]) / len(v[-rolling:]), 1) for k, v in metrics.items() if len(v)},
+            'nwc_latest': nwc[-1] if len(nwc) else 0.0,
+            'nwc_rolling_average': rolling_mean(nwc, rolling)[-1] if len(nwc) else 0.0,
+            'seasonality': self.seasonality(),
+            'peg': self.peg(rolling)
+        }
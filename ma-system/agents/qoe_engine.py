@@ -0,0 +1,414 @@
+"""
+Quality of Earnings Engine
+
+Backs the financial analyst's `qoe_analysis` option. Monthly P&L line
+items are held as columnar arrays (one float array per account over all
+periods); every add-back or normalization rule is compiled once into an
+adjustment vector over the same periods.
+
+Accepting or rejecting an add-back adds or subtracts one vector from the
+running adjusted-EBITDA array, so normalized EBITDA (monthly, per fiscal
+year, LTM) updates instantly even for five years of monthly data. LTM
+normalized EBITDA for every combination of rule toggles is computed in
+one subset-sum pass ("what if the buyer rejects these add-backs?").
+
+Amounts are signed: revenue positive, costs negative.
+"""
+
+import csv
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Accounts below EBITDA (EN/DE)
+NON_EBITDA = re.compile(
+    r'(depreciation|amortization|amortisation|interest|income tax|abschreibung|zins|ertragsteuer|\bafa\b)', re.I
+)
+
+# Rule templates from the common normalization adjustments (financial-analyst.md)
+RULE_TEMPLATES = {
+    'owner_compensation': {
+        'name': 'Owner compensation normalization', 'kind': 'normalize',
+        'keywords': ['owner', 'gesellschafter', 'geschaeftsfuehrer', 'managing director salary']
+    },
+    'one_time_expenses': {
+        'name': 'One-time expenses (litigation, restructuring)', 'kind': 'addback',
+        'keywords': ['litigation', 'legal settlement', 'restructuring', 'one-time', 'einmalig', 'rechtsstreit']
+    },
+    'non_recurring_revenue': {
+        'name': 'Non-recurring revenue', 'kind': 'addback',
+        'keywords': ['non-recurring', 'insurance proceeds', 'gain on sale', 'sonstige ertraege']
+    },
+    'related_party': {
+        'name': 'Related party transactions', 'kind': 'normalize',
+        'keywords': ['related party', 'nahestehend']
+    },
+    'market_rent': {
+        'name': 'Above/below market rents', 'kind': 'normalize',
+        'keywords': ['rent', 'miete', 'mietaufwand', 'raummiete']
+    },
+    'management_fees': {
+        'name': 'Management fees', 'kind': 'addback',
+        'keywords': ['management fee', 'holding fee', 'konzernumlage']
+    },
+    'stock_compensation': {
+        'name': 'Stock-based compensation', 'kind': 'addback',
+        'keywords': ['stock-based', 'share-based', 'stock compensation', 'esop', 'vsop']
+    },
+    'consulting': {
+        'name': 'Non-recurring consulting', 'kind': 'addback',
+        'keywords': ['consulting', 'transaction cost', 'beratung', 'm&a advisory']
+    }
+}
+
+RULE_STATUSES = ('pending', 'accepted', 'rejected')
+MAX_COMBINATION_RULES = 16   # 2^16 toggle combinations
+
+
+def _period(value: str) -> str:
+    """
+    Normalize a date or period to YYYY-MM.
+
+    >>> _period("2023-03-31"), _period("202303"), _period("03.2023"), _period("31.03.2023")
+    ('2023-03', '2023-03', '2023-03', '2023-03')
+    >>> _period("2023-13")
+    Traceback (most recent call last):
+    ...
+    ValueError: Unrecognized period: '2023-13'
+    """
+    text = str(value).strip()
+    patterns = (
+        (r'(\d{4})[-/.]?(\d{1,2})', 1, 2),
+        (r'(\d{1,2})[./](\d{4})', 2, 1),            # 03.2023 / 3/2023
+        (r'\d{1,2}\.(\d{1,2})\.(\d{4})', 2, 1)      # 31.03.2023
+    )
+    for pattern, year, month in patterns:
+        match = re.match(pattern, text)
+        if match and 1 <= int(match.group(month)) <= 12:
+            return f"{match.group(year)}-{int(match.group(month)):02d}"
+    raise ValueError(f"Unrecognized period: {value!r}")
+
+
+_FOLDING = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+
+def keyword_pattern(keyword: str) -> 're.Pattern':
+    """
+    Whole-word pattern for a rule keyword (plural/inflected endings allowed).
+
+    >>> bool(keyword_pattern('rent').search('office rents')), bool(keyword_pattern('rent').search('parent company fee'))
+    (True, False)
+    """
+    words = [re.escape(w) for w in re.split(r'[\s\-]+', keyword.lower().translate(_FOLDING)) if w]
+    return re.compile(r'(?<![a-z0-9])' + r'[\s\-]+'.join(words) + r'(?:s|es|n|en|e|er|al)?(?![a-z0-9])')
+
+
+# 1.234.567 / 12.500 / 1,234 - one separator, used only for thousands groups
+_GROUPED = re.compile(r'[1-9]\d{0,2}([.,])\d{3}(?:\1\d{3})*')
+
+
+def parse_amount(value) -> float:
+    """
+    Parse EN/DE formatted amounts ("1,234.56", "1.234,56", "(500)").
+
+    A lone separator followed by groups of exactly three digits is a
+    thousands separator, dots included:
+
+    >>> parse_amount("1.234,56"), parse_amount("1,234.56"), parse_amount("(500)")
+    (1234.56, 1234.56, -500.0)
+    >>> parse_amount("-1.234.567"), parse_amount("12.500"), parse_amount("12,500")
+    (-1234567.0, 12500.0, 12500.0)
+    >>> parse_amount("12.5"), parse_amount("0.125"), parse_amount("1234.567")
+    (12.5, 0.125, 1234.567)
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        if not _GROUPED.fullmatch(str(value).lstrip('-')):
+            return float(value)                  # Plain numbers (the bulk of ledger rows)
+    except (TypeError, ValueError):
+        pass
+    text = str(value or '').strip().replace(' ', '')
+    if not text:
+        return 0.0
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()')
+    if text.startswith('-'):
+        negative, text = not negative, text[1:]
+    grouped = _GROUPED.fullmatch(text)
+    if grouped:
+        text = text.replace(grouped.group(1), '')
+    elif ',' in text and '.' in text:
+        # 1.234,56 (DE) vs 1,234.56 (EN): the later separator is the decimal one
+        text = text.replace('.', '').replace(',', '.') if text.rfind(',') > text.rfind('.') else text.replace(',', '')
+    elif ',' in text:
+        text = text.replace(',', '.')
+    amount = float(text)
+    return -amount if negative else amount
+
+
+@dataclass
+class AdjustmentRule:
+    """One add-back or normalization, compiled to a vector over the ledger periods"""
+    rule_id: str
+    name: str
+    kind: str                                     # addback | normalize | fixed
+    accounts: List[str] = field(default_factory=list)
+    share: float = 1.0                            # Portion of the matched amounts added back
+    target_monthly: Optional[float] = None        # normalize: market-level monthly amount (signed); no impact until set
+    fixed_monthly: float = 0.0                    # fixed: flat monthly adjustment
+    start: Optional[str] = None                   # YYYY-MM, inclusive
+    end: Optional[str] = None
+    status: str = 'pending'
+    rationale: str = ''
+
+
+class QoELedger:
+    """
+    Columnar monthly P&L: periods x accounts.
+
+    Each account is an array('d') aligned with `periods`; reported EBITDA
+    is kept as a precomputed array over the EBITDA accounts.
+    """
+
+    def __init__(self, periods: List[str]):
+        self.periods = sorted(set(periods))
+        self._period_index = {p: i for i, p in enumerate(self.periods)}
+        self.accounts: Dict[str, array] = {}
+        self.in_ebitda: Dict[str, bool] = {}
+        self.reported = array('d', bytes(8 * len(self.periods)))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> 'QoELedger':
+        """
+        Build from ledger rows: period/date, account, amount[, category].
+
+        Rows are aggregated to monthly buckets per account.
+        """
+        buckets: Dict[Tuple[str, str], float] = {}
+        categories: Dict[str, str] = {}
+        for row in rows:
+            account = str(row.get('account') or row.get('line_item') or '').strip()
+            if not account:
+                continue
+            period = _period(row.get('period') or row.get('date') or row.get('month'))
+            key = (account, period)
+            buckets[key] = buckets.get(key, 0.0) + parse_amount(row.get('amount'))
+            if row.get('category'):
+                categories[account] = str(row['category'])
+
+        ledger = cls([period for _, period in buckets])
+        for (account, period), amount in buckets.items():
+            if account not in ledger.accounts:
+                ledger._add_account(account, categories.get(account, ''))
+            ledger.accounts[account][ledger._period_index[period]] += amount
+        ledger._recompute_reported()
+        return ledger
+
+    @classmethod
+    def from_csv(cls, path: Path) -> 'QoELedger':
+        """Stream a ledger CSV (columns: period|date|month, account, amount[, category])"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            return cls.from_rows({k.strip().lower(): v for k, v in raw.items() if k} for raw in reader)
+
+    def _add_account(self, account: str, category: str = ''):
+        self.accounts[account] = array('d', bytes(8 * len(self.periods)))
+        self.in_ebitda[account] = not NON_EBITDA.search(f"{account} {category}")
+
+    def _recompute_reported(self):
+        reported = array('d', bytes(8 * len(self.periods)))
+        for account, values in self.accounts.items():
+            if self.in_ebitda[account]:
+                for i, value in enumerate(values):
+                    reported[i] += value
+        self.reported = reported
+
+    def window(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        """Index range [lo, hi) of periods within start..end (inclusive)"""
+        lo = 0 if start is None else bisect_left(self.periods, start)
+        hi = len(self.periods) if end is None else bisect_right(self.periods, end)
+        return lo, hi
+
+    def match_accounts(self, keywords: Iterable[str]) -> List[str]:
+        """EBITDA accounts whose name contains any keyword as a whole word"""
+        patterns = [keyword_pattern(k) for k in keywords]
+        return [a for a in self.accounts if self.in_ebitda[a]
+                and any(p.search(a.lower().translate(_FOLDING)) for p in patterns)]
+
+
+class QoEEngine:
+    """
+    Normalized EBITDA over a ledger with toggleable adjustment rules.
+
+    `adjusted` always holds reported EBITDA plus all accepted adjustment
+    vectors; toggling a rule touches only that rule's vector.
+    """
+
+    def __init__(self, ledger: QoELedger):
+        self.ledger = ledger
+        self.rules: Dict[str, AdjustmentRule] = {}
+        self._vectors: Dict[str, array] = {}
+        self.adjusted = array('d', ledger.reported)
+
+    # ---- Rules ------------------------------------------------------------
+
+    def add_rule(self, rule: AdjustmentRule) -> AdjustmentRule:
+        """Compile a rule to its adjustment vector (replaces a rule with the same id)"""
+        if rule.rule_id in self.rules:
+            self.remove_rule(rule.rule_id)
+
+        n = len(self.ledger.periods)
+        vector = array('d', bytes(8 * n))
+        lo, hi = self.ledger.window(rule.start, rule.end)
+        accounts = [self.ledger.accounts[a] for a in rule.accounts if a in self.ledger.accounts]
+
+        for i in range(lo, hi):
+            actual = sum(values[i] for values in accounts)
+            if rule.kind == 'addback':
+                vector[i] = -actual * rule.share
+            elif rule.kind == 'normalize':
+                # Without a market-level target the rule stays proposed at zero impact
+                vector[i] = (rule.target_monthly - actual) if rule.target_monthly is not None else 0.0
+            else:
+                vector[i] = rule.fixed_monthly
+
+        self.rules[rule.rule_id] = rule
+        self._vectors[rule.rule_id] = vector
+        if rule.status == 'accepted':
+            self._apply(vector, 1.0)
+        return rule
+
+    def remove_rule(self, rule_id: str):
+        rule = self.rules.pop(rule_id)
+        vector = self._vectors.pop(rule_id)
+        if rule.status == 'accepted':
+            self._apply(vector, -1.0)
+
+    def suggest_rules(self) -> List[AdjustmentRule]:
+        """Pending rules for accounts matching the common normalization templates"""
+        suggested = []
+        claimed = {a for rule in self.rules.values() for a in rule.accounts}
+        for rule_id, template in RULE_TEMPLATES.items():
+            if rule_id in self.rules:
+                continue
+            # An account is adjusted by at most one rule, or it would be added back twice
+            accounts = [a for a in self.ledger.match_accounts(template['keywords']) if a not in claimed]
+            claimed.update(accounts)
+            if accounts:
+                suggested.append(self.add_rule(AdjustmentRule(
+                    rule_id=rule_id, name=template['name'], kind=template['kind'], accounts=accounts
+                )))
+        return suggested
+
+    def set_target(self, rule_id: str, target_monthly: float) -> AdjustmentRule:
+        """Set a normalize rule's market-level monthly amount (signed, e.g. -8000 rent)"""
+        rule = self.rules[rule_id]
+        if rule.kind != 'normalize':
+            raise ValueError(f"{rule_id} is not a normalize rule")
+        rule.target_monthly = float(target_monthly)
+        return self.add_rule(rule)
+
+    def needs_target(self, rule_id: str) -> bool:
+        rule = self.rules[rule_id]
+        return rule.kind == 'normalize' and rule.target_monthly is None
+
+    def set_status(self, rule_id: str, status: str):
+        """Accept, reject or reset a rule; updates adjusted EBITDA in place"""
+        if status not in RULE_STATUSES:
+            raise ValueError(f"Unknown rule status: {status}")
+        if status == 'accepted' and self.needs_target(rule_id):
+            raise ValueError(f"{rule_id}: set the market-level target (set_target) before accepting")
+        rule = self.rules[rule_id]
+        was_accepted = rule.status == 'accepted'
+        rule.status = status
+        if was_accepted != (status == 'accepted'):
+            self._apply(self._vectors[rule_id], 1.0 if status == 'accepted' else -1.0)
+
+    def _apply(self, vector: array, sign: float):
+        adjusted = self.adjusted
+        for i, value in enumerate(vector):
+            if value:
+                adjusted[i] += sign * value
+
+    # ---- Results ----------------------------------------------------------
+
+    def _sum(self, values: array, lo: int, hi: int) -> float:
+        return sum(values[lo:hi])
+
+    def ltm_window(self) -> Tuple[int, int]:
+        n = len(self.ledger.periods)
+        return max(0, n - 12), n
+
+    def fiscal_years(self) -> Dict[str, Tuple[int, int]]:
+        """Calendar-year index ranges over the ledger periods"""
+        years: Dict[str, Tuple[int, int]] = {}
+        for i, period in enumerate(self.ledger.periods):
+            lo, _ = years.get(period[:4], (i, i))
+            years[period[:4]] = (lo, i + 1)
+        return years
+
+    def rule_impacts(self, lo: Optional[int] = None, hi: Optional[int] = None) -> Dict[str, float]:
+        """Each rule's EBITDA impact over a period window (default LTM)"""
+        if lo is None:
+            lo, hi = self.ltm_window()
+        return {rule_id: self._sum(vector, lo, hi) for rule_id, vector in self._vectors.items()}
+
+    def bridge(self) -> Dict:
+        """Reported -> normalized EBITDA bridge for LTM and each fiscal year"""
+        windows = {'LTM': self.ltm_window(), **{f"FY{y}": w for y, w in self.fiscal_years().items()}}
+        result = {}
+        for label, (lo, hi) in windows.items():
+            impacts = self.rule_impacts(lo, hi)
+            result[label] = {
+                'months': hi - lo,
+                'reported': self._sum(self.ledger.reported, lo, hi),
+                'adjustments': {rid: impacts[rid] for rid, r in self.rules.items() if r.status == 'accepted'},
+                'normalized': self._sum(self.adjusted, lo, hi)
+            }
+        return result
+
+    def rejection_sensitivity(self) -> List[Tuple[str, float]]:
+        """LTM EBITDA lost if the buyer rejects each accepted add-back (largest first)"""
+        impacts = self.rule_impacts()
+        accepted = [(rid, impacts[rid]) for rid, r in self.rules.items() if r.status == 'accepted']
+        return sorted(accepted, key=lambda item: -item[1])
+
+    def toggle_combinations(self, rule_ids: Optional[List[str]] = None) -> Dict[Tuple[str, ...], float]:
+        """
+        LTM normalized EBITDA for every subset of the given rules (default:
+        all non-rejected rules) being accepted, in one subset-sum pass.
+        """
+        rule_ids = rule_ids if rule_ids is not None else [
+            rid for rid, r in self.rules.items() if r.status != 'rejected'
+        ]
+        if len(rule_ids) > MAX_COMBINATION_RULES:
+            raise ValueError(f"At most {MAX_COMBINATION_RULES} rules can be combined")
+
+        impacts = self.rule_impacts()
+        lo, hi = self.ltm_window()
+        base = self._sum(self.ledger.reported, lo, hi)
+
+        totals = array('d', [base]) * (1 << len(rule_ids))
+        for mask in range(1, len(totals)):
+            low_bit = mask & -mask
+            totals[mask] = totals[mask ^ low_bit] + impacts[rule_ids[low_bit.bit_length() - 1]]
+
+        return {
+            tuple(rid for bit, rid in enumerate(rule_ids) if mask >> bit & 1): totals[mask]
+            for mask in range(len(totals))
+        }
+
+    def summary_lines(self, window: str = 'LTM') -> List[str]:
+        """Bridge lines in the financial-analyst report format"""
+        entry = self.bridge()[window]
+        lines = [f"Reported EBITDA ({window}): {entry['reported']:,.0f}", "Adjustments:"]
+        for rule_id, amount in entry['adjustments'].items():
+            sign = '+' if amount >= 0 else '-'
+            lines.append(f"{sign} {self.rules[rule_id].name}: {abs(amount):,.0f}")
+        lines.append(f"= Normalized EBITDA: {entry['normalized']:,.0f}")
+        return lines
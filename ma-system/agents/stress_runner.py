@@ -0,0 +1,321 @@
+"""
+Devil's Advocate Stress Runner
+
+Turns each devil's-advocate challenge ("What if revenue growth is half
+your projection?", "What if key supplier prices increase 20%?", ...) into
+a parameterized stress transform on the valuation drivers, and evaluates
+the base case, every single challenge and their combinations in one
+batch:
+
+- Each scenario is a column of driver values (growth, margin, WACC, ...)
+- The DCF runs once over all columns, year by year
+- Results become EV impacts per challenge and a tornado ranking; pairs
+  report their interaction (combined impact minus the sum of the parts)
+
+A full "Challenge Everything" run (18 challenges, all pairs) takes a few
+milliseconds.
+"""
+
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .valuation_store import flatten_model
+except ImportError:  # Running as a script from the agents directory
+    from valuation_store import flatten_model
+
+
+@dataclass
+class DCFInputs:
+    """Valuation drivers the stress transforms act on"""
+    revenue: float = 10_000_000.0        # Base year revenue
+    growth: float = 0.08                 # Annual revenue growth over the projection
+    ebitda_margin: float = 0.15
+    ebitda_adjustments: float = 0.0      # Accepted QoE add-backs (annual, in EBITDA)
+    da_pct: float = 0.03                 # D&A / revenue
+    capex_pct: float = 0.03              # Capex / revenue
+    nwc_pct: float = 0.15                # NWC / revenue
+    tax_rate: float = 0.30
+    wacc: float = 0.10
+    terminal_growth: float = 0.02
+    exit_multiple: Optional[float] = None  # EV/EBITDA exit multiple; Gordon growth if None
+    years: int = 5
+    top_customer_share: float = 0.15    # Revenue share of the largest customer
+    supplier_cost_share: float = 0.20   # Purchases from key suppliers / revenue
+
+    # Model keys (last dotted segment, lowercase) accepted for each driver
+    ALIASES = {
+        'revenue': ('revenue', 'base_revenue', 'ltm_revenue', 'umsatz'),
+        'growth': ('growth', 'revenue_growth', 'growth_rate', 'cagr'),
+        'ebitda_margin': ('ebitda_margin',),
+        'ebitda_adjustments': ('ebitda_adjustments', 'adjustments', 'addbacks', 'add_backs'),
+        'da_pct': ('da_pct', 'depreciation_pct'),
+        'capex_pct': ('capex_pct', 'capex_to_revenue'),
+        'nwc_pct': ('nwc_pct', 'working_capital_pct', 'nwc_to_revenue'),
+        'tax_rate': ('tax_rate',),
+        'wacc': ('wacc', 'discount_rate'),
+        'terminal_growth': ('terminal_growth', 'perpetual_growth', 'tg'),
+        'exit_multiple': ('exit_multiple',),
+        'years': ('years', 'projection_years'),
+        'top_customer_share': ('top_customer_share', 'customer_concentration'),
+        'supplier_cost_share': ('supplier_cost_share', 'key_supplier_share')
+    }
+
+    # Drivers without a meaningful default - a model lacking them cannot be stressed
+    REQUIRED = ('revenue', 'ebitda_margin', 'wacc')
+
+    # Drivers that are fractions; model values above 1 are percent-style (8 -> 0.08)
+    RATES = ('growth', 'ebitda_margin', 'da_pct', 'capex_pct', 'nwc_pct', 'tax_rate', 'wacc',
+             'terminal_growth', 'top_customer_share', 'supplier_cost_share')
+
+    @classmethod
+    def _drivers(cls, model: Dict) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        flat = flatten_model(model)
+        by_leaf = {key.rsplit('.', 1)[-1].lower(): value for key, value in flat.items()}
+        for driver, aliases in cls.ALIASES.items():
+            for alias in aliases:
+                value = by_leaf.get(alias)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[driver] = int(value) if driver == 'years' else float(value)
+                    break
+        return values
+
+    @classmethod
+    def missing(cls, model: Dict, drivers: Sequence[str] = REQUIRED) -> List[str]:
+        """
+        Drivers the model does not provide.
+
+        >>> DCFInputs.missing({'financials': {'umsatz': 5e6}, 'wacc': 0.1})
+        ['ebitda_margin']
+        """
+        found = cls._drivers(model)
+        return [driver for driver in drivers if driver not in found]
+
+    @classmethod
+    def from_model(cls, model: Dict) -> 'DCFInputs':
+        """
+        Pick drivers out of a (nested) valuation model; missing ones keep
+        defaults (check `missing()` first for the required ones).
+
+        >>> inputs = DCFInputs.from_model({'revenue': 5e6, 'growth': 8, 'ebitda_margin': 0.12})
+        >>> inputs.growth, inputs.ebitda_margin
+        (0.08, 0.12)
+        """
+        values = cls._drivers(model)
+        for driver in cls.RATES:
+            if driver in values and abs(values[driver]) > 1:
+                values[driver] /= 100
+        return cls(**values)
+
+
+# Driver shocks a transform can apply; each maps to one scenario column
+SHOCKS = (
+    'growth_factor',       # x growth
+    'growth_delta',        # + growth (pp)
+    'customer_loss',       # share of the top customer's revenue lost
+    'margin_delta',        # + EBITDA margin (pp)
+    'cost_inflation',      # purchased input price increase
+    'nwc_delta',           # + NWC / revenue (pp)
+    'wacc_delta',          # + WACC (pp)
+    'tg_delta',            # + terminal growth (pp)
+    'multiple_factor',     # x exit multiple (and x terminal value under Gordon growth)
+    'addback_haircut'      # share of QoE add-backs rejected
+)
+MULTIPLICATIVE = {'growth_factor', 'multiple_factor'}
+
+
+@dataclass
+class StressTransform:
+    """A challenge expressed as driver shocks"""
+    challenge_id: str
+    category: str
+    challenge: str
+    shocks: Dict[str, float] = field(default_factory=dict)
+
+
+# The devil's-advocate challenges with their default stress parameters
+CHALLENGES: List[StressTransform] = [
+    StressTransform('growth_half', 'Revenue Assumptions',
+                    "What if revenue growth is half your projection?", {'growth_factor': 0.5}),
+    StressTransform('customer_loss', 'Revenue Assumptions',
+                    "What if a major customer leaves?", {'customer_loss': 1.0}),
+    StressTransform('market_overstated', 'Revenue Assumptions',
+                    "Are you overstating market size or share?", {'growth_factor': 0.75}),
+    StressTransform('margin_compression', 'Cost Structure',
+                    "Have you accounted for margin compression as you scale?", {'margin_delta': -0.02}),
+    StressTransform('supplier_prices', 'Cost Structure',
+                    "What if key supplier prices increase 20%?", {'cost_inflation': 0.20}),
+    StressTransform('hidden_fixed_costs', 'Cost Structure',
+                    "Are there hidden fixed costs that emerge at higher volumes?", {'margin_delta': -0.01}),
+    StressTransform('nwc_unsustainable', 'Working Capital',
+                    "Is working capital really sustainable at these levels?", {'nwc_delta': 0.03}),
+    StressTransform('payment_terms', 'Working Capital',
+                    "What if payment terms worsen?", {'nwc_delta': 0.02}),
+    StressTransform('inventory', 'Working Capital',
+                    "Have you stress-tested inventory assumptions?", {'nwc_delta': 0.015}),
+    StressTransform('wacc_low', 'Discount Rate (WACC)',
+                    "Is your WACC too low given company-specific risks?", {'wacc_delta': 0.015}),
+    StressTransform('beta_higher', 'Discount Rate (WACC)',
+                    "What if beta is higher for this industry?", {'wacc_delta': 0.01}),
+    StressTransform('execution_risk', 'Discount Rate (WACC)',
+                    "Have you adequately priced in execution risk?", {'wacc_delta': 0.02}),
+    StressTransform('tg_optimistic', 'Terminal Value',
+                    "Is perpetual growth rate too optimistic?", {'tg_delta': -0.01}),
+    StressTransform('obsolescence', 'Terminal Value',
+                    "What if the business model becomes obsolete?",
+                    {'tg_delta': -0.02, 'multiple_factor': 0.7}),
+    StressTransform('exit_multiple_high', 'Terminal Value',
+                    "Are you assuming too high an exit multiple?", {'multiple_factor': 0.8}),
+    StressTransform('addbacks_recurring', 'EBITDA Adjustments',
+                    "Are your add-backs truly non-recurring?", {'addback_haircut': 0.5}),
+    StressTransform('addbacks_rejected', 'EBITDA Adjustments',
+                    "What if buyer doesn't accept these normalizations?", {'addback_haircut': 1.0}),
+    StressTransform('addbacks_aggressive', 'EBITDA Adjustments',
+                    "Have you been too aggressive with adjustments?", {'addback_haircut': 0.3})
+]
+
+
+def challenge_areas(transforms: Sequence[StressTransform] = CHALLENGES) -> List[Dict]:
+    """Challenge texts grouped by category (the devil's-advocate menu)"""
+    areas: Dict[str, List[str]] = {}
+    for transform in transforms:
+        areas.setdefault(transform.category, []).append(transform.challenge)
+    return [{"category": category, "challenges": texts} for category, texts in areas.items()]
+
+
+def evaluate_dcf(inputs: DCFInputs, columns: Dict[str, List[float]]) -> List[float]:
+    """
+    Enterprise value for every scenario column at once.
+
+    columns holds one list per SHOCKS entry (all the same length); the
+    projection loop runs over years, each step over all scenarios.
+    """
+    n = len(columns['growth_factor'])
+    tax = inputs.tax_rate
+    da, capex = inputs.da_pct, inputs.capex_pct
+
+    growth = [inputs.growth * f + d for f, d in zip(columns['growth_factor'], columns['growth_delta'])]
+    margin = [inputs.ebitda_margin + d - inputs.supplier_cost_share * c
+              for d, c in zip(columns['margin_delta'], columns['cost_inflation'])]
+    addbacks = [inputs.ebitda_adjustments * (1.0 - min(h, 1.0)) for h in columns['addback_haircut']]
+    nwc_pct = [inputs.nwc_pct + d for d in columns['nwc_delta']]
+    wacc = [inputs.wacc + d for d in columns['wacc_delta']]
+    tg = [min(inputs.terminal_growth + d, w - 0.005) for d, w in zip(columns['tg_delta'], wacc)]
+    multiple = columns['multiple_factor']
+
+    revenue = [inputs.revenue * (1.0 - inputs.top_customer_share * min(loss, 1.0))
+               for loss in columns['customer_loss']]
+    # A higher NWC level ties up cash once, on the base year revenue
+    present_value = [-(p - inputs.nwc_pct) * r / (1.0 + w) for p, r, w in zip(nwc_pct, revenue, wacc)]
+    discount = [1.0] * n
+    ebitda = [0.0] * n
+    fcf = [0.0] * n
+
+    for _ in range(inputs.years):
+        previous = revenue
+        revenue = [r * (1.0 + g) for r, g in zip(revenue, growth)]
+        ebitda = [r * m + a for r, m, a in zip(revenue, margin, addbacks)]
+        fcf = [e - (e - r * da) * tax - r * capex - p * (r - prev)
+               for e, r, p, prev in zip(ebitda, revenue, nwc_pct, previous)]
+        discount = [d / (1.0 + w) for d, w in zip(discount, wacc)]
+        present_value = [pv + f * d for pv, f, d in zip(present_value, fcf, discount)]
+
+    if inputs.exit_multiple:
+        terminal = [e * inputs.exit_multiple * m for e, m in zip(ebitda, multiple)]
+    else:
+        terminal = [f * (1.0 + g) / (w - g) * m for f, g, w, m in zip(fcf, tg, wacc, multiple)]
+    return [pv + t * d for pv, t, d in zip(present_value, terminal, discount)]
+
+
+@dataclass
+class StressResult:
+    """EV impact of one challenge (or combination)"""
+    challenge_ids: Tuple[str, ...]
+    ev: float
+    impact: float                 # EV - base EV
+    impact_pct: float
+    interaction: float = 0.0      # Combinations: impact minus the sum of single impacts
+
+
+@dataclass
+class StressReport:
+    """Batch stress run output"""
+    base_ev: float
+    singles: List[StressResult]                        # Tornado order (largest downside first)
+    combinations: List[StressResult]                   # Worst first
+    all_combined: Optional[StressResult] = None
+
+    def impact_of(self, challenge_id: str) -> Optional[StressResult]:
+        return next((r for r in self.singles if r.challenge_ids == (challenge_id,)), None)
+
+
+class StressRunner:
+    """Batch evaluation of challenge transforms against one valuation model"""
+
+    def __init__(self, inputs: DCFInputs, transforms: Sequence[StressTransform] = CHALLENGES):
+        self.inputs = inputs
+        self.transforms = {t.challenge_id: t for t in transforms}
+
+    def _columns(self, scenarios: List[Tuple[str, ...]]) -> Dict[str, List[float]]:
+        columns = {shock: [1.0 if shock in MULTIPLICATIVE else 0.0] * len(scenarios) for shock in SHOCKS}
+        for i, ids in enumerate(scenarios):
+            for challenge_id in ids:
+                for shock, value in self.transforms[challenge_id].shocks.items():
+                    if shock in MULTIPLICATIVE:
+                        columns[shock][i] *= value
+                    else:
+                        columns[shock][i] += value
+        return columns
+
+    def evaluate(self, scenarios: List[Tuple[str, ...]]) -> List[float]:
+        """EV for each scenario (a tuple of challenge ids; () is the base case)"""
+        return evaluate_dcf(self.inputs, self._columns(scenarios))
+
+    def run(self, challenge_ids: Optional[Sequence[str]] = None, max_order: int = 2,
+            include_all: bool = True) -> StressReport:
+        """
+        Evaluate base, singles, combinations up to max_order and (optionally)
+        all challenges together in one pass.
+        """
+        ids = list(challenge_ids or self.transforms)
+        scenarios: List[Tuple[str, ...]] = [()] + [(i,) for i in ids]
+        for order in range(2, max_order + 1):
+            scenarios.extend(combinations(ids, order))
+        if include_all and len(ids) > max_order:
+            scenarios.append(tuple(ids))
+
+        values = self.evaluate(scenarios)
+        base = values[0]
+        single_impact = {scenario[0]: ev - base for scenario, ev in zip(scenarios[1:len(ids) + 1], values[1:])}
+
+        def result(scenario: Tuple[str, ...], ev: float) -> StressResult:
+            impact = ev - base
+            return StressResult(
+                challenge_ids=scenario, ev=ev, impact=impact,
+                impact_pct=impact / base if base else 0.0,
+                interaction=impact - sum(single_impact[i] for i in scenario) if len(scenario) > 1 else 0.0
+            )
+
+        results = [result(s, ev) for s, ev in zip(scenarios[1:], values[1:])]
+        singles = sorted(results[:len(ids)], key=lambda r: r.impact)
+        combos = results[len(ids):]
+        all_combined = combos.pop() if include_all and len(ids) > max_order else None
+        return StressReport(base_ev=base, singles=singles,
+                            combinations=sorted(combos, key=lambda r: r.impact),
+                            all_combined=all_combined)
+
+    def tornado(self, report: StressReport) -> List[Dict]:
+        """Tornado rows: challenge, category, EV and impact, largest downside first"""
+        return [
+            {
+                "id": r.challenge_ids[0],
+                "category": self.transforms[r.challenge_ids[0]].category,
+                "challenge": self.transforms[r.challenge_ids[0]].challenge,
+                "ev": r.ev,
+                "ev_impact": r.impact,
+                "ev_impact_pct": r.impact_pct
+            }
+            for r in report.singles
+        ]
@@ -0,0 +1,251 @@
+"""
+Valuation Version Store
+
+Keeps every valuation model version (v1.0, v1.1, v2.0, ...) as a delta
+against the previous version. Values are indexed per model field, so
+reading a version, diffing two versions or rendering the "Assumption
+Changes Over Time" table never replays full models.
+
+Models are nested dicts; they are flattened to dotted keys internally
+("assumptions.wacc", "dcf.enterprise_value", ...).
+"""
+
+import json
+from bisect import bisect_right, insort
+from dataclasses import dataclass, field, asdict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_MISSING = object()
+
+
+@dataclass
+class ValuationVersion:
+    """Delta record for one valuation version"""
+    version: str
+    date: str
+    parent: Optional[str]
+    changed: Dict[str, Any] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+    notes: str = ""
+
+
+def flatten_model(model: Dict, prefix: str = "") -> Dict[str, Any]:
+    """Flatten a nested model dict to dotted keys"""
+    flat = {}
+    for key, value in model.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict) and value:
+            flat.update(flatten_model(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def unflatten_model(flat: Dict[str, Any]) -> Dict:
+    """Inverse of flatten_model"""
+    model: Dict = {}
+    for path, value in flat.items():
+        node = model
+        *parents, leaf = path.split('.')
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return model
+
+
+class ValuationVersionStore:
+    """
+    Delta-encoded store of valuation model versions.
+
+    Storage grows with what changed between versions, not with the number
+    of versions. Each field keeps its own change history
+    (position -> value), so any version can be read field by field with a
+    binary search.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._versions: List[ValuationVersion] = []
+        self._position: Dict[str, int] = {}                      # version -> position
+        self._by_date: List[Tuple[str, int]] = []                # sorted (date, position)
+        self._history: Dict[str, Tuple[List[int], List[Any]]] = {}  # key -> (positions, values)
+
+        if self.path and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._index(ValuationVersion(**json.loads(line)))
+
+    def _index(self, record: ValuationVersion):
+        """Add a delta record to the in-memory indexes"""
+        pos = len(self._versions)
+        self._versions.append(record)
+        self._position[record.version] = pos
+        insort(self._by_date, (record.date, pos))
+
+        for key, value in record.changed.items():
+            positions, values = self._history.setdefault(key, ([], []))
+            positions.append(pos)
+            values.append(value)
+        for key in record.removed:
+            positions, values = self._history[key]
+            positions.append(pos)
+            values.append(_MISSING)
+
+    # ---- Writing --------------------------------------------------------
+
+    def commit(self, version: str, model: Dict, version_date: Optional[str] = None,
+               notes: str = "") -> ValuationVersion:
+        """
+        Store a full model as a new version.
+
+        Only fields that differ from the latest version are persisted.
+        """
+        if version in self._position:
+            raise ValueError(f"Valuation version {version} already exists")
+
+        flat = flatten_model(model)
+        parent = self.latest()
+        previous = self._materialize(len(self._versions) - 1) if parent else {}
+
+        record = ValuationVersion(
+            version=version,
+            date=version_date or date.today().isoformat(),
+            parent=parent,
+            changed={k: v for k, v in flat.items() if previous.get(k, _MISSING) != v},
+            removed=sorted(k for k in previous if k not in flat),
+            notes=notes
+        )
+
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + '\n')
+
+        self._index(record)
+        return record
+
+    def next_version(self, minor: bool = False) -> str:
+        """Next version id: major bump (v2.0 -> v3.0) or minor (v2.0 -> v2.1)"""
+        latest = self.latest()
+        if not latest:
+            return "1.0"
+        major, _, rest = latest.partition('.')
+        if minor:
+            return f"{major}.{int(rest or 0) + 1}"
+        return f"{int(major) + 1}.0"
+
+    # ---- Reading --------------------------------------------------------
+
+    def versions(self) -> List[str]:
+        """All version ids in commit order"""
+        return [v.version for v in self._versions]
+
+    def latest(self) -> Optional[str]:
+        """Most recently committed version id"""
+        return self._versions[-1].version if self._versions else None
+
+    def record(self, version: str) -> ValuationVersion:
+        """Delta record (date, parent, notes, changed fields) for a version"""
+        return self._versions[self._pos(version)]
+
+    def version_at(self, as_of: str) -> Optional[str]:
+        """Latest version committed on or before an ISO date"""
+        idx = bisect_right(self._by_date, (as_of, len(self._versions)))
+        if idx == 0:
+            return None
+        return self._versions[self._by_date[idx - 1][1]].version
+
+    def value(self, version: str, key: str, default: Any = None) -> Any:
+        """Value of one model field as of a version"""
+        value = self._value_at(key, self._pos(version))
+        return default if value is _MISSING else value
+
+    def get(self, version: str) -> Dict:
+        """Full (nested) model as of a version"""
+        return unflatten_model(self._materialize(self._pos(version)))
+
+    def diff(self, old: str, new: str) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Fields that differ between two versions: key -> (old value, new value).
+
+        Only fields touched by the deltas between the two versions are
+        inspected. Removed/added fields show None on the missing side.
+        """
+        a, b = self._pos(old), self._pos(new)
+        lo, hi = min(a, b), max(a, b)
+
+        touched = set()
+        for record in self._versions[lo + 1:hi + 1]:
+            touched.update(record.changed)
+            touched.update(record.removed)
+
+        result = {}
+        for key in sorted(touched):
+            before, after = self._value_at(key, a), self._value_at(key, b)
+            if before != after:
+                result[key] = (None if before is _MISSING else before,
+                               None if after is _MISSING else after)
+        return result
+
+    def field_history(self, key: str) -> List[Tuple[str, Any]]:
+        """(version, value) for every version that changed a field"""
+        positions, values = self._history.get(key, ([], []))
+        return [(self._versions[p].version, None if v is _MISSING else v)
+                for p, v in zip(positions, values)]
+
+    def render_change_table(self, fields: Dict[str, str],
+                            versions: Optional[List[str]] = None) -> str:
+        """
+        Markdown "Assumption Changes Over Time" table.
+
+        fields maps model keys to row labels, e.g.
+        {'assumptions.wacc': 'WACC', 'assumptions.terminal_growth': 'Terminal Growth'}.
+        Rationale comes from the notes of the latest version that changed the field.
+        """
+        versions = versions or self.versions()
+        positions = [self._pos(v) for v in versions]
+
+        lines = [
+            "| Assumption | " + " | ".join(f"v{v}" for v in versions) + " | Rationale for Changes |",
+            "|------------|" + "------|" * len(versions) + "----------------------|"
+        ]
+        for key, label in fields.items():
+            cells = []
+            for pos in positions:
+                value = self._value_at(key, pos)
+                cells.append("-" if value is _MISSING else str(value))
+            changed_in = [p for p in self._history.get(key, ([], []))[0] if p <= max(positions, default=-1)]
+            rationale = next((self._versions[p].notes for p in reversed(changed_in) if self._versions[p].notes), "-")
+            lines.append(f"| {label} | " + " | ".join(cells) + f" | {rationale} |")
+
+        return "\n".join(lines)
+
+    # ---- Internals ------------------------------------------------------
+
+    def _pos(self, version: str) -> int:
+        try:
+            return self._position[version]
+        except KeyError:
+            raise KeyError(f"Unknown valuation version: {version}") from None
+
+    def _value_at(self, key: str, pos: int) -> Any:
+        """Binary search a field's change history for its value at a position"""
+        history = self._history.get(key)
+        if not history:
+            return _MISSING
+        positions, values = history
+        idx = bisect_right(positions, pos)
+        return values[idx - 1] if idx else _MISSING
+
+    def _materialize(self, pos: int) -> Dict[str, Any]:
+        """Flat model at a position"""
+        flat = {}
+        for key in self._history:
+            value = self._value_at(key, pos)
+            if value is not _MISSING:
+                flat[key] = value
+        return flat
@@ -0,0 +1,322 @@
+"""
+Buyer Profile Index - Fast Candidate Search
+
+Indexes the buyer universe (knowledge-base/buyer-profiles/*.md or bulk
+imports from longlists) in columnar form:
+
+- Numeric attributes (size, prior score) live in typed arrays
+- Categorical attributes (type, sector, geography) have inverted indexes
+  stored as integer bitmaps - filters are bitwise ANDs/ORs
+- Scoring against a target profile walks only the candidate bitmap
+
+Parsed profile files are cached by (mtime, size) so reloading a large
+profile directory only re-parses files that changed.
+"""
+
+import json
+import heapq
+import re
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .loi_comparison import parse_number
+except ImportError:  # Running as a script from the orchestrator directory
+    from loi_comparison import parse_number
+
+
+CATEGORICAL_FIELDS = ('buyer_type', 'sector', 'geography')
+
+# Bump when parse_profile() changes so cached parses are discarded
+PARSER_VERSION = 2
+
+# Profile template field -> index attribute
+PROFILE_FIELDS = {
+    'type': 'buyer_type',
+    'industry': 'sector',
+    'geography': 'geography',
+    'size': 'size',
+    'overall score': 'score'
+}
+
+_SIZE_UNITS = {
+    'k': 0.001, 'thousand': 0.001, 'tsd': 0.001,
+    'm': 1.0, 'mm': 1.0, 'mio': 1.0, 'million': 1.0, 'millionen': 1.0, 'millions': 1.0,
+    'b': 1000.0, 'bn': 1000.0, 'mrd': 1000.0, 'billion': 1000.0, 'billions': 1000.0,
+    'milliarde': 1000.0, 'milliarden': 1000.0
+}
+
+
+@dataclass
+class BuyerProfile:
+    """Searchable attributes of a single buyer"""
+    name: str
+    buyer_type: str = ""           # strategic | financial
+    sector: List[str] = field(default_factory=list)
+    geography: List[str] = field(default_factory=list)
+    size: float = 0.0              # Revenue or AUM in EUR millions
+    score: float = 0.0             # Prior overall score (1-10)
+    source: str = ""
+
+
+@dataclass
+class TargetProfile:
+    """What the ideal buyer for the target looks like, with scoring weights"""
+    sectors: List[str] = field(default_factory=list)
+    geographies: List[str] = field(default_factory=list)
+    buyer_types: List[str] = field(default_factory=list)
+    size_range: Tuple[float, float] = (0.0, float('inf'))
+    weights: Dict[str, float] = field(default_factory=lambda: {
+        'sector': 4.0, 'geography': 2.0, 'buyer_type': 1.0, 'size': 2.0, 'score': 1.0
+    })
+
+
+def _normalize(value: str) -> str:
+    return value.strip().lower()
+
+
+def _split_values(value: str) -> List[str]:
+    """'Technology / Industrial Automation' -> ['technology', 'industrial automation']"""
+    return [_normalize(v) for v in re.split(r'[/,;|]', value) if v.strip()]
+
+
+def parse_size(text: str) -> float:
+    """Parse '€500M revenue', '1.2bn AUM', '€1,200M', '2 Mrd', '2 billion' to EUR millions (0.0 if unknown)"""
+    match = re.search(r'(\d+(?:[.,]\d+)*)\s*([a-z]+)?', text.lower())
+    if not match:
+        return 0.0
+    return parse_number(match.group(1)) * _SIZE_UNITS.get(match.group(2) or 'm', 1.0)
+
+
+_FINANCIAL = re.compile(r'financial|\bpe\b|private equity|finanzinvestor|family office', re.I)
+_STRATEGIC = re.compile(r'strateg|corporate|industrial buyer', re.I)
+
+
+def parse_buyer_type(value: str) -> str:
+    """'financial', 'strategic', or '' when the value names both (e.g. the template's 'Strategic / Financial')"""
+    financial, strategic = bool(_FINANCIAL.search(value)), bool(_STRATEGIC.search(value))
+    if financial and strategic:
+        return ''
+    return 'financial' if financial else 'strategic'
+
+
+def parse_profile(path: Path) -> Optional[BuyerProfile]:
+    """Extract indexable attributes from a buyer profile markdown file"""
+    text = path.read_text(encoding='utf-8')
+    title = re.search(r'^#\s+(.+)$', text, re.MULTILINE)
+    if not title:
+        return None
+
+    profile = BuyerProfile(name=title.group(1).strip(), source=path.name)
+    for label, value in re.findall(r'^\s*-\s+\*\*([^*:]+):\*\*\s*(.+)$', text, re.MULTILINE):
+        attr = PROFILE_FIELDS.get(_normalize(label))
+        value = value.strip()
+        if not attr or not value or value.startswith('['):
+            continue  # Unfilled template placeholder
+        if attr == 'buyer_type':
+            profile.buyer_type = parse_buyer_type(value)
+        elif attr in ('sector', 'geography'):
+            setattr(profile, attr, _split_values(value))
+        elif attr == 'size':
+            profile.size = parse_size(value)
+        elif attr == 'score':
+            profile.score = parse_size(value.split('/')[0])
+
+    return profile
+
+
+def _bits(mask: int) -> List[int]:
+    """Row ids set in a bitmap"""
+    digits = bin(mask)[:1:-1]  # LSB first, without the '0b' prefix
+    return [i for i, d in enumerate(digits) if d == '1']
+
+
+def _mask(rows: Iterable[int], width: int) -> int:
+    """Bitmap with the given row ids set"""
+    digits = bytearray(b'0' * width)
+    for row in rows:
+        digits[row] = 49  # ord('1')
+    return int(digits[::-1].decode() or '0', 2)
+
+
+class BuyerIndex:
+    """
+    Columnar buyer store with bitmap inverted indexes.
+
+    Rows are append-only; updating or removing a buyer clears its bit in
+    the live mask so existing bitmaps stay valid.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.sources: List[str] = []
+        self.size = array('d')
+        self.score = array('d')
+        self._row_by_name: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {f: {} for f in CATEGORICAL_FIELDS}
+        self._live = 0
+
+    def __len__(self) -> int:
+        return bin(self._live).count('1')
+
+    def add(self, profile: BuyerProfile) -> int:
+        """Insert or replace a buyer; returns its row id"""
+        self.remove(profile.name)
+
+        row = len(self.names)
+        bit = 1 << row
+        self.names.append(profile.name)
+        self.sources.append(profile.source)
+        self.size.append(profile.size)
+        self.score.append(profile.score)
+        self._row_by_name[_normalize(profile.name)] = row
+        self._live |= bit
+
+        values = {
+            'buyer_type': [profile.buyer_type] if profile.buyer_type else [],
+            'sector': profile.sector,
+            'geography': profile.geography
+        }
+        for attr, vals in values.items():
+            postings = self._postings[attr]
+            for v in vals:
+                key = _normalize(v)
+                postings[key] = postings.get(key, 0) | bit
+
+        return row
+
+    def add_many(self, profiles: Iterable[BuyerProfile]):
+        """Bulk insert (e.g. a longlist export)"""
+        for profile in profiles:
+            self.add(profile)
+
+    def remove(self, name: str) -> bool:
+        """Drop a buyer from search results"""
+        row = self._row_by_name.pop(_normalize(name), None)
+        if row is None:
+            return False
+        self._live &= ~(1 << row)
+        return True
+
+    def values(self, attr: str) -> List[str]:
+        """Distinct values of a categorical attribute"""
+        return sorted(v for v, mask in self._postings[attr].items() if mask & self._live)
+
+    def _any_of(self, attr: str, values: Iterable[str]) -> int:
+        mask = 0
+        postings = self._postings[attr]
+        for v in values:
+            mask |= postings.get(_normalize(v), 0)
+        return mask
+
+    def filter(self, buyer_types: Iterable[str] = (), sectors: Iterable[str] = (),
+               geographies: Iterable[str] = (), min_size: float = 0.0,
+               max_size: float = float('inf')) -> int:
+        """
+        Bitmap of buyers matching all given filters.
+
+        Each filter is an OR over its values; filters are ANDed together.
+        Empty filters match everything.
+        """
+        mask = self._live
+        for attr, vals in (('buyer_type', buyer_types), ('sector', sectors), ('geography', geographies)):
+            vals = list(vals)
+            if vals:
+                mask &= self._any_of(attr, vals)
+
+        if min_size > 0 or max_size != float('inf'):
+            size = self.size
+            mask = _mask((row for row in _bits(mask) if min_size <= size[row] <= max_size),
+                         len(self.names))
+
+        return mask
+
+    def search(self, **filters) -> List[str]:
+        """Names of buyers matching the filters (see filter())"""
+        return [self.names[row] for row in _bits(self.filter(**filters))]
+
+    def rank(self, target: TargetProfile, candidates: Optional[int] = None,
+             top_n: int = 25) -> List[Tuple[str, float]]:
+        """
+        Score candidates against a target profile and return the top N.
+
+        Categorical fit is accumulated per posting bitmap, size fit and prior
+        score come from the numeric columns.
+        """
+        mask = self._live if candidates is None else candidates & self._live
+        rows = _bits(mask)
+        if not rows:
+            return []
+
+        weights = target.weights
+        scores = dict.fromkeys(rows, 0.0)
+
+        for attr, wanted, weight_key in (('sector', target.sectors, 'sector'),
+                                         ('geography', target.geographies, 'geography'),
+                                         ('buyer_type', target.buyer_types, 'buyer_type')):
+            weight = weights.get(weight_key, 0.0)
+            if wanted and weight:
+                for row in _bits(mask & self._any_of(attr, wanted)):
+                    scores[row] += weight
+
+        low, high = target.size_range
+        size_weight = weights.get('size', 0.0)
+        score_weight = weights.get('score', 0.0) / 10.0
+        size, prior = self.size, self.score
+        for row in rows:
+            s = size[row]
+            if size_weight and s > 0:
+                if low <= s <= high:
+                    scores[row] += size_weight
+                else:
+                    # Linear decay by relative distance outside the range
+                    edge = low if s < low else high
+                    scores[row] += size_weight * max(0.0, 1.0 - abs(s - edge) / max(edge, 1.0))
+            scores[row] += score_weight * prior[row]
+
+        best = heapq.nlargest(top_n, scores.items(), key=lambda item: item[1])
+        return [(self.names[row], round(score, 3)) for row, score in best]
+
+
+def load_profiles(profiles_dir: Path, cache_path: Optional[Path] = None) -> BuyerIndex:
+    """
+    Build an index from a buyer-profiles directory.
+
+    With a cache file, only profiles whose (mtime, size) changed since the
+    last load are re-parsed.
+    """
+    profiles_dir = Path(profiles_dir)
+    cache: Dict[str, Dict] = {}
+    if cache_path and Path(cache_path).exists():
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+
+    index = BuyerIndex()
+    fresh_cache: Dict[str, Dict] = {}
+    changed = False
+
+    for path in sorted(profiles_dir.glob('*.md')):
+        if path.name.lower() == 'readme.md':
+            continue
+        stat = path.stat()
+        stamp = [stat.st_mtime_ns, stat.st_size, PARSER_VERSION]
+
+        entry = cache.get(path.name)
+        if entry and entry['stamp'] == stamp:
+            profile = BuyerProfile(**entry['profile']) if entry['profile'] else None
+        else:
+            profile = parse_profile(path)
+            changed = True
+            entry = {'stamp': stamp, 'profile': profile.__dict__ if profile else None}
+
+        fresh_cache[path.name] = entry
+        if profile:
+            index.add(profile)
+
+    if cache_path and (changed or fresh_cache.keys() != cache.keys()):
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(fresh_cache, f, ensure_ascii=False)
+
+    return index
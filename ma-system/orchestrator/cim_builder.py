@@ -0,0 +1,205 @@
+"""
+Incremental CIM Builder
+
+Section-parallel build pipeline for the CIM creation workflow
+(`incremental_build: true`):
+
+1. Gather - source providers (company-intelligence, financial-analyst,
+   market-intelligence, ...) are called concurrently
+2. Hash   - each section's input hash covers only the sources it uses
+3. Render - only sections whose input hash changed are re-rendered;
+   all others come from the section cache
+4. Assemble - sections in `standard_sections` order, missing inputs flagged
+
+A late financials update therefore re-renders the executive summary and
+financial performance sections, not the whole document.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+
+WORKFLOW_PATH = Path(__file__).parent.parent / "workflows" / "documents" / "cim-creation" / "workflow.yaml"
+
+# Section -> input sources it is written from
+SECTION_SOURCES = {
+    'executive_summary': ['company', 'financials', 'transaction'],
+    'investment_highlights': ['company', 'market'],
+    'transaction_overview': ['transaction'],
+    'company_overview': ['company'],
+    'market_analysis': ['market'],
+    'financial_performance': ['financials'],
+    'operations': ['operations'],
+    'management_team': ['management'],
+    'investment_rationale': ['company', 'market'],
+    'appendices': ['appendix']
+}
+
+# Source -> agent that provides it
+SOURCE_AGENTS = {
+    'company': 'company-intelligence',
+    'financials': 'financial-analyst',
+    'market': 'market-intelligence',
+    'transaction': 'managing-director',
+    'operations': 'company-intelligence',
+    'management': 'company-intelligence',
+    'appendix': 'document-generator'
+}
+
+SectionRenderer = Callable[[str, Dict[str, Dict]], str]
+
+
+def load_sections(workflow_path: Path = WORKFLOW_PATH) -> List[str]:
+    """Section order from the CIM workflow's standard_sections"""
+    with open(workflow_path, 'r', encoding='utf-8') as f:
+        return list(yaml.safe_load(f)['standard_sections'])
+
+
+def content_hash(data) -> str:
+    """Stable hash of JSON-serializable data"""
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def default_renderer(section: str, inputs: Dict[str, Dict]) -> str:
+    """Plain markdown rendering of a section's inputs"""
+    lines = [f"## {section.replace('_', ' ').title()}", ""]
+    for source, data in inputs.items():
+        for key, value in (data or {}).items():
+            lines.append(f"- **{key.replace('_', ' ').title()}:** {value}")
+    return "\n".join(lines) + "\n"
+
+
+@dataclass
+class BuildResult:
+    """Outcome of a CIM build"""
+    document: str
+    rendered: List[str] = field(default_factory=list)   # Sections rebuilt this run
+    cached: List[str] = field(default_factory=list)     # Sections reused from cache
+    missing: List[str] = field(default_factory=list)    # Sections lacking input data
+
+
+class CIMBuilder:
+    """
+    Gathers section inputs concurrently and re-renders only changed sections.
+
+    Rendered sections are cached in memory and, with a cache_dir, on disk
+    (one JSON file per section) so incremental builds survive restarts.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, renderer: SectionRenderer = default_renderer,
+                 sections: Optional[List[str]] = None, workers: int = 8, renderer_version: str = '1'):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.renderer = renderer
+        # Part of every section hash, so switching (or revising) the renderer invalidates the cache
+        self.renderer_key = (f"{getattr(renderer, '__module__', '')}."
+                             f"{getattr(renderer, '__qualname__', type(renderer).__name__)}:{renderer_version}")
+        self.sections = sections or load_sections()
+        self.workers = workers
+        self._cache: Dict[str, Dict[str, str]] = {}  # section -> {'input_hash', 'content'}
+
+        if self.cache_dir and self.cache_dir.exists():
+            for path in self.cache_dir.glob('*.json'):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._cache[path.stem] = json.load(f)
+
+    def required_sources(self, sections: Optional[List[str]] = None) -> List[str]:
+        """Distinct sources needed for the given sections"""
+        needed = []
+        for section in sections or self.sections:
+            for source in SECTION_SOURCES.get(section, []):
+                if source not in needed:
+                    needed.append(source)
+        return needed
+
+    def gather(self, providers: Dict[str, Callable[[], Optional[Dict]]]) -> Dict[str, Optional[Dict]]:
+        """Call all needed source providers concurrently"""
+        needed = [s for s in self.required_sources() if s in providers]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {source: pool.submit(providers[source]) for source in needed}
+            return {source: future.result() for source, future in futures.items()}
+
+    def stale_sections(self, inputs: Dict[str, Optional[Dict]]) -> List[str]:
+        """Sections whose inputs differ from the cached render"""
+        source_hashes = {source: content_hash(data) for source, data in inputs.items()}
+        return [s for s in self.sections
+                if self._cache.get(s, {}).get('input_hash') != self._section_hash(s, source_hashes)]
+
+    def _section_hash(self, section: str, source_hashes: Dict[str, str]) -> str:
+        return content_hash([self.renderer_key] +
+                            [source_hashes.get(source) for source in SECTION_SOURCES.get(section, [])])
+
+    def build(self, providers: Dict[str, Callable[[], Optional[Dict]]],
+              inputs: Optional[Dict[str, Optional[Dict]]] = None) -> BuildResult:
+        """
+        Build the CIM from source providers (or pre-gathered inputs).
+
+        Sections whose sources are all missing are flagged instead of
+        rendered (the workflow allows partial completion).
+        """
+        inputs = inputs if inputs is not None else self.gather(providers)
+        source_hashes = {source: content_hash(data) for source, data in inputs.items()}
+        result = BuildResult(document='')
+
+        to_render = []
+        for section in self.sections:
+            sources = SECTION_SOURCES.get(section, [])
+            if not any(inputs.get(source) for source in sources):
+                result.missing.append(section)
+                continue
+            section_hash = self._section_hash(section, source_hashes)
+            if self._cache.get(section, {}).get('input_hash') == section_hash:
+                result.cached.append(section)
+            else:
+                to_render.append((section, section_hash))
+
+        # Sections are independent once their inputs are gathered
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            rendered = pool.map(
+                lambda item: self.renderer(item[0], {s: inputs.get(s) for s in SECTION_SOURCES.get(item[0], [])}),
+                to_render
+            )
+            for (section, section_hash), content in zip(to_render, rendered):
+                self._store(section, section_hash, content)
+                result.rendered.append(section)
+
+        parts = []
+        for section in self.sections:
+            if section in result.missing:
+                title = section.replace('_', ' ').title()
+                agents = sorted({SOURCE_AGENTS[s] for s in SECTION_SOURCES.get(section, [])})
+                parts.append(f"## {title}\n\n[MISSING - awaiting input from {', '.join(agents)}]\n")
+            else:
+                parts.append(self._cache[section]['content'])
+        result.document = "\n".join(parts)
+        return result
+
+    def _store(self, section: str, section_hash: str, content: str):
+        entry = {'input_hash': section_hash, 'content': content}
+        self._cache[section] = entry
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / f"{section}.json"
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    @property
+    def cached_sections(self) -> int:
+        """Number of sections currently in the cache"""
+        return len(self._cache)
+
+    def invalidate(self, section: Optional[str] = None):
+        """Force re-rendering of one section (or all) on the next build"""
+        for name in ([section] if section else list(self._cache)):
+            self._cache.pop(name, None)
+            if self.cache_dir:
+                (self.cache_dir / f"{name}.json").unlink(missing_ok=True)
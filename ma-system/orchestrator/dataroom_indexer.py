@@ -0,0 +1,385 @@
+"""
+Data Room Indexer
+
+Indexes a local virtual data room (VDR) directory for the dataroom-setup
+workflow:
+
+1. Walks the tree in parallel (one scan task per top-level folder)
+2. Hashes files in a streaming way - large files are memory-mapped
+3. Finds exact duplicates (same content hash) and near-duplicate versions
+   (same document name modulo version/date/copy markers)
+4. Classifies files into the `standard_folder_structure` sections
+5. Computes completeness as the share of checklist subsections covered
+   by at least one current document
+
+Rescans are incremental: files whose (mtime, size) did not change keep
+their cached hash and classification. Coverage is recomputed over the
+current documents only after the index changed.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+
+WORKFLOW_PATH = Path(__file__).parent.parent / "workflows" / "due-diligence" / "dataroom-setup" / "workflow.yaml"
+
+CHUNK_SIZE = 1 << 20           # 1 MiB read chunks
+MMAP_THRESHOLD = 16 << 20      # Memory-map files larger than 16 MiB
+IGNORED_NAMES = {'.ds_store', 'thumbs.db', 'desktop.ini'}
+
+# Extra keywords (DE/EN) per subsection, on top of the words in the subsection name
+SUBSECTION_KEYWORDS = {
+    'Corporate structure': ['organigramm', 'shareholder', 'gesellschafter', 'structure chart'],
+    'Historical financials': ['jahresabschluss', 'annual accounts', 'financial statements', 'p&l', 'guv', 'bilanz'],
+    'Management accounts': ['bwa', 'monthly report', 'management report'],
+    'Budgets and projections': ['budget', 'forecast', 'business plan', 'planung'],
+    'Tax returns': ['steuererklaerung', 'steuerbescheid', 'tax return', 'tax assessment'],
+    'Audit reports': ['audit', 'pruefungsbericht', 'wirtschaftspruefer'],
+    'Corporate documents': ['articles', 'satzung', 'handelsregister', 'commercial register', 'bylaws'],
+    'Material contracts': ['agreement', 'vertrag', 'contract'],
+    'Intellectual property': ['patent', 'trademark', 'marke', 'license', 'lizenz'],
+    'Litigation': ['lawsuit', 'klage', 'rechtsstreit', 'dispute'],
+    'Customer information': ['customer', 'kunden', 'top 10'],
+    'Supplier agreements': ['supplier', 'lieferant'],
+    'Facilities': ['lease', 'miete', 'property', 'site'],
+    'Organization chart': ['org chart', 'organigram'],
+    'Employee list': ['headcount', 'mitarbeiterliste', 'employees'],
+    'Employment agreements': ['arbeitsvertrag', 'service agreement', 'geschaeftsfuehrervertrag'],
+    'Insurance policies': ['versicherung', 'policy'],
+    'Permits and licenses': ['genehmigung', 'permit'],
+    'CIM and teaser': ['cim', 'teaser', 'information memorandum'],
+    'Process letters': ['process letter', 'prozessbrief'],
+    'Management presentation': ['management presentation', 'mp deck']
+}
+
+_VERSION_MARKERS = re.compile(
+    r'(?:^|[\s_\-.])(?:v\d+(?:\.\d+)*|version\s*\d+|final|draft|entwurf|copy|kopie|'
+    r'\(\d+\)|\d{4}[-_.]?\d{2}[-_.]?\d{2}|\d{8})(?=$|[\s_\-.])',
+    re.IGNORECASE
+)
+_VERSION_NUMBER = re.compile(r'(?:^|[\s_\-.])v(\d+(?:\.\d+)*)(?=$|[\s_\-.])', re.IGNORECASE)
+_COPY_MARKER = re.compile(r'(?:^|[\s_\-.])(?:copy|kopie|\(\d+\))(?=$|[\s_\-.])', re.IGNORECASE)
+
+
+@dataclass
+class IndexedFile:
+    """Index entry for one data room file"""
+    path: str               # Relative to the data room root
+    size: int
+    mtime_ns: int
+    sha256: str
+    folder: str             # e.g. '02_financial_information' ('' if unclassified)
+    subsection: str         # e.g. 'Historical financials'
+    doc_key: str            # Name with version/date markers stripped
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower().replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')
+    return re.findall(r'[a-z0-9&]+', text)
+
+
+def document_key(filename: str) -> str:
+    """'Audit_Report_2023_v3_final.pdf' -> 'audit report 2023' (versions/dates stripped)"""
+    stem = Path(filename).stem
+    previous = None
+    while previous != stem:
+        previous = stem
+        stem = _VERSION_MARKERS.sub(' ', stem)
+    return ' '.join(tokenize(stem))
+
+
+def file_sha256(path: Path, size: int) -> str:
+    """Streaming SHA-256; memory-maps large files instead of reading chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_folder_structure(workflow_path: Path = WORKFLOW_PATH) -> Dict[str, List[str]]:
+    """standard_folder_structure from the dataroom-setup workflow"""
+    with open(workflow_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)['standard_folder_structure']
+
+
+class DocumentClassifier:
+    """Keyword classifier mapping file paths to (folder, subsection)"""
+
+    def __init__(self, folder_structure: Dict[str, List[str]]):
+        self.folder_structure = folder_structure
+        # Phrase (as token tuple) -> (folder, subsection)
+        self._phrases: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+        for folder, subsections in folder_structure.items():
+            for subsection in subsections:
+                phrases = [subsection] + SUBSECTION_KEYWORDS.get(subsection, [])
+                for phrase in phrases:
+                    self._phrases[tuple(tokenize(phrase))] = (folder, subsection)
+        self._max_len = max((len(p) for p in self._phrases), default=1)
+
+    def classify(self, rel_path: str) -> Tuple[str, str]:
+        """Best (folder, subsection) for a path; folder prefixes like '02_' win"""
+        parts = Path(rel_path).parts
+        explicit = next((p for p in parts[:-1] if p in self.folder_structure), None)
+
+        tokens = tokenize(rel_path)
+        scores: Dict[Tuple[str, str], int] = {}
+        for n in range(self._max_len, 0, -1):
+            for i in range(len(tokens) - n + 1):
+                hit = self._phrases.get(tuple(tokens[i:i + n]))
+                if hit and (explicit is None or hit[0] == explicit):
+                    scores[hit] = scores.get(hit, 0) + n
+
+        if scores:
+            return max(scores.items(), key=lambda item: item[1])[0]
+        return (explicit or '', '')
+
+
+class DataRoomIndexer:
+    """
+    Incremental data room index with duplicate detection and completeness.
+
+    The index is keyed by relative path; `scan()` re-hashes only new or
+    modified files. Superseded versions and extra copies of a file do not
+    count towards coverage.
+    """
+
+    def __init__(self, root: Path, cache_path: Optional[Path] = None,
+                 folder_structure: Optional[Dict[str, List[str]]] = None, workers: int = 8):
+        self.root = Path(root)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.classifier = DocumentClassifier(folder_structure or load_folder_structure())
+        self.workers = workers
+
+        self.files: Dict[str, IndexedFile] = {}
+        self.errors: Dict[str, str] = {}                            # Path -> read error of the last scan
+        self._by_hash: Dict[str, List[str]] = {}
+        self._by_doc_key: Dict[str, List[str]] = {}
+        self._coverage: Optional[Dict[Tuple[str, str], int]] = None  # (folder, subsection) -> current documents
+
+        if self.cache_path and self.cache_path.exists():
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                for entry in json.load(f):
+                    self._add(IndexedFile(**entry))
+
+    # ---- Index maintenance -----------------------------------------------
+
+    def _add(self, entry: IndexedFile):
+        self.files[entry.path] = entry
+        self._by_hash.setdefault(entry.sha256, []).append(entry.path)
+        self._by_doc_key.setdefault(self._group_key(entry), []).append(entry.path)
+        self._coverage = None
+
+    def _remove(self, path: str):
+        entry = self.files.pop(path)
+        self._by_hash[entry.sha256].remove(path)
+        if not self._by_hash[entry.sha256]:
+            del self._by_hash[entry.sha256]
+        group = self._group_key(entry)
+        self._by_doc_key[group].remove(path)
+        if not self._by_doc_key[group]:
+            del self._by_doc_key[group]
+        self._coverage = None
+
+    @staticmethod
+    def _group_key(entry: IndexedFile) -> str:
+        return f"{Path(entry.path).parent}/{entry.doc_key}"
+
+    def _walk(self, top: Path) -> List[Tuple[str, int, int]]:
+        """(relative path, size, mtime_ns) for every file under top"""
+        found = []
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for item in it:
+                        if item.name.startswith('.') or item.name.lower() in IGNORED_NAMES:
+                            continue
+                        if item.is_dir(follow_symlinks=False):
+                            stack.append(Path(item.path))
+                        elif item.is_file(follow_symlinks=False):
+                            try:
+                                stat = item.stat()
+                            except FileNotFoundError:  # Deleted during the walk
+                                continue
+                            rel = os.path.relpath(item.path, self.root)
+                            found.append((rel, stat.st_size, stat.st_mtime_ns))
+            except (PermissionError, FileNotFoundError):
+                continue
+        return found
+
+    def _index_file(self, rel: str, size: int, mtime_ns: int) -> Optional[IndexedFile]:
+        """Hash and classify one file; None if it was deleted since the walk or cannot be read"""
+        try:
+            sha256 = file_sha256(self.root / rel, size)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            self.errors[rel] = str(e)
+            return None
+        folder, subsection = self.classifier.classify(rel)
+        return IndexedFile(
+            path=rel,
+            size=size,
+            mtime_ns=mtime_ns,
+            sha256=sha256,
+            folder=folder,
+            subsection=subsection,
+            doc_key=document_key(rel)
+        )
+
+    def scan(self) -> Dict[str, int]:
+        """
+        (Re)index the data room.
+
+        Returns counts of added, modified, removed, unchanged and unreadable
+        files. Unreadable files are listed in `errors` and keep their
+        previous index entry, if any.
+        """
+        self.errors = {}
+        with os.scandir(self.root) as it:
+            entries = [e for e in it if not e.name.startswith('.')]
+        top_dirs = [Path(e.path) for e in entries if e.is_dir(follow_symlinks=False)]
+        top_files = []
+        for e in entries:
+            if e.is_file(follow_symlinks=False) and e.name.lower() not in IGNORED_NAMES:
+                try:
+                    stat = e.stat()
+                except FileNotFoundError:
+                    continue
+                top_files.append((os.path.relpath(e.path, self.root), stat.st_size, stat.st_mtime_ns))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            listing = list(top_files)
+            for found in pool.map(self._walk, top_dirs):
+                listing.extend(found)
+
+            seen = set()
+            to_hash = []
+            unchanged = 0
+            for rel, size, mtime_ns in listing:
+                seen.add(rel)
+                cached = self.files.get(rel)
+                if cached and cached.size == size and cached.mtime_ns == mtime_ns:
+                    unchanged += 1
+                else:
+                    to_hash.append((rel, size, mtime_ns))
+
+            # Hashing releases the GIL, so threads parallelize the I/O and digest work
+            hashed = list(pool.map(lambda item: self._index_file(*item), to_hash))
+            indexed = [entry for entry in hashed if entry is not None]
+            # Files deleted between the walk and hashing count as gone
+            seen.difference_update(rel for (rel, _, _), entry in zip(to_hash, hashed)
+                                   if entry is None and rel not in self.errors)
+
+        stats = {'added': 0, 'modified': 0, 'removed': 0, 'unchanged': unchanged,
+                 'errors': len(self.errors)}
+        for entry in indexed:
+            if entry.path in self.files:
+                self._remove(entry.path)
+                stats['modified'] += 1
+            else:
+                stats['added'] += 1
+            self._add(entry)
+
+        for rel in [p for p in self.files if p not in seen]:
+            self._remove(rel)
+            stats['removed'] += 1
+
+        if self.cache_path and (indexed or stats['removed']):
+            self.save()
+
+        return stats
+
+    def save(self):
+        """Persist the index so the next scan only re-hashes changed files"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([asdict(e) for e in self.files.values()], f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    # ---- Queries ----------------------------------------------------------
+
+    def exact_duplicates(self) -> List[List[str]]:
+        """Groups of files with identical content"""
+        return [sorted(paths) for paths in self._by_hash.values() if len(paths) > 1]
+
+    def version_groups(self) -> List[List[str]]:
+        """
+        Near-duplicate versions of the same document (same folder and name
+        modulo version/date/copy markers), current version first.
+        """
+        groups = []
+        for paths in self._by_doc_key.values():
+            distinct = {self.files[p].sha256 for p in paths}
+            if len(distinct) > 1:
+                groups.append(sorted(paths, key=self._recency, reverse=True))
+        return groups
+
+    def _recency(self, path: str) -> Tuple:
+        """Sort key: originals before copies ('Report (1).pdf'), then version, then mtime"""
+        stem = Path(path).stem
+        match = _VERSION_NUMBER.search(stem)
+        version = tuple(int(x) for x in match.group(1).split('.')) if match else ()
+        return (not _COPY_MARKER.search(stem), version, self.files[path].mtime_ns)
+
+    def superseded(self) -> List[str]:
+        """Files that are not the current version of their document"""
+        return [p for group in self.version_groups() for p in group[1:]]
+
+    def current_documents(self) -> List[str]:
+        """Files that count as documents: current versions, one path per identical content"""
+        superseded = set(self.superseded())
+        current = []
+        for paths in self._by_hash.values():
+            live = sorted(p for p in paths if p not in superseded)
+            if live:
+                current.append(live[0])
+        return sorted(current)
+
+    def coverage(self) -> Dict[Tuple[str, str], int]:
+        """(folder, subsection) -> number of current documents"""
+        if self._coverage is None:
+            coverage: Dict[Tuple[str, str], int] = {}
+            for path in self.current_documents():
+                entry = self.files[path]
+                if entry.subsection:
+                    key = (entry.folder, entry.subsection)
+                    coverage[key] = coverage.get(key, 0) + 1
+            self._coverage = coverage
+        return self._coverage
+
+    def unclassified(self) -> List[str]:
+        """Files that could not be mapped to a checklist subsection"""
+        return sorted(p for p, e in self.files.items() if not e.subsection)
+
+    def completeness(self) -> int:
+        """Percentage of checklist subsections covered by at least one document"""
+        total = sum(len(subs) for subs in self.classifier.folder_structure.values())
+        covered = sum(1 for count in self.coverage().values() if count > 0)
+        return round(100 * covered / total) if total else 0
+
+    def gaps(self) -> Dict[str, List[str]]:
+        """Folder -> subsections without any document"""
+        coverage = self.coverage()
+        missing = {}
+        for folder, subsections in self.classifier.folder_structure.items():
+            empty = [s for s in subsections if not coverage.get((folder, s))]
+            if empty:
+                missing[folder] = empty
+        return missing
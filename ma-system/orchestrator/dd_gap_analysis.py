@@ -0,0 +1,224 @@
+"""
+DD Checklist Gap Analysis
+
+Implements the dataroom workflow's `2_document_checklist` and
+`3_gap_analysis` steps. The checklist is an indexed table of items
+(section, name, priority, match phrases); a token index maps every word
+to the checklist phrases containing it, so matching a document only
+touches the items sharing a word with its name.
+
+Words are stemmed ("HR policies" matches "HR_Policy.pdf") and a document
+filed in a checklist section folder only matches items of that section.
+
+Adding or removing a document updates the status of the affected items
+and the gap report counters - nothing is recomputed for the rest of the
+checklist.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+try:
+    from .dataroom_indexer import SUBSECTION_KEYWORDS, WORKFLOW_PATH, tokenize
+    from .intent_matcher import stem
+except ImportError:  # Running as a script from the orchestrator directory
+    from dataroom_indexer import SUBSECTION_KEYWORDS, WORKFLOW_PATH, tokenize
+    from intent_matcher import stem
+
+
+PRIORITIES = ('critical', 'important', 'supporting')
+
+# workflow.yaml document_priorities key -> priority
+PRIORITY_KEYS = {
+    'critical_first': 'critical',
+    'important_second': 'important',
+    'supporting_third': 'supporting'
+}
+
+# Section folder and match phrases for document_priorities entries that are not folder subsections
+PRIORITY_ITEMS = {
+    'Audited financials (3 years)': ('02_financial_information',
+                                     ['audited financials', 'audit report', 'audited', 'testat', 'pruefungsbericht']),
+    'Major customer contracts': ('04_commercial', ['customer contract', 'customer agreement', 'kundenvertrag']),
+    'Material agreements': ('03_legal_documents', ['material agreement', 'material contract']),
+    'Litigation summary': ('03_legal_documents', ['litigation', 'rechtsstreit', 'klage']),
+    'Facility leases': ('05_operations', ['lease', 'mietvertrag']),
+    'Board minutes': ('03_legal_documents', ['board minutes', 'protokoll', 'minutes']),
+    'Marketing materials': ('04_commercial', ['marketing', 'brochure']),
+    'Operational procedures': ('05_operations', ['procedure', 'sop', 'prozess'])
+}
+
+STOPWORDS = {'and', 'of', 'the', 'und', 'der', 'die', 'das', 'for', 'pdf', 'docx', 'xlsx', 'doc', 'xls'}
+
+
+def _words(text: str) -> List[str]:
+    """Stemmed significant words ('HR_Policies.pdf' -> ['hr', 'policy'])"""
+    return [stem(t) for t in tokenize(text) if t not in STOPWORDS]
+
+
+@dataclass
+class ChecklistItem:
+    """One DD checklist line"""
+    item_id: int
+    section: str
+    name: str
+    priority: str = 'supporting'
+    required: bool = True
+    phrases: List[Tuple[str, ...]] = field(default_factory=list)
+    documents: Set[str] = field(default_factory=set)
+
+    @property
+    def status(self) -> str:
+        return 'available' if self.documents else 'missing'
+
+
+class ChecklistGapAnalysis:
+    """
+    Indexed DD checklist with incremental document matching.
+
+    The gap report (missing items per priority) is maintained as sets that
+    change only when an item flips between missing and available.
+    """
+
+    def __init__(self):
+        self.items: List[ChecklistItem] = []
+        self._token_index: Dict[str, List[Tuple[int, int]]] = {}  # word -> [(item_id, phrase_no)]
+        self._doc_items: Dict[str, Set[int]] = {}                  # document -> matched items
+        self._missing: Dict[str, Set[int]] = {p: set() for p in PRIORITIES}
+        self.sections: Set[str] = set()                             # Section folder names
+
+    @classmethod
+    def from_workflow(cls, workflow_path: Path = WORKFLOW_PATH) -> 'ChecklistGapAnalysis':
+        """
+        Build the default checklist from the dataroom-setup workflow:
+        every standard folder subsection, prioritized by document_priorities.
+        """
+        with open(workflow_path, 'r', encoding='utf-8') as f:
+            workflow = yaml.safe_load(f)
+
+        structure = workflow['standard_folder_structure']
+        priority_of: Dict[str, str] = {}
+        for key, names in workflow.get('document_priorities', {}).items():
+            for name in names:
+                priority_of[' '.join(_words(name))] = PRIORITY_KEYS.get(key, 'supporting')
+
+        checklist = cls()
+        known = set()
+        for section, subsections in structure.items():
+            for name in subsections:
+                key = ' '.join(_words(name))
+                known.add(key)
+                checklist.add_item(section, name, priority_of.get(key, 'supporting'),
+                                   keywords=SUBSECTION_KEYWORDS.get(name, []))
+
+        # Priority documents that are not a folder subsection become their own items
+        for key, names in workflow.get('document_priorities', {}).items():
+            for name in names:
+                if ' '.join(_words(name)) not in known:
+                    section, keywords = PRIORITY_ITEMS.get(name, ('', []))
+                    checklist.add_item(section, name, PRIORITY_KEYS.get(key, 'supporting'),
+                                       keywords=keywords)
+
+        return checklist
+
+    def add_item(self, section: str, name: str, priority: str = 'supporting',
+                 required: bool = True, keywords: Iterable[str] = ()) -> ChecklistItem:
+        """Add a checklist item and index its match phrases"""
+        item = ChecklistItem(item_id=len(self.items), section=section, name=name,
+                             priority=priority, required=required)
+        for phrase in [name, *keywords]:
+            words = tuple(dict.fromkeys(_words(phrase)))
+            if words:
+                item.phrases.append(words)
+                for word in words:
+                    self._token_index.setdefault(word, []).append((item.item_id, len(item.phrases) - 1))
+        self.items.append(item)
+        if section:
+            self.sections.add(section)
+        if required:
+            self._missing[priority].add(item.item_id)
+
+        # Documents already on file may satisfy the new item
+        for doc in list(self._doc_items):
+            if item.item_id in self._match(doc):
+                self._link(doc, item.item_id)
+        return item
+
+    def _section_of(self, document: str) -> str:
+        """Checklist section folder a document is filed in ('' if none)"""
+        return next((part for part in Path(document).parts[:-1] if part in self.sections), '')
+
+    def _match(self, document: str) -> Set[int]:
+        """
+        Items with at least one phrase fully contained in the document's
+        words - only items of the document's section when it is filed in one.
+        """
+        section = self._section_of(document)
+        words = set(_words(document))
+        hits: Dict[Tuple[int, int], int] = {}
+        for word in words:
+            for key in self._token_index.get(word, ()):
+                hits[key] = hits.get(key, 0) + 1
+        return {item_id for (item_id, phrase_no), count in hits.items()
+                if count == len(self.items[item_id].phrases[phrase_no])
+                and (not section or self.items[item_id].section in (section, ''))}
+
+    def _link(self, document: str, item_id: int):
+        item = self.items[item_id]
+        item.documents.add(document)
+        self._doc_items.setdefault(document, set()).add(item_id)
+        self._missing[item.priority].discard(item_id)
+
+    def add_document(self, document: str) -> List[ChecklistItem]:
+        """Match a new document (path or title); returns the items it satisfies"""
+        if document in self._doc_items:
+            return [self.items[i] for i in self._doc_items[document]]
+
+        self._doc_items[document] = set()
+        for item_id in self._match(document):
+            self._link(document, item_id)
+        return [self.items[i] for i in self._doc_items[document]]
+
+    def remove_document(self, document: str) -> List[ChecklistItem]:
+        """Unlink a removed document; returns the items that became missing"""
+        reopened = []
+        for item_id in self._doc_items.pop(document, set()):
+            item = self.items[item_id]
+            item.documents.discard(document)
+            if not item.documents and item.required:
+                self._missing[item.priority].add(item_id)
+                reopened.append(item)
+        return reopened
+
+    def sync(self, documents: Iterable[str]) -> Tuple[int, int]:
+        """Bring the document set in line with a data room listing; returns (added, removed)"""
+        current = set(documents)
+        added = current - self._doc_items.keys()
+        removed = self._doc_items.keys() - current
+        for doc in removed:
+            self.remove_document(doc)
+        for doc in added:
+            self.add_document(doc)
+        return len(added), len(removed)
+
+    def missing(self, priority: Optional[str] = None) -> List[ChecklistItem]:
+        """Missing required items, optionally for a single priority"""
+        priorities = [priority] if priority else PRIORITIES
+        return [self.items[i] for p in priorities for i in sorted(self._missing[p])]
+
+    def gap_report(self) -> Dict:
+        """Gap summary for management: coverage and missing items by priority"""
+        required = sum(1 for item in self.items if item.required)
+        missing = sum(len(ids) for ids in self._missing.values())
+        return {
+            'required_items': required,
+            'available': required - missing,
+            'coverage': round(100 * (required - missing) / required) if required else 100,
+            'missing': {
+                p: [f"{self.items[i].section}: {self.items[i].name}" for i in sorted(self._missing[p])]
+                for p in PRIORITIES
+            }
+        }
@@ -0,0 +1,94 @@
+"""
+Bilingual Intent Matcher
+
+Normalizes DE/EN requests before intent detection: lowercase, umlaut
+folding (ä/ae -> a, ß -> ss) and a light suffix stemmer, so "Bewertungen",
+"Käufers", "Datenräume" and "LOIs" reduce to the same stems as the
+vocabulary entries "bewertung", "käufer", "datenraum" and "loi".
+
+Intent vocabularies are plain keywords and phrases. They are stemmed once
+into a phrase -> intents table; matching a request is one hash lookup per
+token n-gram, independent of how many keywords are registered.
+"""
+
+import re
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+FOLDING = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+TRANSLITERATED = re.compile(r'([aou])e')  # "kaeufer" typed without umlauts
+TOKEN = re.compile(r'[a-z0-9]+')
+
+MIN_STEM = 3
+
+# Suffix -> replacement, longest first; at most one rule applies per token.
+# Covers the common DE plural/case endings and EN plural/verb forms.
+SUFFIXES: Tuple[Tuple[str, str], ...] = (
+    ('ungen', 'ung'),   # bewertungen, verhandlungen
+    ('ies', 'y'),       # companies
+    ('ing', ''),        # comparing
+    ('ern', 'er'),      # käufern
+    ('en', ''),         # fragen, angeboten
+    ('es', ''),         # issues, vertrages
+    ('ed', ''),         # compared
+    ('s', ''),          # buyers, lois, käufers
+    ('e', '')           # datenräume, frage, compare
+)
+
+
+@lru_cache(maxsize=16384)
+def stem(token: str) -> str:
+    """Fold and strip one inflectional suffix ('Datenräume' -> 'datenraum')"""
+    token = token.lower().translate(FOLDING)
+    if len(token) > MIN_STEM:
+        for suffix, replacement in SUFFIXES:
+            if token.endswith(suffix):
+                base = token[:-len(suffix)] + replacement
+                if len(base) >= MIN_STEM and not (suffix == 's' and token.endswith(('ss', 'us'))):
+                    token = base
+                break
+    # After stripping, so "issue"/"issues" both end up as "issu"
+    return TRANSLITERATED.sub(r'\1', token)
+
+
+def normalize(text: str) -> List[str]:
+    """Stemmed tokens of a request"""
+    return [stem(token) for token in TOKEN.findall(text.lower().translate(FOLDING))]
+
+
+def phrases(*groups: Iterable[str]) -> List[str]:
+    """Every combination of one entry per group: phrases(['find'], ['buyers', 'käufer'])"""
+    return [' '.join(parts) for parts in product(*groups)]
+
+
+class IntentMatcher:
+    """
+    Stemmed phrase table for intent detection.
+
+    `vocabulary` maps an intent to keywords/phrases ("data room", "käufer").
+    Results follow the vocabulary's intent order.
+    """
+
+    def __init__(self, vocabulary: Dict[str, Iterable[str]]):
+        self.intents = list(vocabulary)
+        self.table: Dict[Tuple[str, ...], Set[str]] = {}
+        for intent, entries in vocabulary.items():
+            for entry in entries:
+                key = tuple(normalize(entry))
+                if key:
+                    self.table.setdefault(key, set()).add(intent)
+        self.lengths = sorted({len(key) for key in self.table})
+
+    def match(self, text: str) -> List[str]:
+        """Intents whose keywords or phrases occur in `text`"""
+        tokens = normalize(text)
+        found: Set[str] = set()
+        table = self.table
+        for n in self.lengths:
+            for i in range(len(tokens) - n + 1):
+                intents = table.get(tuple(tokens[i:i + n]))
+                if intents:
+                    found |= intents
+        return [intent for intent in self.intents if intent in found]
@@ -0,0 +1,463 @@
+"""
+M&A System Knowledge Store - Append-Only Deal Event Log
+
+Agents record what they learn (new valuation versions, assumption changes,
+buyer updates) as events instead of rewriting the knowledge-base markdown
+files. Each deal gets its own append-only log; the materialized state is
+checkpointed periodically so loading reads a snapshot plus a short tail.
+
+Layout (per deal):
+    knowledge-base/deals/{deal-slug}/events.jsonl     append-only event log
+    knowledge-base/deals/{deal-slug}/checkpoint.json  snapshot + log offset
+    knowledge-base/deals/{deal-slug}/views/*.md       lazily rendered views
+
+Key Principles:
+1. Writes are appends - never rewrite history
+2. Reads are snapshot + tail replay
+3. Markdown views are derived, rendered only when stale
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, asdict
+
+
+DEFAULT_CHECKPOINT_INTERVAL = 50
+
+
+@dataclass
+class DealEvent:
+    """Single entry in a deal's event log"""
+    seq: int
+    event_type: str
+    timestamp: str
+    payload: Dict
+
+
+def default_state() -> Dict:
+    """Empty knowledge base state for a deal without any events"""
+    return {
+        'valuation': {'completed': False, 'latest': None, 'versions': []},
+        'assumptions': {},
+        'cim': {'completed': False, 'version': None},
+        'buyers_identified': {'count': 0, 'hot_leads': []},
+        'buyers': {},
+        'data_room': {'setup': False, 'completeness': 0},
+        'lois': {},
+        'completed_tasks': {}
+    }
+
+
+def _apply_valuation_version(state: Dict, payload: Dict):
+    """Record a new valuation version as the latest"""
+    version = payload['version']
+    entry = dict(payload)
+    versions = state['valuation']['versions']
+    versions[:] = [v for v in versions if v['version'] != version]
+    versions.append(entry)
+    state['valuation']['completed'] = True
+    state['valuation']['latest'] = version
+
+
+def _apply_assumption_change(state: Dict, payload: Dict):
+    """Track the current value and history of a single assumption"""
+    name = payload['assumption']
+    record = state['assumptions'].setdefault(name, {'value': None, 'history': []})
+    record['value'] = payload['value']
+    record['history'].append({
+        'version': payload.get('version'),
+        'value': payload['value'],
+        'rationale': payload.get('rationale', '')
+    })
+
+
+def _apply_buyer_update(state: Dict, payload: Dict):
+    """Merge buyer status/attributes and refresh the summary counters"""
+    name = payload['buyer']
+    buyer = state['buyers'].setdefault(name, {})
+    buyer.update({k: v for k, v in payload.items() if k != 'buyer'})
+
+    summary = state['buyers_identified']
+    summary['count'] = len(state['buyers'])
+    summary['hot_leads'] = sorted(
+        b for b, info in state['buyers'].items() if info.get('lead') == 'hot'
+    )
+
+
+def _apply_cim_version(state: Dict, payload: Dict):
+    """Record a new CIM version"""
+    state['cim']['version'] = payload['version']
+    state['cim']['completed'] = payload.get('completed', True)
+
+
+def _apply_data_room_update(state: Dict, payload: Dict):
+    """Merge data room status fields (setup, completeness, ...)"""
+    state['data_room'].update(payload)
+
+
+def _apply_task_completed(state: Dict, payload: Dict):
+    """Mark a `context.completed_tasks` milestone (teaser_created, loi_received, ...)"""
+    state['completed_tasks'][payload['task']] = payload.get('completed', True)
+
+
+def _apply_loi_received(state: Dict, payload: Dict):
+    """Store a normalized LOI (a revised LOI replaces the buyer's previous one)"""
+    state['lois'][payload['buyer']] = dict(payload)
+    state['completed_tasks']['loi_received'] = True
+
+
+# Event type -> reducer. Reducers mutate the state in place.
+REDUCERS: Dict[str, Callable[[Dict, Dict], None]] = {
+    'valuation_version': _apply_valuation_version,
+    'assumption_change': _apply_assumption_change,
+    'buyer_update': _apply_buyer_update,
+    'cim_version': _apply_cim_version,
+    'data_room_update': _apply_data_room_update,
+    'task_completed': _apply_task_completed,
+    'loi_received': _apply_loi_received
+}
+
+# Event type -> payload keys its reducer requires (checked before anything is written)
+REQUIRED_FIELDS: Dict[str, tuple] = {
+    'valuation_version': ('version',),
+    'assumption_change': ('assumption', 'value'),
+    'buyer_update': ('buyer',),
+    'cim_version': ('version',),
+    'task_completed': ('task',),
+    'loi_received': ('buyer',)
+}
+
+
+def validate_event(event_type: str, payload) -> None:
+    """Raise ValueError if a payload cannot be applied by its reducer"""
+    if not isinstance(payload, dict):
+        raise ValueError(f"{event_type} payload must be a dict, got {type(payload).__name__}")
+    missing = [key for key in REQUIRED_FIELDS.get(event_type, ()) if key not in payload]
+    if missing:
+        raise ValueError(f"{event_type} payload is missing {', '.join(missing)}")
+
+
+# Event type -> views that must be re-rendered when it occurs
+VIEW_DEPENDENCIES: Dict[str, List[str]] = {
+    'valuation_version': ['valuation-history', 'deal-insights'],
+    'assumption_change': ['valuation-history'],
+    'buyer_update': ['deal-insights'],
+    'cim_version': ['deal-insights'],
+    'data_room_update': ['deal-insights'],
+    'loi_received': ['deal-insights']
+}
+
+
+def deal_slug(deal_name: str) -> str:
+    """Filesystem-safe slug for a deal name ("Project Munich" -> "project-munich")"""
+    slug = re.sub(r'[^a-z0-9]+', '-', deal_name.lower()).strip('-')
+    return slug or 'default'
+
+
+class KnowledgeStore:
+    """
+    Append-only event log and materialized state for a single deal.
+
+    The in-memory state is always current; `events.jsonl` is the source of
+    truth and `checkpoint.json` lets a fresh process skip replaying the
+    whole log.
+    """
+
+    def __init__(self, kb_root: Path, deal_name: str,
+                 checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        self.deal_name = deal_name
+        self.deal_dir = Path(kb_root) / 'deals' / deal_slug(deal_name)
+        self.log_path = self.deal_dir / 'events.jsonl'
+        self.checkpoint_path = self.deal_dir / 'checkpoint.json'
+        self.views_dir = self.deal_dir / 'views'
+        self.checkpoint_interval = checkpoint_interval
+
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[DealEvent], None]] = []
+        self._view_seq: Dict[str, int] = {}   # view -> seq it was rendered at
+        self._dirty_seq: Dict[str, int] = {}  # view -> last seq that touched it
+
+        self.state = default_state()
+        self.seq = 0
+        self._offset = 0
+        self._since_checkpoint = 0
+        self.skipped_events: List[int] = []  # Log offsets of lines that could not be replayed
+        self._load()
+
+    def _load(self):
+        """Restore state from checkpoint, then replay the log tail"""
+        if self.checkpoint_path.exists():
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            self.state = default_state()
+            self.state.update(checkpoint['state'])
+            self.seq = checkpoint['seq']
+            self._offset = checkpoint['offset']
+
+        if not self.log_path.exists():
+            return
+
+        torn = False
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    torn = True  # Torn write at the end of the log
+                    break
+                try:
+                    event = DealEvent(**json.loads(line))
+                    validate_event(event.event_type, event.payload)
+                except (ValueError, TypeError):
+                    # Unreadable or invalid line (written before payloads were
+                    # validated): skip it rather than making the deal unopenable
+                    self.skipped_events.append(self._offset)
+                else:
+                    self._apply(event)
+                    self._since_checkpoint += 1
+                self._offset += len(line)
+
+        if torn:
+            # Drop the partial line so the next append starts on a clean line
+            os.truncate(self.log_path, self._offset)
+
+        # Views on disk may predate the replayed tail
+        for view in self._view_names():
+            self._dirty_seq[view] = self.seq
+
+    def _apply(self, event: DealEvent):
+        """Apply a single event to the in-memory state"""
+        reducer = REDUCERS.get(event.event_type)
+        if reducer:
+            reducer(self.state, event.payload)
+        self.seq = event.seq
+        for view in VIEW_DEPENDENCIES.get(event.event_type, []):
+            self._dirty_seq[view] = event.seq
+
+    def append(self, event_type: str, payload: Dict) -> DealEvent:
+        """
+        Append an event to the log and apply it to the materialized state.
+
+        The payload is validated first (ValueError if its reducer could not
+        apply it), so nothing is written for a rejected event. Notifies
+        subscribers after the event is durable in the log.
+        """
+        validate_event(event_type, payload)
+        with self._lock:
+            event = DealEvent(
+                seq=self.seq + 1,
+                event_type=event_type,
+                timestamp=datetime.now().isoformat(timespec='seconds'),
+                payload=payload
+            )
+            line = (json.dumps(asdict(event), ensure_ascii=False) + '\n').encode('utf-8')
+
+            self.deal_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'ab') as f:
+                f.write(line)
+
+            self._apply(event)
+            self._offset += len(line)
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= self.checkpoint_interval:
+                self._write_checkpoint()
+
+        for listener in list(self._listeners):
+            listener(event)
+
+        return event
+
+    def _write_checkpoint(self):
+        """Atomically persist the materialized state and log offset"""
+        tmp_path = self.checkpoint_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self.seq, 'offset': self._offset, 'state': self.state},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+
+    def checkpoint(self):
+        """Force a checkpoint (e.g. on shutdown)"""
+        with self._lock:
+            if self.seq:
+                self.deal_dir.mkdir(parents=True, exist_ok=True)
+                self._write_checkpoint()
+
+    def subscribe(self, listener: Callable[[DealEvent], None]):
+        """Register a callback invoked with every appended event"""
+        self._listeners.append(listener)
+
+    def snapshot(self) -> Dict:
+        """Deep copy of the current materialized state"""
+        with self._lock:
+            return copy.deepcopy(self.state)
+
+    def events(self, event_type: Optional[str] = None) -> List[DealEvent]:
+        """Read events from the log (full scan - for audits, not the hot path)"""
+        if not self.log_path.exists():
+            return []
+
+        result = []
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    event = DealEvent(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                if event_type is None or event.event_type == event_type:
+                    result.append(event)
+        return result
+
+    # ---- Markdown views -------------------------------------------------
+
+    def _view_names(self) -> List[str]:
+        return list(VIEW_RENDERERS.keys())
+
+    def stale_views(self) -> List[str]:
+        """Views whose inputs changed since they were last rendered"""
+        return [
+            view for view in self._view_names()
+            if self._dirty_seq.get(view, 0) > self._view_seq.get(view, 0)
+            or not (self.views_dir / f'{view}.md').exists()
+        ]
+
+    def refresh_views(self) -> List[Path]:
+        """Re-render only stale markdown views; returns the paths written"""
+        written = []
+        stale = self.stale_views()
+        if not stale or not self.seq:
+            return written
+
+        self.views_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            state = copy.deepcopy(self.state)
+            seq = self.seq
+
+        for view in stale:
+            path = self.views_dir / f'{view}.md'
+            tmp_path = path.with_suffix('.md.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(VIEW_RENDERERS[view](self.deal_name, state))
+            os.replace(tmp_path, path)
+            self._view_seq[view] = seq
+            written.append(path)
+
+        return written
+
+
+def _render_valuation_history(deal_name: str, state: Dict) -> str:
+    """Render the valuation timeline and assumption change table"""
+    versions = state['valuation']['versions']
+    lines = [
+        '# Valuation History',
+        '',
+        f'**Deal Name:** {deal_name}',
+        '',
+        '<!-- Generated from the deal event log - do not edit by hand -->',
+        '',
+        '## Valuation Timeline',
+        ''
+    ]
+
+    for v in versions:
+        lines.append(f"### Version {v['version']}")
+        lines.append(f"**Date:** {v.get('date', 'TBD')}")
+        lines.append(f"**Method:** {v.get('method', 'TBD')}")
+        lines.append(f"- **Enterprise Value Range:** {v.get('range', 'TBD')}")
+        lines.append(f"- **Midpoint:** {v.get('midpoint', 'TBD')}")
+        if v.get('notes'):
+            lines.append(f"**Notes:** {v['notes']}")
+        lines.append('')
+
+    version_ids = [v['version'] for v in versions]
+    if state['assumptions']:
+        lines.append('## Assumption Changes Over Time')
+        lines.append('')
+        lines.append('| Assumption | ' + ' | '.join(f'v{v}' for v in version_ids) + ' | Rationale for Changes |')
+        lines.append('|------------|' + '------|' * len(version_ids) + '----------------------|')
+        for name, record in state['assumptions'].items():
+            by_version = {h['version']: h['value'] for h in record['history']}
+            rationale = next((h['rationale'] for h in reversed(record['history']) if h['rationale']), '-')
+            # Events carry changed values only - carry the last value forward
+            cells, current = [], '-'
+            for v in version_ids:
+                current = by_version.get(v, current)
+                cells.append(str(current))
+            lines.append(f"| {name} | " + ' | '.join(cells) + f" | {rationale} |")
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def _render_deal_insights(deal_name: str, state: Dict) -> str:
+    """Render the auto-updated deal insights summary"""
+    valuation = state['valuation']
+    latest = next((v for v in valuation['versions'] if v['version'] == valuation['latest']), {})
+    buyers = state['buyers_identified']
+    data_room = state['data_room']
+
+    lines = [
+        '# Deal Insights',
+        '',
+        f'**Deal Name:** {deal_name}',
+        '',
+        '<!-- Generated from the deal event log - do not edit by hand -->',
+        '',
+        '## Valuation',
+        f"- **Latest Valuation:** {'v' + str(valuation['latest']) if valuation['latest'] else 'Not yet performed'}",
+        f"- **Valuation Date:** {latest.get('date', 'N/A')}",
+        f"- **Valuation Range:** {latest.get('range', 'TBD')}",
+        f"- **Midpoint:** {latest.get('midpoint', 'TBD')}",
+        '',
+        '## Identified Buyers',
+        f"- **Buyers Identified:** {buyers['count']}",
+        f"- **Hot Leads:** {', '.join(buyers['hot_leads']) if buyers['hot_leads'] else 'None'}",
+        '',
+        '## Transaction Documents',
+        f"- **CIM:** {'v' + str(state['cim']['version']) if state['cim']['version'] else 'Not started'}",
+        '',
+        '## Due Diligence Status',
+        f"- **Data Room:** {'Set up' if data_room.get('setup') else 'Not set up'}",
+        f"- **Completeness:** {data_room.get('completeness', 0)}%",
+        '',
+        '## Letters of Intent',
+        f"- **LOIs Received:** {len(state.get('lois', {}))}"
+        + (f" ({', '.join(sorted(state['lois']))})" if state.get('lois') else ''),
+        ''
+    ]
+    return '\n'.join(lines)
+
+
+VIEW_RENDERERS: Dict[str, Callable[[str, Dict], str]] = {
+    'valuation-history': _render_valuation_history,
+    'deal-insights': _render_deal_insights
+}
+
+
+# One live store per deal directory, shared by everything in the process
+_STORES: Dict[Path, KnowledgeStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_store(kb_root: Path, deal_name: str) -> KnowledgeStore:
+    """
+    The process-wide KnowledgeStore of a deal.
+
+    Two instances on the same events.jsonl would each keep their own seq
+    and offset and miss each other's appends, so the orchestrator, the
+    agents and the next-action portfolio all open deals through here.
+    """
+    deal_dir = (Path(kb_root) / 'deals' / deal_slug(deal_name)).resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(deal_dir)
+        if store is None:
+            store = _STORES[deal_dir] = KnowledgeStore(kb_root, deal_name)
+        return store
+
@@ -0,0 +1,468 @@
+"""
+Orchestrator Load Test
+
+Replays a request corpus against `MAOrchestrator` at a fixed offered rate
+and measures the whole path with local stub agents:
+
+    arrival -> route_request + check_dependencies   (router workers)
+            -> primary agent                        (per-agent worker pool, simulated latency/failures)
+            -> update_knowledge_base                (isolated temporary knowledge base)
+
+Arrivals are open-loop (scheduled, not waiting for completions), so a
+saturated stage shows up as growing queueing delay instead of a silently
+lower request rate. The report gives sustained throughput, queueing delay
+and latency percentiles per stage and per agent - enough to size worker
+counts before an onboarding wave.
+
+    python load_test.py --rate 40 --duration 30 --agent financial-analyst=150:0.02:8
+"""
+
+import argparse
+import json
+import math
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .router import MAOrchestrator
+except ImportError:  # Running as a script from the orchestrator directory
+    from router import MAOrchestrator
+
+
+CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
+
+SAMPLE_CORPUS = [
+    "Value this company",
+    "Update the DCF with the new WACC",
+    "Bewertung mit neuen Multiples aktualisieren",
+    "Create a CIM",
+    "Erstelle Teaser für Projekt München",
+    "Find potential buyers",
+    "Käufer finden im DACH-Raum",
+    "Set up the data room",
+    "Welche Dokumente fehlen im Datenraum?",
+    "New Q&A questions from buyers",
+    "Compare the LOIs we received",
+    "Angebote vergleichen",
+    "What's the tax structure we should use?",
+    "Normalized EBITDA and working capital peg",
+    "Prepare for the buyer meeting tomorrow",
+    "What should we do next?"
+]
+
+
+@dataclass
+class AgentProfile:
+    """Simulated agent: mean latency, lognormal spread, failure rate, worker count"""
+    latency_ms: float
+    failure_rate: float = 0.0
+    workers: int = 4
+    spread: float = 0.5
+
+
+DEFAULT_PROFILES: Dict[str, AgentProfile] = {
+    'managing-director': AgentProfile(20),
+    'financial-analyst': AgentProfile(150, 0.02),
+    'market-intelligence': AgentProfile(90, 0.01),
+    'document-generator': AgentProfile(220, 0.02),
+    'dd-manager': AgentProfile(60, 0.01),
+    'buyer-relationship-manager': AgentProfile(40),
+    'legal-tax-advisor': AgentProfile(100, 0.01)
+}
+
+
+def _kb_event(agent: str, request_id: int) -> Optional[Tuple[str, Dict]]:
+    """Knowledge base event a completed stub task records (None: no KB update)"""
+    if agent == 'financial-analyst':
+        return 'assumption_change', {'assumption': 'wacc', 'value': 0.09, 'version': f'lt-{request_id}'}
+    if agent == 'document-generator':
+        return 'cim_version', {'version': f'lt-{request_id}'}
+    if agent in ('market-intelligence', 'buyer-relationship-manager'):
+        return 'buyer_update', {'buyer': f'Load Test Buyer {request_id % 500}', 'status': agent}
+    if agent == 'dd-manager':
+        return 'data_room_update', {'setup': True, 'completeness': request_id % 100}
+    return None
+
+
+class StubAgentError(RuntimeError):
+    """Simulated agent failure"""
+
+
+class StubAgent:
+    """Sleeps for a lognormal service time; fails with the profile's probability"""
+
+    def __init__(self, name: str, profile: AgentProfile, seed: int):
+        self.name = name
+        self.profile = profile
+        self._random = random.Random(seed)
+        # Lognormal with the requested mean
+        self._mu = math.log(max(profile.latency_ms, 0.001) / 1000) - profile.spread ** 2 / 2
+        self.pool = ThreadPoolExecutor(max_workers=profile.workers, thread_name_prefix=f'stub-{name}')
+
+    def service_time(self) -> float:
+        return self._random.lognormvariate(self._mu, self.profile.spread)
+
+    def run(self):
+        time.sleep(self.service_time())
+        if self._random.random() < self.profile.failure_rate:
+            raise StubAgentError(f'{self.name}: simulated failure')
+
+
+@dataclass
+class TaskRecord:
+    """One agent dispatch"""
+    request_id: int
+    agent: str
+    enqueued: float
+    started: float = 0.0
+    finished: float = 0.0
+    kb_seconds: float = 0.0
+    attempts: int = 0
+    ok: bool = False
+    error: Optional[str] = None     # Exception raised by the worker (not a stub agent failure)
+
+
+@dataclass
+class RequestRecord:
+    """One replayed request (times are perf_counter seconds)"""
+    request_id: int
+    text: str
+    arrival: float
+    route_start: float = 0.0
+    route_end: float = 0.0
+    prerequisites: int = 0
+    tasks: List[TaskRecord] = field(default_factory=list)
+    error: Optional[str] = None     # Exception raised while routing/dispatching
+
+    @property
+    def completed(self) -> float:
+        return max((t.finished for t in self.tasks if t.error is None), default=self.route_end)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds (nearest rank)"""
+    if not values:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 2),
+        'p95_ms': round(ordered[min(last, int(len(ordered) * 0.95))] * 1000, 2),
+        'p99_ms': round(ordered[min(last, int(len(ordered) * 0.99))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+
+def _growth(pairs: List[Tuple[float, float]]) -> float:
+    """Mean of the last third minus mean of the first third (by arrival), in ms"""
+    if len(pairs) < 6:
+        return 0.0
+    values = [v for _, v in sorted(pairs)]
+    third = len(values) // 3
+    return round((sum(values[-third:]) - sum(values[:third])) / third * 1000, 2)
+
+
+@dataclass
+class AgentStats:
+    agent: str
+    workers: int
+    tasks: int
+    failures: int
+    utilization: float
+    queue_delay: Dict[str, float]
+    service: Dict[str, float]
+    latency: Dict[str, float]
+    queue_growth_ms: float
+
+    @property
+    def saturated(self) -> bool:
+        return self.utilization >= 0.95 or self.queue_growth_ms > self.service['p50_ms']
+
+
+@dataclass
+class LoadTestReport:
+    offered_rate: float
+    requests: int
+    wall_seconds: float
+    throughput: float
+    sustained_throughput: float
+    drain_seconds: float
+    ingress_delay: Dict[str, float]
+    ingress_growth_ms: float
+    routing: Dict[str, float]
+    kb_update: Dict[str, float]
+    end_to_end: Dict[str, float]
+    with_prerequisites: int
+    agents: List[AgentStats]
+    failed_requests: int = 0
+    errors: List[str] = field(default_factory=list)     # Distinct worker exceptions
+
+    def lines(self) -> List[str]:
+        def fmt(p: Dict[str, float]) -> str:
+            return f"p50 {p['p50_ms']:>8.1f}  p95 {p['p95_ms']:>8.1f}  p99 {p['p99_ms']:>8.1f}  max {p['max_ms']:>8.1f} ms"
+
+        lines = [
+            f"Offered rate:        {self.offered_rate:.1f} req/s ({self.requests} requests)",
+            f"Throughput:          {self.throughput:.1f} req/s overall, {self.sustained_throughput:.1f} req/s sustained",
+            f"Drain after last arrival: {self.drain_seconds:.2f} s",
+            f"Ingress queue delay: {fmt(self.ingress_delay)}  (growth {self.ingress_growth_ms:+.1f} ms)",
+            f"Route + deps:        {fmt(self.routing)}",
+            f"KB update:           {fmt(self.kb_update)}",
+            f"End to end:          {fmt(self.end_to_end)}",
+            f"Dispatched with open prerequisites: {self.with_prerequisites}",
+            f"Failed requests (router errors): {self.failed_requests}",
+            *([f"Worker exceptions:   {len(self.errors)} distinct"] if self.errors else []),
+            *(f"  {error}" for error in self.errors[:5]),
+            '',
+            f"{'Agent':<28}{'wrk':>4}{'tasks':>7}{'fail':>6}{'util':>7}{'queue p95':>11}{'lat p95':>10}{'lat p99':>10}{'growth':>9}"
+        ]
+        for a in self.agents:
+            lines.append(
+                f"{a.agent:<28}{a.workers:>4}{a.tasks:>7}{a.failures:>6}{a.utilization:>7.0%}"
+                f"{a.queue_delay['p95_ms']:>11.1f}{a.latency['p95_ms']:>10.1f}{a.latency['p99_ms']:>10.1f}"
+                f"{a.queue_growth_ms:>+9.1f}" + ('  SATURATED' if a.saturated else '')
+            )
+        return lines
+
+
+class LoadTest:
+    """
+    Open-loop replay of a corpus through a real `MAOrchestrator`.
+
+    The orchestrator runs against a temporary knowledge base unless
+    `kb_root` is given; routing telemetry is off unless `telemetry=True`
+    so load tests do not pollute production routing statistics.
+    """
+
+    def __init__(self, corpus: List[str], rate: float,
+                 profiles: Optional[Dict[str, AgentProfile]] = None,
+                 router_workers: int = 2, retries: int = 0, arrivals: str = 'poisson',
+                 seed: int = 7, config_path: Path = CONFIG_PATH,
+                 kb_root: Optional[Path] = None, telemetry: bool = False):
+        if not corpus:
+            raise ValueError('Empty request corpus')
+        if rate <= 0:
+            raise ValueError('Rate must be positive')
+        if arrivals not in ('poisson', 'uniform'):
+            raise ValueError(f"Unknown arrival process '{arrivals}' (poisson | uniform)")
+        self.corpus = corpus
+        self.rate = rate
+        self.profiles = dict(DEFAULT_PROFILES)
+        self.profiles.update(profiles or {})
+        self.router_workers = router_workers
+        self.retries = retries
+        self.arrivals = arrivals
+        self.seed = seed
+        self.config_path = config_path
+        self.kb_root = kb_root
+        self.telemetry = telemetry
+
+    def _schedule(self, count: int) -> List[float]:
+        """Arrival offsets in seconds"""
+        rng = random.Random(self.seed)
+        offsets, t = [], 0.0
+        for _ in range(count):
+            offsets.append(t)
+            t += rng.expovariate(self.rate) if self.arrivals == 'poisson' else 1 / self.rate
+        return offsets
+
+    def run(self, requests: Optional[int] = None, duration: Optional[float] = None) -> LoadTestReport:
+        """Replay `requests` requests (or `duration` seconds at the offered rate)"""
+        count = requests or max(1, int((duration or 10) * self.rate))
+        with tempfile.TemporaryDirectory(prefix='ma-load-test-') as tmp:
+            orchestrator = MAOrchestrator(str(self.config_path), kb_root=self.kb_root or Path(tmp))
+            if orchestrator.telemetry is not None and not self.telemetry:
+                orchestrator.telemetry.close()
+                orchestrator.telemetry = None
+            orchestrator.next_actions  # Subscribe the rule engine like a live session
+            records = self._replay(orchestrator, count)
+            if orchestrator.telemetry is not None:
+                orchestrator.telemetry.flush()
+        return self._report(records)
+
+    def _replay(self, orchestrator: MAOrchestrator, count: int) -> List[RequestRecord]:
+        agents: Dict[str, StubAgent] = {}
+        agents_lock = threading.Lock()
+
+        def agent_for(name: str) -> StubAgent:
+            with agents_lock:
+                if name not in agents:
+                    profile = self.profiles.get(name) or AgentProfile(50)
+                    agents[name] = StubAgent(name, profile, self.seed + len(agents) + 1)
+                return agents[name]
+
+        def execute(agent: StubAgent, task: TaskRecord):
+            task.started = time.perf_counter()
+            for attempt in range(self.retries + 1):
+                task.attempts = attempt + 1
+                try:
+                    agent.run()
+                except StubAgentError:
+                    continue
+                task.ok = True
+                break
+            if task.ok:
+                event = _kb_event(agent.name, task.request_id)
+                if event:
+                    kb_start = time.perf_counter()
+                    orchestrator.update_knowledge_base(*event)
+                    task.kb_seconds = time.perf_counter() - kb_start
+            task.finished = time.perf_counter()
+
+        def handle(record: RequestRecord):
+            record.route_start = time.perf_counter()
+            decisions = orchestrator.route_request(record.text)
+            for decision in decisions:
+                record.prerequisites += bool(orchestrator.check_dependencies(decision))
+            record.route_end = time.perf_counter()
+            for decision in decisions:
+                agent = agent_for(decision.primary_agent)
+                task = TaskRecord(record.request_id, agent.name, enqueued=time.perf_counter())
+                record.tasks.append(task)
+                task_futures.append((agent.pool.submit(execute, agent, task), task))
+
+        records = []
+        request_futures: List[Tuple[Future, RequestRecord]] = []
+        task_futures: List[Tuple[Future, TaskRecord]] = []
+        router_pool = ThreadPoolExecutor(max_workers=self.router_workers, thread_name_prefix='lt-router')
+        start = time.perf_counter()
+        for i, offset in enumerate(self._schedule(count)):
+            wait = start + offset - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            record = RequestRecord(i + 1, self.corpus[i % len(self.corpus)], arrival=start + offset)
+            records.append(record)
+            request_futures.append((router_pool.submit(handle, record), record))
+
+        router_pool.shutdown(wait=True)
+        for agent in list(agents.values()):
+            agent.pool.shutdown(wait=True)
+
+        # Worker exceptions count as failures and are kept out of the timings
+        for future, record in request_futures:
+            if future.exception() is not None:
+                record.error = repr(future.exception())
+        for future, task in task_futures:
+            if future.exception() is not None:
+                task.ok = False
+                task.error = repr(future.exception())
+        return records
+
+    def _report(self, records: List[RequestRecord]) -> LoadTestReport:
+        first = records[0].arrival
+        last_arrival = records[-1].arrival
+        routed = [r for r in records if r.error is None]
+        completions = [r.completed for r in routed] or [first]
+        wall = max(completions) - first
+
+        # Completions per second; first and last bucket are warm-up/drain
+        buckets: Dict[int, int] = {}
+        for done in completions:
+            second = int(done - first)
+            buckets[second] = buckets.get(second, 0) + 1
+        steady = [buckets.get(s, 0) for s in range(1, max(buckets))]
+        sustained = sorted(steady)[len(steady) // 2] if steady else len(records) / max(wall, 1e-9)
+
+        tasks = [t for r in records for t in r.tasks]
+        agents = []
+        for name in sorted({t.agent for t in tasks}):
+            dispatched = [t for t in tasks if t.agent == name]
+            own = [t for t in dispatched if t.error is None]
+            workers = self.profiles.get(name, AgentProfile(50)).workers
+            busy = sum(t.finished - t.started for t in own)
+            agents.append(AgentStats(
+                agent=name,
+                workers=workers,
+                tasks=len(dispatched),
+                failures=sum(not t.ok for t in dispatched),
+                utilization=round(busy / (workers * wall), 3) if wall else 0.0,
+                queue_delay=percentiles([t.started - t.enqueued for t in own]),
+                service=percentiles([t.finished - t.started - t.kb_seconds for t in own]),
+                latency=percentiles([t.finished - t.enqueued for t in own]),
+                queue_growth_ms=_growth([(t.enqueued, t.started - t.enqueued) for t in own])
+            ))
+
+        return LoadTestReport(
+            offered_rate=self.rate,
+            requests=len(records),
+            wall_seconds=round(wall, 3),
+            throughput=round(len(records) / wall, 2) if wall else 0.0,
+            sustained_throughput=float(sustained),
+            drain_seconds=round(max(completions) - last_arrival, 3),
+            ingress_delay=percentiles([r.route_start - r.arrival for r in routed]),
+            ingress_growth_ms=_growth([(r.arrival, r.route_start - r.arrival) for r in routed]),
+            routing=percentiles([r.route_end - r.route_start for r in routed]),
+            kb_update=percentiles([t.kb_seconds for t in tasks if t.kb_seconds and t.error is None]),
+            end_to_end=percentiles([r.completed - r.arrival for r in routed]),
+            with_prerequisites=sum(bool(r.prerequisites) for r in records),
+            agents=agents,
+            failed_requests=len(records) - len(routed),
+            errors=sorted({e for e in [r.error for r in records] + [t.error for t in tasks] if e})
+        )
+
+
+def load_corpus(path: Path) -> List[str]:
+    """One request per line (blank lines and # comments skipped); .jsonl uses the 'text' field"""
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.suffix == '.jsonl':
+                entry = json.loads(line)
+                line = entry.get('text') or entry.get('request') or ''
+            if line:
+                requests.append(line)
+    return requests
+
+
+def _parse_profile(spec: str) -> Tuple[str, Dict]:
+    """'financial-analyst=150:0.02:8' -> name and overrides (latency ms, failure rate, workers)"""
+    name, _, values = spec.partition('=')
+    fields = (('latency_ms', float), ('failure_rate', float), ('workers', int))
+    try:
+        return name, {key: cast(value) for (key, cast), value in zip(fields, values.split(':')) if value}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid agent profile '{spec}' (name=latency_ms[:failure_rate[:workers]])")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Replay a request corpus against the orchestrator with stub agents')
+    parser.add_argument('--rate', type=float, default=20.0, help='offered requests per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of arrivals (ignored with --requests)')
+    parser.add_argument('--requests', type=int, help='number of requests to replay')
+    parser.add_argument('--corpus', type=Path, help='request corpus (.txt one per line, or .jsonl with "text")')
+    parser.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson')
+    parser.add_argument('--router-workers', type=int, default=2)
+    parser.add_argument('--workers', type=int, help='worker count for every agent (before --agent overrides)')
+    parser.add_argument('--agent', action='append', type=_parse_profile, default=[],
+                        metavar='NAME=MS[:FAIL[:WORKERS]]', help='stub agent profile override (repeatable)')
+    parser.add_argument('--retries', type=int, default=0, help='retries per failed agent task')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--telemetry', action='store_true', help='keep routing telemetry enabled')
+    args = parser.parse_args(argv)
+
+    profiles = dict(DEFAULT_PROFILES)
+    if args.workers:
+        profiles = {name: replace(p, workers=args.workers) for name, p in profiles.items()}
+    for name, overrides in args.agent:
+        profiles[name] = replace(profiles.get(name) or AgentProfile(50, workers=args.workers or 4), **overrides)
+
+    test = LoadTest(
+        load_corpus(args.corpus) if args.corpus else SAMPLE_CORPUS,
+        args.rate, profiles, router_workers=args.router_workers, retries=args.retries,
+        arrivals=args.arrivals, seed=args.seed, telemetry=args.telemetry
+    )
+    report = test.run(requests=args.requests, duration=args.duration)
+    print('\n'.join(report.lines()))
+
+
+if __name__ == "__main__":
+    main()
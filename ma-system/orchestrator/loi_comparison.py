@@ -0,0 +1,289 @@
+"""
+LOI Comparison Engine
+
+Normalizes letters of intent into a typed offer table and ranks them by
+risk-adjusted present value across discount-rate scenarios.
+
+Value components per offer:
+- Cash at closing       - discounted to the expected closing date,
+                          weighted by closing certainty
+- Earn-out              - weighted by achievement probability
+- Escrow / holdback     - weighted by release probability
+- Deferred / vendor loan - discounted to its payment date
+
+Closing certainty is derived from the LOI's closing conditions. Rankings
+are maintained incrementally: adding or revising an LOI only values that
+offer and re-inserts it into each scenario's ranking.
+"""
+
+import re
+from array import array
+from bisect import insort
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+# Probability that a closing condition causes the deal to fail
+CONDITION_RISK = {
+    'financing': 0.10,
+    'regulatory': 0.05,
+    'antitrust': 0.07,
+    'confirmatory_dd': 0.05,
+    'due_diligence': 0.08,
+    'board_approval': 0.02,
+    'management_retention': 0.03,
+    'customer_consent': 0.04,
+    'other': 0.02
+}
+
+DEFAULT_SCENARIOS = {'low': 0.08, 'base': 0.10, 'high': 0.12}
+
+# Raw LOI field -> LOIOffer field
+FIELD_ALIASES = {
+    'price': 'headline_price', 'headline': 'headline_price', 'purchase_price': 'headline_price',
+    'enterprise_value': 'headline_price', 'ev': 'headline_price', 'kaufpreis': 'headline_price',
+    'earnout': 'earn_out', 'earn-out': 'earn_out',
+    'holdback': 'escrow', 'escrow_amount': 'escrow',
+    'vendor_loan': 'deferred', 'deferred_consideration': 'deferred',
+    'conditions': 'closing_conditions'
+}
+
+# Unit-less amounts from this size on are read as euros, not millions
+ABSOLUTE_AMOUNT = 10_000.0
+
+_MONEY_UNITS = {'k': 0.001, 'm': 1.0, 'mm': 1.0, 'mio': 1.0, 'b': 1000.0, 'bn': 1000.0, 'mrd': 1000.0}
+
+
+def parse_number(text: str) -> float:
+    """'1.2' -> 1.2, '250,000' -> 250000, '1.250.000,50' -> 1250000.5 (EN or DE separators)"""
+    if ',' in text and '.' in text:
+        decimal = ',' if text.rfind(',') > text.rfind('.') else '.'
+        thousands = '.' if decimal == ',' else ','
+        return float(text.replace(thousands, '').replace(decimal, '.'))
+    for sep in (',', '.'):
+        if sep in text:
+            # Several separators, or exactly three digits after one: thousands
+            if text.count(sep) > 1 or len(text.rsplit(sep, 1)[1]) == 3:
+                return float(text.replace(sep, ''))
+            return float(text.replace(sep, '.'))
+    return float(text)
+
+
+def parse_money(value) -> float:
+    """
+    '€45M', '45 Mio', '1.2bn', 45 -> EUR millions.
+
+    Amounts without a unit are millions unless they are clearly absolute
+    euros ('250,000' or '45000000' -> 0.25 / 45.0).
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'(\d+(?:[.,]\d+)*)\s*(k|mm|mio|mrd|bn|m|b)?\b', str(value or '').lower())
+    if not match:
+        return 0.0
+    number = parse_number(match.group(1))
+    if match.group(2) is None and number >= ABSOLUTE_AMOUNT:
+        return number / 1_000_000.0
+    return number * _MONEY_UNITS.get(match.group(2) or 'm', 1.0)
+
+
+def _condition_key(condition: str) -> str:
+    key = re.sub(r'[^a-z]+', '_', condition.lower()).strip('_')
+    if key in CONDITION_RISK:
+        return key
+    for known in CONDITION_RISK:
+        if known.split('_')[0] in key:
+            return known
+    return 'other'
+
+
+@dataclass
+class LOIOffer:
+    """Normalized LOI terms (amounts in EUR millions)"""
+    buyer: str
+    headline_price: float
+    earn_out: float = 0.0
+    earn_out_probability: float = 0.5
+    earn_out_years: float = 2.0
+    escrow: float = 0.0
+    escrow_release_probability: float = 0.9
+    escrow_years: float = 1.5
+    deferred: float = 0.0
+    deferred_years: float = 2.0
+    closing_months: float = 4.0
+    closing_conditions: List[str] = field(default_factory=list)
+    received: str = ""
+
+    @property
+    def cash_at_closing(self) -> float:
+        return max(self.headline_price - self.earn_out - self.escrow - self.deferred, 0.0)
+
+    @property
+    def closing_certainty(self) -> float:
+        certainty = 1.0
+        for condition in self.closing_conditions:
+            certainty *= 1.0 - CONDITION_RISK[_condition_key(condition)]
+        return certainty
+
+
+def normalize_offer(raw: Dict) -> LOIOffer:
+    """
+    Build an LOIOffer from loosely structured LOI terms.
+
+    Accepts common aliases ('price', 'earnout', 'holdback', ...) and money
+    strings ('€45M'). Probabilities may be given as 0-1 or percentages.
+    """
+    values: Dict = {}
+    for key, value in raw.items():
+        name = FIELD_ALIASES.get(key.lower(), key.lower())
+        values[name] = value
+
+    offer = LOIOffer(buyer=str(values.pop('buyer')), headline_price=parse_money(values.pop('headline_price', 0)))
+    for name in ('earn_out', 'escrow', 'deferred'):
+        if name in values:
+            setattr(offer, name, parse_money(values.pop(name)))
+    for name in ('earn_out_probability', 'escrow_release_probability'):
+        if name in values:
+            p = float(values.pop(name))
+            setattr(offer, name, p / 100.0 if p > 1 else p)
+    for name in ('earn_out_years', 'escrow_years', 'deferred_years', 'closing_months'):
+        if name in values:
+            setattr(offer, name, float(values.pop(name)))
+    conditions = values.pop('closing_conditions', [])
+    offer.closing_conditions = [c.strip() for c in conditions.split(',')] if isinstance(conditions, str) else list(conditions)
+    offer.received = str(values.pop('received', ''))
+    return offer
+
+
+class LOIBook:
+    """
+    Typed offer table with incrementally maintained rankings.
+
+    Offers are stored column-wise (one array per value component). Each
+    discount scenario keeps its own sorted ranking that new or revised
+    LOIs are inserted into.
+    """
+
+    def __init__(self, scenarios: Optional[Dict[str, float]] = None):
+        self.scenarios = dict(scenarios or DEFAULT_SCENARIOS)
+        self.offers: List[LOIOffer] = []
+        self._row_by_buyer: Dict[str, int] = {}
+
+        # Value component columns (one entry per row, including superseded rows)
+        self.cash = array('d')
+        self.cash_years = array('d')
+        self.earn_out = array('d')
+        self.earn_out_years = array('d')
+        self.escrow = array('d')
+        self.escrow_years = array('d')
+        self.deferred = array('d')
+        self.deferred_years = array('d')
+        self.certainty = array('d')
+
+        self._pv: Dict[str, array] = {s: array('d') for s in self.scenarios}
+        self._ranking: Dict[str, List[Tuple[float, str, int]]] = {s: [] for s in self.scenarios}
+
+    def __len__(self) -> int:
+        return len(self._row_by_buyer)
+
+    def add(self, offer) -> LOIOffer:
+        """Add a new LOI (or a revised LOI from the same buyer)"""
+        if not isinstance(offer, LOIOffer):
+            offer = normalize_offer(offer)
+
+        previous = self._row_by_buyer.get(offer.buyer)
+        if previous is not None:
+            for scenario, ranking in self._ranking.items():
+                ranking.remove((-self._pv[scenario][previous], offer.buyer, previous))
+
+        row = len(self.offers)
+        self.offers.append(offer)
+        self._row_by_buyer[offer.buyer] = row
+
+        certainty = offer.closing_certainty
+        self.cash.append(offer.cash_at_closing * certainty)
+        self.cash_years.append(offer.closing_months / 12.0)
+        self.earn_out.append(offer.earn_out * offer.earn_out_probability * certainty)
+        self.earn_out_years.append(offer.closing_months / 12.0 + offer.earn_out_years)
+        self.escrow.append(offer.escrow * offer.escrow_release_probability * certainty)
+        self.escrow_years.append(offer.closing_months / 12.0 + offer.escrow_years)
+        self.deferred.append(offer.deferred * certainty)
+        self.deferred_years.append(offer.closing_months / 12.0 + offer.deferred_years)
+        self.certainty.append(certainty)
+
+        for scenario, rate in self.scenarios.items():
+            pv = self._present_value(row, rate)
+            self._pv[scenario].append(pv)
+            insort(self._ranking[scenario], (-pv, offer.buyer, row))
+
+        return offer
+
+    def _present_value(self, row: int, rate: float) -> float:
+        base = 1.0 + rate
+        return (self.cash[row] / base ** self.cash_years[row]
+                + self.earn_out[row] / base ** self.earn_out_years[row]
+                + self.escrow[row] / base ** self.escrow_years[row]
+                + self.deferred[row] / base ** self.deferred_years[row])
+
+    def add_scenario(self, name: str, rate: float):
+        """Value all current offers under an additional discount rate"""
+        self.scenarios[name] = rate
+        base = 1.0 + rate
+        # Column-wise pass over every row
+        self._pv[name] = array('d', (
+            c / base ** cy + e / base ** ey + s / base ** sy + d / base ** dy
+            for c, cy, e, ey, s, sy, d, dy in zip(self.cash, self.cash_years, self.earn_out,
+                                                  self.earn_out_years, self.escrow, self.escrow_years,
+                                                  self.deferred, self.deferred_years)
+        ))
+        self._ranking[name] = sorted(
+            (-self._pv[name][row], buyer, row) for buyer, row in self._row_by_buyer.items()
+        )
+
+    @property
+    def primary_scenario(self) -> str:
+        """'base' if defined, else the first scenario"""
+        return 'base' if 'base' in self._ranking else next(iter(self._ranking))
+
+    def _scenario(self, scenario: Optional[str]) -> str:
+        if scenario is None or (scenario == 'base' and 'base' not in self._ranking):
+            return self.primary_scenario
+        if scenario not in self._ranking:
+            raise KeyError(f"Unknown discount scenario '{scenario}' (have: {', '.join(self._ranking)})")
+        return scenario
+
+    def ranking(self, scenario: Optional[str] = None) -> List[Tuple[str, float]]:
+        """(buyer, risk-adjusted PV) best first (default: primary scenario)"""
+        return [(buyer, round(-neg_pv, 3)) for neg_pv, buyer, _ in self._ranking[self._scenario(scenario)]]
+
+    def leader(self, scenario: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Best offer under a scenario (default: primary scenario)"""
+        ranking = self._ranking[self._scenario(scenario)]
+        if not ranking:
+            return None
+        neg_pv, buyer, _ = ranking[0]
+        return buyer, round(-neg_pv, 3)
+
+    def comparison_table(self) -> List[Dict]:
+        """One row per live offer: terms, certainty, PV per scenario and rank"""
+        ranks = {s: {buyer: i for i, (_, buyer, _) in enumerate(r, 1)} for s, r in self._ranking.items()}
+        primary = self.primary_scenario
+
+        table = []
+        for _, buyer, row in self._ranking[primary]:
+            offer = self.offers[row]
+            entry = {
+                'buyer': buyer,
+                'headline_price': offer.headline_price,
+                'cash_at_closing': offer.cash_at_closing,
+                'earn_out': offer.earn_out,
+                'escrow': offer.escrow,
+                'deferred': offer.deferred,
+                'closing_certainty': round(self.certainty[row], 4),
+                'closing_conditions': offer.closing_conditions
+            }
+            for scenario in self.scenarios:
+                entry[f'pv_{scenario}'] = round(self._pv[scenario][row], 3)
+                entry[f'rank_{scenario}'] = ranks[scenario][buyer]
+            table.append(entry)
+        return table
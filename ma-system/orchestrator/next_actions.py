@@ -0,0 +1,269 @@
+"""
+Next-Action Rule Engine
+
+Compiles the `next_actions` blocks of the workflow YAMLs into rules over a
+small set of deal facts (the `context.completed_tasks` milestones) and keeps
+the suggestions of every tracked deal current from knowledge store events.
+
+    next_actions:
+      - id: create_cim
+        suggest: "Create CIM now that valuation is complete"
+        when: [valuation]         # all facts must be set
+        unless: [cim_created]     # none of these may be set
+
+Each event type maps to the facts it can change and each fact to the rules
+reading it, so a `buyer_update` re-evaluates the two buyer rules of that one
+deal - nothing is polled and no other deal is touched. The portfolio keeps a
+rule -> deals index for "which deals need buyer outreach?" lookups.
+"""
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+try:
+    from .knowledge_store import DealEvent, KnowledgeStore, deal_slug, open_store
+except ImportError:  # Running as a script from the orchestrator directory
+    from knowledge_store import DealEvent, KnowledgeStore, deal_slug, open_store
+
+
+WORKFLOWS_DIR = Path(__file__).parent.parent / "workflows"
+
+
+def _task(state: Dict, tasks: Dict, name: str) -> bool:
+    """Milestone recorded in the event log, falling back to config"""
+    return bool(state.get('completed_tasks', {}).get(name, tasks.get(name, False)))
+
+
+# Fact -> extractor(kb state, config completed_tasks). Fact names are the
+# `context.completed_tasks` keys; the knowledge base wins over config.
+FACTS: Dict[str, Callable[[Dict, Dict], object]] = {
+    'valuation': lambda s, t: s['valuation']['completed'] or _task(s, t, 'valuation'),
+    'cim_created': lambda s, t: s['cim']['completed'] or _task(s, t, 'cim_created'),
+    'teaser_created': lambda s, t: _task(s, t, 'teaser_created'),
+    'buyers_identified': lambda s, t: s['buyers_identified']['count'] or int(_task(s, t, 'buyers_identified')),
+    'dataroom_setup': lambda s, t: bool(s['data_room'].get('setup')) or _task(s, t, 'dataroom_setup'),
+    'loi_received': lambda s, t: bool(s.get('lois')) or _task(s, t, 'loi_received')
+}
+
+# Event type -> facts it can change (`task_completed` names its fact in the payload)
+FACT_EVENTS: Dict[str, Tuple[str, ...]] = {
+    'valuation_version': ('valuation',),
+    'cim_version': ('cim_created',),
+    'buyer_update': ('buyers_identified',),
+    'data_room_update': ('dataroom_setup',),
+    'loi_received': ('loi_received',)
+}
+
+# Old `suggest_next_actions(current_state)` keys -> facts
+LEGACY_KEYS = {
+    'valuation_complete': 'valuation',
+    'cim_complete': 'cim_created'
+}
+
+
+def changed_facts(event: DealEvent) -> Tuple[str, ...]:
+    """Facts an event may have changed"""
+    if event.event_type == 'task_completed':
+        task = event.payload.get('task')
+        return (task,) if task in FACTS else ()
+    return FACT_EVENTS.get(event.event_type, ())
+
+
+def extract_facts(state: Dict, tasks: Optional[Dict] = None,
+                  names: Optional[Iterable[str]] = None) -> Dict[str, object]:
+    """Evaluate facts (all, or only `names`) against a knowledge base state"""
+    tasks = tasks or {}
+    return {name: FACTS[name](state, tasks) for name in (names or FACTS)}
+
+
+@dataclass(frozen=True)
+class NextActionRule:
+    """One compiled `next_actions` entry"""
+    rule_id: str
+    workflow: str
+    agent: str
+    suggestion: str
+    when: Tuple[str, ...] = ()
+    unless: Tuple[str, ...] = ()
+
+    @property
+    def inputs(self) -> Tuple[str, ...]:
+        return self.when + self.unless
+
+    def matches(self, facts: Dict[str, object]) -> bool:
+        return (all(facts.get(f) for f in self.when)
+                and not any(facts.get(f) for f in self.unless))
+
+
+class RuleSet:
+    """Compiled rules in suggestion order plus the fact -> rules index"""
+
+    def __init__(self, rules: List[NextActionRule]):
+        self.rules = rules
+        self.by_id = {rule.rule_id: rule for rule in rules}
+        self.order = {rule.rule_id: i for i, rule in enumerate(rules)}
+        self.by_fact: Dict[str, List[NextActionRule]] = {}
+        for rule in rules:
+            for fact in rule.inputs:
+                self.by_fact.setdefault(fact, []).append(rule)
+
+    @classmethod
+    def from_workflows(cls, workflows_dir: Path = WORKFLOWS_DIR) -> 'RuleSet':
+        """Compile the `next_actions` blocks of every workflow.yaml"""
+        rules = []
+        for path in sorted(Path(workflows_dir).glob('*/*/workflow.yaml')):
+            with open(path, 'r', encoding='utf-8') as f:
+                workflow = yaml.safe_load(f) or {}
+            agent = workflow.get('prerequisites', {}).get('agents_needed', {}).get('primary', '')
+            for entry in workflow.get('next_actions') or []:
+                when = tuple(entry.get('when') or ())
+                unless = tuple(entry.get('unless') or ())
+                unknown = [f for f in when + unless if f not in FACTS]
+                if unknown:
+                    raise ValueError(f"{path}: unknown fact(s) in next action "
+                                     f"'{entry.get('id')}': {', '.join(unknown)}")
+                rules.append(NextActionRule(
+                    rule_id=entry['id'],
+                    workflow=workflow.get('name', path.parent.name),
+                    agent=agent,
+                    suggestion=entry['suggest'],
+                    when=when,
+                    unless=unless
+                ))
+        return cls(rules)
+
+    def evaluate(self, facts: Dict[str, object]) -> List[NextActionRule]:
+        """Full evaluation - for ad-hoc fact dicts, not tracked deals"""
+        return [rule for rule in self.rules if rule.matches(facts)]
+
+
+class DealNextActions:
+    """
+    Live suggestions for one deal, driven by its knowledge store events.
+
+    Only the rules reading a fact that actually changed value are
+    re-evaluated; `on_change(deal, added, removed)` fires when the active
+    set moves.
+    """
+
+    def __init__(self, store: KnowledgeStore, rules: RuleSet,
+                 completed_tasks: Optional[Dict] = None,
+                 on_change: Optional[Callable[[str, Set[str], Set[str]], None]] = None):
+        self.store = store
+        self.deal = store.deal_name
+        self.rules = rules
+        self.completed_tasks = dict(completed_tasks or {})
+        self.on_change = on_change
+        self.evaluations = 0
+
+        self._lock = threading.Lock()
+        self.facts = extract_facts(store.state, self.completed_tasks)
+        self.active: Set[str] = {r.rule_id for r in rules.evaluate(self.facts)}
+        self.evaluations += len(rules.rules)
+        store.subscribe(self._on_event)
+
+    def _on_event(self, event: DealEvent):
+        facts = changed_facts(event)
+        if facts:
+            self.refresh(facts)
+
+    def refresh(self, facts: Iterable[str] = ()) -> Tuple[Set[str], Set[str]]:
+        """Recompute the given facts (all when empty); returns (added, removed) rule ids"""
+        with self._lock:
+            fresh = extract_facts(self.store.state, self.completed_tasks, tuple(facts) or None)
+            moved = [f for f, value in fresh.items() if value != self.facts.get(f)]
+            self.facts.update(fresh)
+
+            affected = {r.rule_id: r for f in moved for r in self.rules.by_fact.get(f, ())}
+            added, removed = set(), set()
+            for rule_id, rule in affected.items():
+                self.evaluations += 1
+                if rule.matches(self.facts):
+                    if rule_id not in self.active:
+                        self.active.add(rule_id)
+                        added.add(rule_id)
+                elif rule_id in self.active:
+                    self.active.discard(rule_id)
+                    removed.add(rule_id)
+
+        if (added or removed) and self.on_change:
+            self.on_change(self.deal, added, removed)
+        return added, removed
+
+    def set_completed_tasks(self, completed_tasks: Dict):
+        """Replace the config milestones (e.g. after config.yaml was edited)"""
+        self.completed_tasks = dict(completed_tasks or {})
+        self.refresh()
+
+    def suggestions(self) -> List[NextActionRule]:
+        """Active rules in workflow order"""
+        order = self.rules.order
+        return sorted((self.rules.by_id[r] for r in self.active), key=lambda r: order[r.rule_id])
+
+
+class NextActionPortfolio:
+    """
+    Suggestions across many deals, each kept current by its own event stream.
+
+    Holds a rule -> deals index that is patched from the per-deal change
+    callbacks, so portfolio questions never scan the deals.
+    """
+
+    def __init__(self, rules: Optional[RuleSet] = None, completed_tasks: Optional[Dict] = None):
+        self.rules = rules or RuleSet.from_workflows()
+        self.completed_tasks = dict(completed_tasks or {})
+        self.deals: Dict[str, DealNextActions] = {}  # Deal slug -> tracker
+        self._by_rule: Dict[str, Set[str]] = {rule.rule_id: set() for rule in self.rules.rules}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_kb_root(cls, kb_root: Path, rules: Optional[RuleSet] = None,
+                     completed_tasks: Optional[Dict] = None) -> 'NextActionPortfolio':
+        """
+        Track every deal with an event log under `knowledge-base/deals/`.
+
+        Deals are opened through `open_store`, so the portfolio follows the
+        same store instances the deals' orchestrators append to.
+        """
+        portfolio = cls(rules, completed_tasks)
+        deals_dir = Path(kb_root) / 'deals'
+        if deals_dir.is_dir():
+            for deal_dir in sorted(deals_dir.iterdir()):
+                if (deal_dir / 'events.jsonl').exists() or (deal_dir / 'checkpoint.json').exists():
+                    portfolio.track(open_store(kb_root, deal_dir.name))
+        return portfolio
+
+    def track(self, store: KnowledgeStore, completed_tasks: Optional[Dict] = None) -> DealNextActions:
+        """Start following a deal's knowledge store"""
+        tracker = DealNextActions(
+            store, self.rules,
+            completed_tasks if completed_tasks is not None else self.completed_tasks,
+            on_change=self._on_change
+        )
+        self.deals[deal_slug(tracker.deal)] = tracker
+        self._on_change(tracker.deal, set(tracker.active), set())
+        return tracker
+
+    def _on_change(self, deal: str, added: Set[str], removed: Set[str]):
+        with self._lock:
+            for rule_id in added:
+                self._by_rule[rule_id].add(deal)
+            for rule_id in removed:
+                self._by_rule[rule_id].discard(deal)
+
+    def suggestions(self, deal: str) -> List[str]:
+        return [rule.suggestion for rule in self.deals[deal_slug(deal)].suggestions()]
+
+    def deals_needing(self, rule_id: str) -> List[str]:
+        """Deals for which a rule is currently suggested"""
+        with self._lock:
+            return sorted(self._by_rule.get(rule_id, ()))
+
+    def overview(self) -> Dict[str, List[str]]:
+        """Rule id -> deals, for rules with at least one deal"""
+        with self._lock:
+            return {rule_id: sorted(deals) for rule_id, deals in self._by_rule.items() if deals}
@@ -0,0 +1,268 @@
+"""
+DD Q&A Tracker
+
+Stores buyer questions, answers and referenced documents in SQLite with an
+FTS5 full-text index, so the DD Manager can answer in milliseconds:
+
+- Is this question a duplicate of one already asked (by any buyer)?
+- Has this been answered already - and where?
+
+Exact duplicates are caught through an indexed hash of the normalized
+question; near duplicates via an FTS5 candidate search re-scored by word
+overlap. Bulk imports of buyer question lists run in a single transaction.
+
+Words are folded the way the FTS tokenizer folds them (ä -> a, é -> e), so
+hashes, overlap scores and FTS matches agree. One connection is shared
+across threads behind a lock.
+"""
+
+import csv
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DUPLICATE_THRESHOLD = 0.6    # Word-set overlap above which two questions are duplicates
+CANDIDATES = 20              # FTS candidates re-scored per lookup
+
+# Question filler words ignored for matching (EN/DE)
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'to', 'in', 'on', 'for', 'and', 'or', 'is', 'are', 'was', 'were', 'be',
+    'please', 'provide', 'could', 'can', 'you', 'we', 'our', 'your', 'do', 'does', 'did', 'what',
+    'which', 'how', 'any', 'all', 'with', 'by', 'from', 'this', 'that', 'there', 'have', 'has',
+    'bitte', 'der', 'die', 'das', 'und', 'oder', 'ist', 'sind', 'ein', 'eine', 'zu', 'von', 'mit',
+    'fuer', 'fur', 'wie', 'welche', 'gibt', 'es', 'sie', 'wir'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    buyer TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    question TEXT NOT NULL,
+    question_hash TEXT NOT NULL,
+    answer TEXT NOT NULL DEFAULT '',
+    documents TEXT NOT NULL DEFAULT '',
+    asked_on TEXT NOT NULL,
+    answered_on TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_questions_hash ON questions(question_hash);
+CREATE INDEX IF NOT EXISTS idx_questions_buyer ON questions(buyer);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, answer, documents,
+    content='questions', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts(rowid, question, answer, documents)
+    VALUES (new.id, new.question, new.answer, new.documents);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question, answer, documents)
+    VALUES ('delete', old.id, old.question, old.answer, old.documents);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_au AFTER UPDATE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question, answer, documents)
+    VALUES ('delete', old.id, old.question, old.answer, old.documents);
+    INSERT INTO questions_fts(rowid, question, answer, documents)
+    VALUES (new.id, new.question, new.answer, new.documents);
+END;
+"""
+
+
+# Bump when question_hash() changes so stored hashes are recomputed on open
+HASH_VERSION = 1
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip diacritics like FTS5 `remove_diacritics 2` ('Käufer' -> 'kaufer')"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.findall(r'[^\W_]+', _fold(text)) if w not in STOPWORDS]
+
+
+def question_hash(question: str) -> str:
+    """Order-insensitive hash of a question's significant words"""
+    return hashlib.sha1(' '.join(sorted(set(_words(question)))).encode('utf-8')).hexdigest()
+
+
+@dataclass
+class QARecord:
+    """One question with its answer status"""
+    id: int
+    buyer: str
+    category: str
+    question: str
+    answer: str
+    documents: str
+    asked_on: str
+    answered_on: Optional[str]
+
+    @property
+    def answered(self) -> bool:
+        return bool(self.answer)
+
+
+class QATracker:
+    """SQLite-backed Q&A log with full-text duplicate detection"""
+
+    def __init__(self, db_path=':memory:'):
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Shared by the router's worker threads; every use holds self._lock
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._migrate_hashes()
+
+    def _migrate_hashes(self):
+        """Recompute question hashes written by an older question_hash()"""
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] >= HASH_VERSION:
+            return
+        with self.conn:
+            rows = self.conn.execute('SELECT id, question FROM questions').fetchall()
+            self.conn.executemany('UPDATE questions SET question_hash = ? WHERE id = ?',
+                                  [(question_hash(q), qid) for qid, q in rows])
+            self.conn.execute(f'PRAGMA user_version = {HASH_VERSION}')
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _record(self, row) -> QARecord:
+        return QARecord(*row)
+
+    # ---- Writing ----------------------------------------------------------
+
+    def add_question(self, question: str, buyer: str = '', category: str = '',
+                     asked_on: Optional[str] = None) -> int:
+        """Log a single question; returns its id"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO questions (buyer, category, question, question_hash, asked_on) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (buyer, category, question, question_hash(question), asked_on or date.today().isoformat())
+            )
+        return cursor.lastrowid
+
+    def import_questions(self, rows: Iterable[Dict], buyer: str = '') -> int:
+        """
+        Bulk import a buyer's question list in one transaction.
+
+        rows are dicts with 'question' and optional 'category', 'buyer',
+        'asked_on'. Returns the number of questions imported.
+        """
+        today = date.today().isoformat()
+        params = [
+            (row.get('buyer') or buyer, row.get('category', ''), row['question'],
+             question_hash(row['question']), row.get('asked_on') or today)
+            for row in rows if row.get('question', '').strip()
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO questions (buyer, category, question, question_hash, asked_on) '
+                'VALUES (?, ?, ?, ?, ?)',
+                params
+            )
+        return len(params)
+
+    def import_csv(self, path: Path, buyer: str = '') -> int:
+        """Bulk import a CSV question list (columns: question[, category, buyer, asked_on])"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            rows = ({k.strip().lower(): (v or '').strip() for k, v in raw.items() if k} for raw in reader)
+            return self.import_questions(rows, buyer=buyer)
+
+    def answer(self, question_id: int, answer: str, documents: Iterable[str] = (),
+               answered_on: Optional[str] = None):
+        """Record the answer and referenced data room documents"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                'UPDATE questions SET answer = ?, documents = ?, answered_on = ? WHERE id = ?',
+                (answer, '; '.join(documents), answered_on or date.today().isoformat(), question_id)
+            )
+
+    # ---- Lookups ----------------------------------------------------------
+
+    def get(self, question_id: int) -> Optional[QARecord]:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT id, buyer, category, question, answer, documents, asked_on, answered_on '
+                'FROM questions WHERE id = ?', (question_id,)
+            ).fetchone()
+        return self._record(row) if row else None
+
+    def search(self, text: str, limit: int = 20, answered_only: bool = False) -> List[QARecord]:
+        """Full-text search over questions, answers and documents (best match first)"""
+        words = _words(text)
+        if not words:
+            return []
+        match = ' OR '.join(f'"{w}"' for w in dict.fromkeys(words))
+        sql = (
+            'SELECT q.id, q.buyer, q.category, q.question, q.answer, q.documents, q.asked_on, q.answered_on '
+            'FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid '
+            'WHERE questions_fts MATCH ?'
+            + (" AND q.answer != ''" if answered_only else '') +
+            ' ORDER BY bm25(questions_fts) LIMIT ?'
+        )
+        with self._lock:
+            rows = self.conn.execute(sql, (match, limit)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def find_duplicates(self, question: str, threshold: float = DUPLICATE_THRESHOLD,
+                        answered_only: bool = False, exclude_id: Optional[int] = None) -> List[Tuple[QARecord, float]]:
+        """
+        Previously logged questions that ask the same thing.
+
+        Exact (word-set) duplicates come from the hash index; near
+        duplicates are FTS candidates with word overlap >= threshold.
+        """
+        results: Dict[int, Tuple[QARecord, float]] = {}
+
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT id, buyer, category, question, answer, documents, asked_on, answered_on '
+                'FROM questions WHERE question_hash = ?' + (" AND answer != ''" if answered_only else ''),
+                (question_hash(question),)
+            ).fetchall()
+        for row in rows:
+            results[row[0]] = (self._record(row), 1.0)
+
+        wanted = set(_words(question))
+        if wanted:
+            for record in self.search(question, limit=CANDIDATES, answered_only=answered_only):
+                if record.id in results:
+                    continue
+                found = set(_words(record.question))
+                overlap = len(wanted & found) / len(wanted | found)
+                if overlap >= threshold:
+                    results[record.id] = (record, round(overlap, 3))
+
+        results.pop(exclude_id, None)
+        return sorted(results.values(), key=lambda item: -item[1])
+
+    def existing_answer(self, question: str) -> Optional[QARecord]:
+        """Best previously answered duplicate of a question, if any"""
+        matches = self.find_duplicates(question, answered_only=True)
+        return matches[0][0] if matches else None
+
+    def stats(self) -> Dict[str, int]:
+        """Question counts for the deal-insights Q&A section"""
+        with self._lock:
+            total, answered = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(answer != ''), 0) FROM questions"
+            ).fetchone()
+        return {'received': total, 'answered': answered, 'outstanding': total - answered}
@@ -13,9 +13,48 @@ Key Principles:
 5. Flexible and adaptive
 """
 
-import re
+import threading
+import time
+from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+
+import yaml
+
+try:
+    from .knowledge_store import KnowledgeStore, open_store
+    from .buyer_index import BuyerIndex, load_profiles
+    from .loi_comparison import LOIBook, LOIOffer, normalize_offer
+    from .dataroom_indexer import DataRoomIndexer
+    from .dd_gap_analysis import ChecklistGapAnalysis
+    from .qa_tracker import QATracker
+    from .cim_builder import CIMBuilder
+    from .template_cache import TemplateCache
+    from .routing_telemetry import RoutingTelemetry
+    from .next_actions import DealNextActions, RuleSet, LEGACY_KEYS
+    from .intent_matcher import IntentMatcher, phrases
+except ImportError:  # Running as a script from the orchestrator directory
+    from knowledge_store import KnowledgeStore, open_store
+    from buyer_index import BuyerIndex, load_profiles
+    from loi_comparison import LOIBook, LOIOffer, normalize_offer
+    from dataroom_indexer import DataRoomIndexer
+    from dd_gap_analysis import ChecklistGapAnalysis
+    from qa_tracker import QATracker
+    from cim_builder import CIMBuilder
+    from template_cache import TemplateCache
+    from routing_telemetry import RoutingTelemetry
+    from next_actions import DealNextActions, RuleSet, LEGACY_KEYS
+    from intent_matcher import IntentMatcher, phrases
+
+
+KB_ROOT = Path(__file__).parent.parent / "knowledge-base"
+
+# Document type -> request words (stemmed by the intent matcher); first match wins
+DOCUMENT_TYPES = {
+    'cim': ['cim', 'confidential information memorandum', 'informationsmemorandum'],
+    'teaser': ['teaser', 'one pager', 'onepager', 'executive summary'],
+    'presentation': ['presentation', 'präsentation', 'deck']
+}
 
 
 @dataclass
@@ -27,6 +66,7 @@ class RoutingDecision:
     rationale: str
     parallel_execution: bool
     context_notes: str
+    document_type: Optional[str] = None   # document_creation: 'cim', 'teaser', 'presentation'
 
 
 class MAOrchestrator:
@@ -37,54 +77,106 @@ class MAOrchestrator:
     based on intent, context, and availability rather than rigid phase rules.
     """
 
-    def __init__(self, config_path: str = "./config.yaml"):
-        """Initialize orchestrator with configuration"""
+    def __init__(self, config_path: str = "./config.yaml", kb_root: Optional[Path] = None):
+        """Initialize orchestrator with configuration (kb_root overrides the knowledge-base directory)"""
         self.config = self._load_config(config_path)
+        self.config_dir = Path(config_path).resolve().parent
         self.intent_patterns = self._load_intent_patterns()
+        self.intent_matcher = IntentMatcher(self.intent_patterns)
+        self.document_matcher = IntentMatcher(DOCUMENT_TYPES)
         self.agent_capabilities = self._load_agent_capabilities()
+        self.kb_root = Path(kb_root or KB_ROOT)
+        self.knowledge_store = open_store(self.kb_root, self._deal_name())
         self.knowledge_base = self._load_knowledge_base()
+        self._buyer_index: Optional[BuyerIndex] = None
+        self._loi_book: Optional[LOIBook] = None
+        self._data_room: Optional[DataRoomIndexer] = None
+        self._dd_checklist: Optional[ChecklistGapAnalysis] = None
+        self._qa_tracker: Optional[QATracker] = None
+        self._cim_builder: Optional[CIMBuilder] = None
+        self._template_cache: Optional[TemplateCache] = None
+        self._next_actions: Optional[DealNextActions] = None
+        self._lazy_lock = threading.Lock()  # Lazy components may be first used from worker threads
+        self.telemetry = self._init_telemetry()
 
     def _load_config(self, path: str) -> Dict:
         """Load system configuration"""
-        # TODO: Implement YAML config loading
-        return {}
+        config_path = Path(path)
+        if not config_path.exists():
+            return {}
+
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+
+    def _init_telemetry(self) -> Optional[RoutingTelemetry]:
+        """Routing telemetry next to the system log (logging.log_decisions, logging.telemetry_samples)"""
+        logging_config = self.config.get('logging', {})
+        if not logging_config.get('log_decisions'):
+            return None
+        log_dir = (self.config_dir / logging_config.get('log_file', './logs/ma-system.log')).parent
+        return RoutingTelemetry(log_dir / "routing-telemetry",
+                                keep_samples=bool(logging_config.get('telemetry_samples', False)))
+
+    def _deal_name(self) -> str:
+        """Deal name from config (used to locate the deal's event log)"""
+        return self.config.get('project_config', {}).get('deal_name') or 'default'
+
+    def _kb_settings(self) -> Dict:
+        """Knowledge base settings from config (auto_update, version_control, ...)"""
+        return self.config.get('system_config', {}).get('knowledge_base', {})
 
     def _load_intent_patterns(self) -> Dict[str, List[str]]:
-        """Load intent detection patterns from config"""
+        """
+        Load intent vocabularies (keywords and phrases, DE/EN).
+
+        Entries are stemmed by the intent matcher, so list base forms only -
+        "bewertung" also matches "Bewertungen", "loi" matches "LOIs". Stemming
+        also merges singular and plural, so generic words ("käufer",
+        "question", "risk") only appear inside qualifying phrases
+        ("what are the risks", "key risks"); "risiken" stems apart from
+        "risiko" and stays standalone.
+        """
         return {
             'financial_analysis': [
-                r'\b(valuation|bewertung|dcf|value|worth|financial model|finanzmodell)\b',
-                r'\b(qoe|quality of earnings|normalized ebitda)\b',
-                r'\b(working capital|betriebskapital|nwc)\b'
+                'valuation', 'bewertung', 'unternehmensbewertung', 'dcf', 'value', 'worth',
+                'financial model', 'finanzmodell',
+                'qoe', 'quality of earnings', 'normalized ebitda',
+                'working capital', 'betriebskapital', 'nwc'
             ],
             'document_creation': [
-                r'\b(create|erstelle|draft)\s+(cim|teaser|presentation|management deck)\b',
-                r'\b(cim|confidential information memorandum)\b',
-                r'\b(teaser|executive summary|one.?pager)\b',
-                r'\b(management presentation|präsentation)\b'
+                *phrases(['create', 'erstelle', 'draft'], ['presentation', 'management deck']),
+                'cim', 'confidential information memorandum',
+                'teaser', 'executive summary', 'one pager', 'onepager',
+                'management presentation', 'präsentation'
             ],
             'market_intelligence': [
-                r'\b(find|identify|search for)\s+(buyers|käufer|acquirers)\b',
-                r'\b(comparable|vergleichs)\s+(transactions|companies|deals)\b',
-                r'\b(industry analysis|market trends|branchenanalyse)\b',
-                r'\b(who (could|would) buy)\b'
+                *phrases(['find', 'identify', 'search for'], ['buyer', 'käufer', 'acquirer']),
+                *phrases(['käufer'], ['finden', 'suchen', 'identifizieren']),
+                *phrases(['potential', 'potenzielle', 'mögliche'], ['buyer', 'käufer', 'acquirer']),
+                *phrases(['comparable', 'vergleichs'], ['transaction', 'company', 'deal']),
+                'buyer list', 'käuferliste',
+                'industry analysis', 'market trends', 'branchenanalyse',
+                'who could buy', 'who would buy'
             ],
             'due_diligence': [
-                r'\b(data.?room|datenraum|vdr)\b',
-                r'\b(q.?a|questions|fragen)\b',
-                r'\b(red flags|issues|risks|problems)\b',
-                r'\b(due diligence|dd|diligence)\b'
+                'data room', 'dataroom', 'datenraum', 'vdr',
+                'q a', 'qa', 'fragenkatalog', 'fragenliste',
+                *phrases(['buyer', 'käufer', 'open', 'offene'], ['question', 'frage', 'issue', 'risk', 'problem']),
+                *phrases(['question', 'frage'], ['from buyer', 'der käufer', 'des käufers']),
+                *phrases(['what are the', 'key', 'main', 'major', 'deal'], ['risk']),
+                'risiken', 'risk assessment', 'risikoanalyse', 'issues list',
+                'red flag', 'due diligence', 'dd', 'diligence'
             ],
             'deal_execution': [
-                r'\b(loi|letter of intent|term sheet)\b',
-                r'\b(compare|vergleichen)\s+(offers|lois|angebote)\b',
-                r'\b(buyer (meeting|tracking|status))\b',
-                r'\b(negotiation|verhandlung)\b'
+                'loi', 'letter of intent', 'term sheet',
+                *phrases(['compare', 'vergleichen'], ['offer', 'loi', 'angebot']),
+                *phrases(['buyer'], ['meeting', 'tracking', 'status']),
+                'negotiation', 'verhandlung'
             ],
             'legal_tax': [
-                r'\b(legal|rechtlich|contract|vertrag)\b',
-                r'\b(tax|steuer|struktur)\b',
-                r'\b(regulatory|compliance|genehmigung)\b'
+                'legal', 'rechtlich', 'contract', 'vertrag',
+                'tax', 'steuer', 'struktur', 'steuerstruktur',
+                'regulatory', 'compliance', 'genehmigung'
             ]
         }
 
@@ -134,31 +226,145 @@ class MAOrchestrator:
         }
 
     def _load_knowledge_base(self) -> Dict:
-        """Load current knowledge base state"""
-        # TODO: Implement knowledge base loading
-        return {
-            'valuation': {'completed': False, 'latest': None},
-            'cim': {'completed': False, 'version': None},
-            'buyers_identified': {'count': 0, 'hot_leads': []},
-            'data_room': {'setup': False, 'completeness': 0}
-        }
+        """
+        Load current knowledge base state.
 
-    def analyze_intent(self, user_input: str) -> List[str]:
+        Returns the store's live materialized state (checkpoint + log tail),
+        so later updates are visible without reloading.
         """
-        Analyze user input to determine intent(s).
+        return self.knowledge_store.state
+
+    def update_knowledge_base(self, event_type: str, payload: Dict) -> bool:
+        """
+        Record an agent update in the deal's event log.
 
-        Can identify multiple intents for complex requests.
+        Honors `knowledge_base.auto_update` from config; returns False when
+        updates are disabled. Markdown views are only re-rendered on
+        `refresh_knowledge_views()`.
         """
-        intents = []
-        user_input_lower = user_input.lower()
+        if not self._kb_settings().get('auto_update', True):
+            return False
 
-        for intent_category, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input_lower, re.IGNORECASE):
-                    intents.append(intent_category)
-                    break
+        self.knowledge_store.append(event_type, payload)
+        return True
+
+    def refresh_knowledge_views(self) -> List[Path]:
+        """Regenerate stale markdown views of the knowledge base"""
+        return self.knowledge_store.refresh_views()
+
+    def index_data_room(self, root: str) -> Dict:
+        """
+        Index (or incrementally re-index) the local data room and record
+        its completeness in the knowledge base.
+        """
+        if self._data_room is None or self._data_room.root != Path(root):
+            cache_path = self.knowledge_store.deal_dir / "dataroom-index.json"
+            self._data_room = DataRoomIndexer(Path(root), cache_path=cache_path)
+
+        stats = self._data_room.scan()
+        # Superseded versions and duplicate copies do not satisfy checklist items
+        self.dd_checklist.sync(self._data_room.current_documents())
+        self.update_knowledge_base('data_room_update', {
+            'setup': True,
+            'completeness': self._data_room.completeness(),
+            'critical_gaps': len(self.dd_checklist.missing('critical')),
+            'files': len(self._data_room.files),
+            'duplicates': len(self._data_room.exact_duplicates()),
+            'superseded': len(self._data_room.superseded()),
+            'unreadable': len(self._data_room.errors)
+        })
+        return stats
+
+    def record_buyer(self, name: str, **attributes) -> bool:
+        """Record a buyer status/attribute update (lead='hot' | 'warm' | 'cold', status, ...)"""
+        return self.update_knowledge_base('buyer_update', {'buyer': name, **attributes})
+
+    def sync_buyer_profiles(self) -> List[str]:
+        """Record profiled buyers the knowledge base does not know yet; returns their names"""
+        known = self.knowledge_base['buyers']
+        new = [name for name in self.buyer_index.search() if name not in known]
+        for name in new:
+            self.record_buyer(name, profiled=True)
+        return new
+
+    @property
+    def loi_book(self) -> LOIBook:
+        """LOIs recorded in the knowledge base, ranked; kept current from loi_received events"""
+        if self._loi_book is None:
+            with self._lazy_lock:
+                if self._loi_book is None:
+                    book = LOIBook()
+                    for payload in self.knowledge_base['lois'].values():
+                        book.add(LOIOffer(**payload))
+                    self.knowledge_store.subscribe(
+                        lambda event: book.add(LOIOffer(**event.payload)) if event.event_type == 'loi_received' else None
+                    )
+                    self._loi_book = book
+        return self._loi_book
+
+    def record_loi(self, terms: Dict) -> LOIOffer:
+        """
+        Normalize LOI terms ('price': '€45M', 'earnout': ..., 'conditions': ...)
+        and record them as a loi_received event (a revision replaces the buyer's LOI).
+        """
+        offer = terms if isinstance(terms, LOIOffer) else normalize_offer(terms)
+        self.update_knowledge_base('loi_received', asdict(offer))
+        return offer
+
+    @property
+    def dd_checklist(self) -> ChecklistGapAnalysis:
+        """DD checklist built from the dataroom-setup workflow, loaded on first use"""
+        if self._dd_checklist is None:
+            with self._lazy_lock:
+                if self._dd_checklist is None:
+                    self._dd_checklist = ChecklistGapAnalysis.from_workflow()
+        return self._dd_checklist
+
+    @property
+    def qa_tracker(self) -> QATracker:
+        """Deal Q&A log (SQLite + full-text index), opened on first use"""
+        if self._qa_tracker is None:
+            with self._lazy_lock:
+                if self._qa_tracker is None:
+                    self._qa_tracker = QATracker(self.knowledge_store.deal_dir / "qa.sqlite")
+        return self._qa_tracker
+
+    @property
+    def cim_builder(self) -> CIMBuilder:
+        """Incremental CIM builder with a per-deal section cache"""
+        if self._cim_builder is None:
+            with self._lazy_lock:
+                if self._cim_builder is None:
+                    self._cim_builder = CIMBuilder(cache_dir=self.knowledge_store.deal_dir / "cim-sections")
+        return self._cim_builder
+
+    @property
+    def template_cache(self) -> TemplateCache:
+        """Pre-compiled document templates (standards.document_templates)"""
+        if self._template_cache is None:
+            with self._lazy_lock:
+                if self._template_cache is None:
+                    self._template_cache = TemplateCache.from_config(self.config, self.config_dir)
+        return self._template_cache
+
+    @property
+    def buyer_index(self) -> BuyerIndex:
+        """Buyer profile index ({kb_root}/buyer-profiles), loaded on first use"""
+        if self._buyer_index is None:
+            with self._lazy_lock:
+                if self._buyer_index is None:
+                    profiles_dir = self.kb_root / "buyer-profiles"
+                    self._buyer_index = load_profiles(profiles_dir, profiles_dir / ".buyer-index.json")
+        return self._buyer_index
+
+    def analyze_intent(self, user_input: str) -> List[str]:
+        """
+        Analyze user input to determine intent(s).
 
-        return list(set(intents))  # Remove duplicates
+        Can identify multiple intents for complex requests. Input is
+        normalized (umlauts, case, DE/EN inflections) before matching.
+        """
+        return self.intent_matcher.match(user_input)
 
     def route_request(self, user_input: str) -> List[RoutingDecision]:
         """
@@ -166,11 +372,12 @@ class MAOrchestrator:
 
         Returns list of routing decisions (can be multiple for complex requests).
         """
+        start = time.perf_counter()
         intents = self.analyze_intent(user_input)
 
         if not intents:
             # Default to managing director for general queries
-            return [RoutingDecision(
+            routing_decisions = [RoutingDecision(
                 primary_agent='managing-director',
                 supporting_agents=[],
                 required_skills=[],
@@ -178,13 +385,20 @@ class MAOrchestrator:
                 parallel_execution=False,
                 context_notes='No specific intent detected'
             )]
-
-        routing_decisions = []
-
-        for intent in intents:
-            decision = self._route_by_intent(intent, user_input)
-            if decision:
-                routing_decisions.append(decision)
+        else:
+            routing_decisions = []
+            for intent in intents:
+                decision = self._route_by_intent(intent, user_input)
+                if decision:
+                    routing_decisions.append(decision)
+
+        if self.telemetry is not None:
+            primary = [d.primary_agent for d in routing_decisions]
+            self.telemetry.record(
+                user_input, intents, primary,
+                primary + [a for d in routing_decisions for a in d.supporting_agents],
+                time.perf_counter() - start, self.knowledge_store.seq
+            )
 
         return routing_decisions
 
@@ -214,6 +428,13 @@ class MAOrchestrator:
         if self.knowledge_base['valuation']['completed']:
             context = f"Existing valuation: {self.knowledge_base['valuation']['latest']}"
 
+        comparables_dir = self.knowledge_store.deal_dir / "comparables"
+        if comparables_dir.is_dir():
+            files = [p for p in comparables_dir.iterdir() if p.suffix.lower() in ('.csv', '.parquet', '.pq')]
+            if files:
+                note = f"{len(files)} comparables file(s) for the multiples valuation"
+                context = f"{context}; {note}" if context else note
+
         return RoutingDecision(
             primary_agent='financial-analyst',
             supporting_agents=['market-intelligence'],  # For comparable data
@@ -229,19 +450,39 @@ class MAOrchestrator:
         # Determine supporting agents based on document type
         supporting = ['company-intelligence', 'financial-analyst', 'market-intelligence']
 
+        document_type = self._document_type(user_input)
+        context = 'Will gather content from multiple sources'
+        if document_type == 'cim':
+            if self._cim_builder is not None:
+                context += (f"; {self._cim_builder.cached_sections} CIM sections cached - "
+                            "only changed sections will be rebuilt")
+            elif (self.knowledge_store.deal_dir / "cim-sections").exists():
+                context += '; CIM section cache present - only changed sections will be rebuilt'
+        elif document_type in ('teaser', 'presentation'):
+            context += '; variants (per buyer / per language) render in bulk from the pre-compiled template'
+
         return RoutingDecision(
             primary_agent='document-generator',
             supporting_agents=supporting,
             required_skills=['docx', 'pptx'],
             rationale='Document creation requires Document Generator',
             parallel_execution=False,
-            context_notes='Will gather content from multiple sources'
+            context_notes=context,
+            document_type=document_type
         )
 
+    def _document_type(self, user_input: str) -> Optional[str]:
+        """Which document a document_creation request asks for (None if unclear)"""
+        found = self.document_matcher.match(user_input)
+        return found[0] if found else None
+
     def _route_market_intelligence(self, user_input: str) -> RoutingDecision:
         """Route market research requests"""
 
-        context = f"Buyers identified: {self.knowledge_base['buyers_identified']['count']}"
+        context = (
+            f"Buyers identified: {self.knowledge_base['buyers_identified']['count']}, "
+            f"profiles indexed: {len(self.buyer_index)}"
+        )
 
         return RoutingDecision(
             primary_agent='market-intelligence',
@@ -255,25 +496,44 @@ class MAOrchestrator:
     def _route_due_diligence(self, user_input: str) -> RoutingDecision:
         """Route due diligence requests"""
 
+        context = 'Will coordinate with specialists as needed'
+        data_room = self.knowledge_base['data_room']
+        if data_room['setup']:
+            context = (
+                f"Data room completeness: {data_room['completeness']}%, "
+                f"critical gaps: {data_room.get('critical_gaps', 'n/a')}"
+            )
+        if self._qa_tracker is not None or (self.knowledge_store.deal_dir / "qa.sqlite").exists():
+            qa = self.qa_tracker.stats()
+            context += f"; Q&A: {qa['received']} received, {qa['outstanding']} outstanding"
+
         return RoutingDecision(
             primary_agent='dd-manager',
             supporting_agents=['financial-analyst', 'legal-tax-advisor'],
             required_skills=['xlsx', 'pdf'],
             rationale='DD management requires DD Manager',
             parallel_execution=False,
-            context_notes='Will coordinate with specialists as needed'
+            context_notes=context
         )
 
     def _route_deal_execution(self, user_input: str) -> RoutingDecision:
         """Route deal execution requests"""
 
+        context = 'Will analyze offers and provide recommendations'
+        leader = self.loi_book.leader()
+        if leader:
+            context = (
+                f"{len(self.loi_book)} LOIs on file; leading risk-adjusted offer: "
+                f"{leader[0]} (PV €{leader[1]:.1f}M, {self.loi_book.primary_scenario} discount scenario)"
+            )
+
         return RoutingDecision(
             primary_agent='buyer-relationship-manager',
             supporting_agents=['financial-analyst', 'legal-tax-advisor'],
             required_skills=['xlsx', 'docx'],
             rationale='Buyer management requires Buyer Relationship Manager',
             parallel_execution=False,
-            context_notes='Will analyze offers and provide recommendations'
+            context_notes=context
         )
 
     def _route_legal_tax(self, user_input: str) -> RoutingDecision:
@@ -298,7 +558,7 @@ class MAOrchestrator:
 
         # Example: CIM creation requires valuation
         if routing_decision.primary_agent == 'document-generator':
-            if 'cim' in routing_decision.context_notes.lower():
+            if routing_decision.document_type == 'cim':
                 if not self.knowledge_base['valuation']['completed']:
                     prerequisites.append('Complete valuation before CIM creation')
 
@@ -309,27 +569,35 @@ class MAOrchestrator:
 
         return prerequisites
 
-    def suggest_next_actions(self, current_state: Dict) -> List[str]:
+    @property
+    def next_actions(self) -> DealNextActions:
+        """Rules from the workflow `next_actions` blocks, kept current by KB events"""
+        if self._next_actions is None:
+            with self._lazy_lock:
+                if self._next_actions is None:
+                    completed_tasks = self.config.get('context', {}).get('completed_tasks', {})
+                    self._next_actions = DealNextActions(
+                        self.knowledge_store, RuleSet.from_workflows(), completed_tasks
+                    )
+        return self._next_actions
+
+    def suggest_next_actions(self, current_state: Optional[Dict] = None) -> List[str]:
         """
         Proactively suggest next logical steps based on current state.
 
-        This enables proactive workflow management.
+        State comes from the knowledge base and `context.completed_tasks`;
+        `current_state` (fact names or the legacy `valuation_complete` /
+        `cim_complete` / `buyers_identified` keys) overrides it for what-if
+        questions. This enables proactive workflow management.
         """
-        suggestions = []
-
-        # If valuation is done but no CIM, suggest CIM
-        if current_state.get('valuation_complete') and not current_state.get('cim_complete'):
-            suggestions.append('Create CIM now that valuation is complete')
-
-        # If CIM done but no buyers identified, suggest buyer research
-        if current_state.get('cim_complete') and current_state.get('buyers_identified') == 0:
-            suggestions.append('Identify potential buyers')
-
-        # If buyers identified and CIM ready, suggest outreach
-        if current_state.get('cim_complete') and current_state.get('buyers_identified') > 0:
-            suggestions.append('Begin buyer outreach with teaser')
-
-        return suggestions
+        tracker = self.next_actions
+        if not current_state:
+            return [rule.suggestion for rule in tracker.suggestions()]
+
+        facts = dict(tracker.facts)
+        for key, value in current_state.items():
+            facts[LEGACY_KEYS.get(key, key)] = value
+        return [rule.suggestion for rule in tracker.rules.evaluate(facts)]
 
 
 def main():
@@ -0,0 +1,428 @@
+"""
+Routing Telemetry
+
+Persists every `route_request` call to a compact columnar store so
+misrouted or slow request classes can be found across millions of
+historical requests without scanning text logs.
+
+Write path (never blocks routing):
+    route_request -> record() -> bounded in-memory queue
+    background thread -> column buffers -> segment file every N rows / T seconds
+
+Segment format (logs/routing-telemetry/seg-*.col):
+    4-byte header length | JSON header | raw column buffers
+
+The header holds row count, time range, the intent/agent dictionaries
+and per-column (typecode, offset, length), so a query reads only the
+columns it needs and skips segments outside its time range or without
+the requested intent/agent. Columns:
+
+    ts          d  unix time
+    input_hash  Q  64-bit hash of the normalized request text
+    intents     Q  bitmask over the segment's intent dictionary
+    primary     Q  bitmask of primary agents over the agent dictionary
+    agents      Q  bitmask of all agents involved (primary + supporting)
+    latency_us  I  routing latency in microseconds
+    kb_seq      q  knowledge store sequence number at routing time
+
+Request texts are not stored - only their hash. With keep_samples=True
+(opt-in) up to MAX_SAMPLES truncated texts per segment are kept in the
+header for inspecting request classes.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+COLUMNS = (
+    ('ts', 'd'),
+    ('input_hash', 'Q'),
+    ('intents', 'Q'),
+    ('primary', 'Q'),
+    ('agents', 'Q'),
+    ('latency_us', 'I'),
+    ('kb_seq', 'q')
+)
+MAX_SAMPLES = 256            # Distinct request texts kept per segment (for inspecting classes)
+
+
+def input_hash(text: str) -> int:
+    """Stable 64-bit hash of a request, insensitive to case and whitespace"""
+    normalized = re.sub(r'\s+', ' ', text.strip().lower())
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _mask(names: Iterable[str], vocabulary: Dict[str, int]) -> int:
+    mask = 0
+    for name in names:
+        bit = vocabulary.get(name)
+        if bit is None:
+            bit = vocabulary[name] = len(vocabulary)
+        mask |= 1 << bit
+    return mask
+
+
+def _names(mask: int, vocabulary: Sequence[str]) -> List[str]:
+    return [name for bit, name in enumerate(vocabulary) if mask >> bit & 1]
+
+
+@dataclass
+class RoutingRecord:
+    """One logged routing call (query result)"""
+    ts: float
+    input_hash: int
+    intents: List[str]
+    primary: List[str]
+    agents: List[str]
+    latency_ms: float
+    kb_seq: int
+    sample: Optional[str] = None
+
+
+class _FlushRequest:
+    """Queue marker: write the current buffer and signal completion"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class _SegmentBuffer:
+    """Column buffers and dictionaries for the segment being filled"""
+
+    def __init__(self):
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self.intents: Dict[str, int] = {}
+        self.agents: Dict[str, int] = {}
+        self.samples: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns['ts'])
+
+    def add(self, ts: float, text: str, intents: List[str], primary: List[str],
+            agents: List[str], latency: float, kb_seq: int, keep_sample: bool):
+        h = input_hash(text)
+        cols = self.columns
+        cols['ts'].append(ts)
+        cols['input_hash'].append(h)
+        cols['intents'].append(_mask(intents, self.intents))
+        cols['primary'].append(_mask(primary, self.agents))
+        cols['agents'].append(_mask(agents, self.agents))
+        cols['latency_us'].append(min(int(latency * 1e6), 0xFFFFFFFF))
+        cols['kb_seq'].append(kb_seq)
+        if keep_sample and len(self.samples) < MAX_SAMPLES:
+            self.samples.setdefault(str(h), text[:200])
+
+    def write(self, path: Path):
+        buffers, specs, offset = [], [], 0
+        for name, code in COLUMNS:
+            data = self.columns[name].tobytes()
+            specs.append({'name': name, 'type': code, 'offset': offset, 'length': len(data)})
+            buffers.append(data)
+            offset += len(data)
+        header = json.dumps({
+            'format': 1,
+            'rows': len(self),
+            'min_ts': min(self.columns['ts']),
+            'max_ts': max(self.columns['ts']),
+            'intents': sorted(self.intents, key=self.intents.get),
+            'agents': sorted(self.agents, key=self.agents.get),
+            'columns': specs,
+            'samples': self.samples
+        }).encode('utf-8')
+
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for data in buffers:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+
+class Segment:
+    """Read access to one segment file, column by column"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as f:
+            (length,) = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(length))
+        self._data_start = 4 + length
+        self._specs = {spec['name']: spec for spec in self.header['columns']}
+
+    @property
+    def rows(self) -> int:
+        return self.header['rows']
+
+    def column(self, name: str) -> array:
+        spec = self._specs[name]
+        values = array(spec['type'])
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_start + spec['offset'])
+            values.frombytes(f.read(spec['length']))
+        return values
+
+    def bit(self, kind: str, name: str) -> Optional[int]:
+        """Bit of an intent/agent name in this segment's dictionary (None if absent)"""
+        vocabulary = self.header[kind]
+        return 1 << vocabulary.index(name) if name in vocabulary else None
+
+
+class RoutingTelemetry:
+    """
+    Batched, asynchronous routing log.
+
+    record() only enqueues; a daemon thread owns the column buffers and
+    writes a segment whenever batch_size rows are buffered or
+    flush_interval seconds have passed. If the queue is full (the disk
+    cannot keep up) records are dropped and counted rather than blocking
+    the router. A failed segment write is counted in write_errors (its
+    rows in dropped) and the thread keeps running.
+    """
+
+    def __init__(self, directory: Path, batch_size: int = 8192, flush_interval: float = 5.0,
+                 keep_samples: bool = False, max_queue: int = 100_000):
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_samples = keep_samples
+        self.dropped = 0
+        self.write_errors = 0
+        self.last_write_error: Optional[str] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='routing-telemetry', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- Write path -------------------------------------------------------
+
+    def record(self, text: str, intents: List[str], primary: List[str], agents: List[str],
+               latency: float, kb_seq: int = 0):
+        """Log one routing call (non-blocking)"""
+        try:
+            self._queue.put_nowait((time.time(), text, intents, primary, agents, latency, kb_seq))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 10.0):
+        """Write everything recorded so far to a segment and wait for it"""
+        if self._closed:
+            return
+        request = _FlushRequest()
+        self._queue.put(request)
+        request.done.wait(timeout)
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10.0)
+
+    def _run(self):
+        buffer = _SegmentBuffer()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else None
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                buffer.add(*item, keep_sample=self.keep_samples)
+                if len(buffer) < self.batch_size:
+                    continue
+
+            # Batch full, interval elapsed, flush requested or shutting down
+            try:
+                self._write(buffer)
+            except OSError as e:
+                self.write_errors += 1
+                self.last_write_error = str(e)
+                self.dropped += len(buffer)
+            buffer = _SegmentBuffer()
+            deadline = time.monotonic() + self.flush_interval
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            elif item is _STOP:
+                return
+
+    def _write(self, buffer: _SegmentBuffer):
+        if not len(buffer):
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"seg-{time.time_ns():020d}-{len(buffer)}.col"
+        buffer.write(self.directory / name)
+
+    # ---- Queries ----------------------------------------------------------
+
+    def segments(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Segment]:
+        """Segments overlapping [since, until], oldest first"""
+        if not self.directory.exists():
+            return
+        for path in sorted(self.directory.glob('seg-*.col')):
+            segment = Segment(path)
+            if since is not None and segment.header['max_ts'] < since:
+                continue
+            if until is not None and segment.header['min_ts'] > until:
+                continue
+            yield segment
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              intent: Optional[str] = None, agent: Optional[str] = None,
+              min_latency_ms: Optional[float] = None, unrouted: bool = False) -> Iterator[RoutingRecord]:
+        """
+        Matching routing records.
+
+        intent / agent filter on membership; unrouted selects requests for
+        which no intent matched (the managing-director fallback).
+        """
+        for segment in self.segments(since, until):
+            intent_bit = segment.bit('intents', intent) if intent else None
+            agent_bit = segment.bit('agents', agent) if agent else None
+            if (intent and intent_bit is None) or (agent and agent_bit is None):
+                continue
+
+            ts = segment.column('ts')
+            intents = segment.column('intents')
+            agents = segment.column('agents')
+            latency = segment.column('latency_us')
+            min_us = min_latency_ms * 1000 if min_latency_ms is not None else None
+
+            rows = [
+                i for i in range(segment.rows)
+                if (since is None or ts[i] >= since) and (until is None or ts[i] <= until)
+                and (intent_bit is None or intents[i] & intent_bit)
+                and (agent_bit is None or agents[i] & agent_bit)
+                and (min_us is None or latency[i] >= min_us)
+                and (not unrouted or intents[i] == 0)
+            ]
+            if not rows:
+                continue
+
+            hashes = segment.column('input_hash')
+            primary = segment.column('primary')
+            kb_seq = segment.column('kb_seq')
+            intent_names, agent_names = segment.header['intents'], segment.header['agents']
+            samples = segment.header.get('samples', {})
+            for i in rows:
+                yield RoutingRecord(
+                    ts=ts[i], input_hash=hashes[i],
+                    intents=_names(intents[i], intent_names),
+                    primary=_names(primary[i], agent_names),
+                    agents=_names(agents[i], agent_names),
+                    latency_ms=latency[i] / 1000, kb_seq=kb_seq[i],
+                    sample=samples.get(str(hashes[i]))
+                )
+
+    def summary(self, by: str = 'intents', since: Optional[float] = None,
+                until: Optional[float] = None) -> List[Dict]:
+        """
+        Request counts and latency percentiles grouped by 'intents',
+        'primary', 'agents' or 'input_hash' (slowest p95 first).
+
+        Grouping runs on the raw integer columns; names are resolved per
+        group, not per row.
+        """
+        if by not in ('intents', 'primary', 'agents', 'input_hash'):
+            raise ValueError(f"Unsupported grouping: {by}")
+        latencies: Dict[Tuple, array] = {}
+        samples: Dict[Tuple, str] = {}
+        for segment in self.segments(since, until):
+            keys = segment.column(by)
+            latency = segment.column('latency_us')
+            ts = segment.column('ts') if since is not None or until is not None else None
+            vocabulary = segment.header['agents'] if by in ('primary', 'agents') else segment.header['intents']
+            resolved: Dict[int, Tuple] = {}
+            for i, key in enumerate(keys):
+                if ts is not None and ((since is not None and ts[i] < since) or (until is not None and ts[i] > until)):
+                    continue
+                group = resolved.get(key)
+                if group is None:
+                    group = resolved[key] = (key,) if by == 'input_hash' else tuple(_names(key, vocabulary))
+                latencies.setdefault(group, array('I')).append(latency[i])
+            if by == 'input_hash':
+                for key, text in segment.header.get('samples', {}).items():
+                    samples.setdefault((int(key),), text)
+
+        result = []
+        for group, values in latencies.items():
+            ordered = sorted(values)
+            result.append({
+                by: group[0] if by == 'input_hash' else list(group),
+                'count': len(ordered),
+                'p50_ms': ordered[len(ordered) // 2] / 1000,
+                'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] / 1000,
+                'max_ms': ordered[-1] / 1000,
+                'sample': samples.get(group)
+            })
+        return sorted(result, key=lambda row: -row['p95_ms'])
+
+    def compact(self, max_rows: int = 1_000_000) -> int:
+        """Merge small segments into segments of up to max_rows; returns segments removed"""
+        self.flush()
+        merged = 0
+        buffer = _SegmentBuffer()
+        sources: List[Path] = []
+
+        def emit():
+            nonlocal buffer, sources, merged
+            if len(sources) > 1:
+                self._write(buffer)
+                for path in sources:
+                    path.unlink()
+                merged += len(sources) - 1
+            buffer, sources = _SegmentBuffer(), []
+
+        for segment in list(self.segments()):
+            if segment.rows >= max_rows:
+                continue
+            if len(buffer) + segment.rows > max_rows:
+                emit()
+            self._merge_into(buffer, segment)
+            sources.append(segment.path)
+        emit()
+        return merged
+
+    def _merge_into(self, buffer: _SegmentBuffer, segment: Segment):
+        """Append a segment's rows, remapping its dictionaries onto the buffer's"""
+        intent_map = [_mask([n], buffer.intents) for n in segment.header['intents']]
+        agent_map = [_mask([n], buffer.agents) for n in segment.header['agents']]
+
+        def remap(mask: int, mapping: List[int]) -> int:
+            out = 0
+            bit = 0
+            while mask:
+                if mask & 1:
+                    out |= mapping[bit]
+                mask >>= 1
+                bit += 1
+            return out
+
+        for name, _ in COLUMNS:
+            column = segment.column(name)
+            if name == 'intents':
+                column = array('Q', (remap(m, intent_map) for m in column))
+            elif name in ('primary', 'agents'):
+                column = array('Q', (remap(m, agent_map) for m in column))
+            buffer.columns[name].extend(column)
+        for key, text in segment.header.get('samples', {}).items():
+            if len(buffer.samples) < MAX_SAMPLES:
+                buffer.samples.setdefault(key, text)
@@ -0,0 +1,196 @@
+"""
+Document Template Cache
+
+Pre-compiles the document-generator templates (`standards.document_templates`
+in config.yaml - CIM, teaser, management deck) once per process:
+
+- DOCX/PPTX/XLSX templates are zip packages; every part is read into
+  memory once and parts containing `{{placeholder}}` markers are split
+  into literal segments and placeholder slots (their offsets)
+- Plain-text templates (.md, .txt, .html) are compiled the same way
+
+Rendering a variant (a teaser per buyer, a DE/EN deck) only joins the
+pre-split segments with escaped values and re-zips the package - the
+template is never re-read or re-parsed. `render_many` fans variants out
+to a worker pool.
+
+Placeholders must sit inside a single text run in Office templates
+(type them in one go, or paste them as plain text).
+"""
+
+import copy
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+
+PLACEHOLDER = re.compile(rb'\{\{\s*([A-Za-z0-9_.\-]+)\s*\}\}')
+PACKAGE_SUFFIXES = {'.docx', '.pptx', '.xlsx', '.dotx', '.potx'}
+
+
+@dataclass
+class CompiledPart:
+    """A template part split at its placeholders"""
+    segments: List[bytes]                 # len(segments) == len(slots) + 1
+    slots: List[str]                      # Placeholder names, in order
+    offsets: List[int]                    # Byte offset of each placeholder in the original part
+
+    def render(self, values: Dict[str, str], xml: bool) -> bytes:
+        out = [self.segments[0]]
+        for name, segment in zip(self.slots, self.segments[1:]):
+            value = str(values.get(name, ''))
+            out.append((escape(value) if xml else value).encode('utf-8'))
+            out.append(segment)
+        return b''.join(out)
+
+
+def compile_part(data: bytes) -> Optional[CompiledPart]:
+    """Split a part at its placeholders (None if it has none)"""
+    segments, slots, offsets = [], [], []
+    last = 0
+    for match in PLACEHOLDER.finditer(data):
+        segments.append(data[last:match.start()])
+        slots.append(match.group(1).decode('utf-8'))
+        offsets.append(match.start())
+        last = match.end()
+    if not slots:
+        return None
+    segments.append(data[last:])
+    return CompiledPart(segments=segments, slots=slots, offsets=offsets)
+
+
+@dataclass
+class CompiledTemplate:
+    """In-memory, pre-split representation of one template file"""
+    path: Path
+    stamp: Tuple[int, int]
+    is_package: bool
+    members: List[Tuple[zipfile.ZipInfo, bytes]] = field(default_factory=list)
+    compiled: Dict[str, CompiledPart] = field(default_factory=dict)
+
+    @property
+    def placeholders(self) -> List[str]:
+        """Distinct placeholder names used anywhere in the template"""
+        names = []
+        for part in self.compiled.values():
+            for name in part.slots:
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def render(self, values: Dict[str, str]) -> bytes:
+        """Render one variant to bytes"""
+        if not self.is_package:
+            return self.compiled['text'].render(values, xml=False) if 'text' in self.compiled \
+                else self.members[0][1]
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as out:
+            for info, data in self.members:
+                part = self.compiled.get(info.filename)
+                # writestr() fills in offset/CRC/size on the ZipInfo it is given -
+                # never hand it the template's shared one (render_many is threaded)
+                out.writestr(copy.copy(info), part.render(values, xml=True) if part else data)
+        return buffer.getvalue()
+
+
+def compile_template(path: Path) -> CompiledTemplate:
+    """Read and pre-compile a template file"""
+    path = Path(path)
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    if path.suffix.lower() not in PACKAGE_SUFFIXES:
+        data = path.read_bytes()
+        template = CompiledTemplate(path=path, stamp=stamp, is_package=False,
+                                    members=[(zipfile.ZipInfo('text'), data)])
+        part = compile_part(data)
+        if part:
+            template.compiled['text'] = part
+        return template
+
+    template = CompiledTemplate(path=path, stamp=stamp, is_package=True)
+    with zipfile.ZipFile(path) as package:
+        for info in package.infolist():
+            data = package.read(info)
+            template.members.append((info, data))
+            if info.filename.endswith('.xml'):
+                part = compile_part(data)
+                if part:
+                    template.compiled[info.filename] = part
+    return template
+
+
+class TemplateCache:
+    """
+    Process-wide cache of compiled templates.
+
+    Templates are addressed by name ('cim', 'teaser', 'management_deck')
+    or path and recompiled only when the file's mtime or size changes.
+    """
+
+    def __init__(self, templates: Optional[Dict[str, str]] = None, base_dir: Path = Path('.'),
+                 workers: int = 4):
+        self.base_dir = Path(base_dir)
+        self.templates = dict(templates or {})
+        self.workers = workers
+        self._compiled: Dict[Path, CompiledTemplate] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict, base_dir: Path) -> 'TemplateCache':
+        """Templates from config.yaml standards.document_templates"""
+        return cls(config.get('standards', {}).get('document_templates', {}), base_dir)
+
+    def _resolve(self, template: str) -> Path:
+        path = Path(self.templates.get(template, template))
+        return path if path.is_absolute() else self.base_dir / path
+
+    def get(self, template: str) -> CompiledTemplate:
+        """Compiled template, recompiled only if the file changed"""
+        path = self._resolve(template)
+        cached = self._compiled.get(path)
+        if cached is not None:
+            stat = path.stat()
+            if cached.stamp == (stat.st_mtime_ns, stat.st_size):
+                return cached
+        compiled = compile_template(path)
+        self._compiled[path] = compiled
+        return compiled
+
+    def render(self, template: str, values: Dict[str, str], output: Optional[Path] = None) -> bytes:
+        """Render a single variant, optionally writing it to output"""
+        data = self.get(template).render(values)
+        if output:
+            _write(Path(output), data)
+        return data
+
+    def render_many(self, template: str, variants: Iterable[Tuple[Path, Dict[str, str]]]) -> List[Path]:
+        """
+        Render many variants of one template with a worker pool.
+
+        variants yields (output path, placeholder values). The template is
+        compiled once up front; workers share the compiled representation.
+        """
+        compiled = self.get(template)
+
+        def render_one(item: Tuple[Path, Dict[str, str]]) -> Path:
+            output, values = item
+            _write(Path(output), compiled.render(values))
+            return Path(output)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(render_one, variants))
+
+
+def _write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)